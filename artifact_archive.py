@@ -0,0 +1,592 @@
+"""
+Compressed append-only archive for raw LLM responses and grading artifacts.
+
+Every raw response, parsed grading output and its metadata is appended as
+one JSON line, compressed as an independent frame (zstd when the zstandard
+package is installed, zlib otherwise), to a segment file owned by the
+writing process. An SQLite index in WAL mode maps each record to its
+segment, offset and length, and to its run, student, assignment and kind.
+Concurrent graders therefore never share a segment file and only
+serialise on short index inserts, and any record can be read back with
+one seek. compact() merges finished segments into larger ones.
+"""
+
+import os
+import sys
+import json
+import zlib
+import time
+import atexit
+import socket
+import sqlite3
+import secrets
+import logging
+import threading
+from datetime import datetime
+from functools import partial
+from typing import Iterator, List, Optional
+
+import config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started TEXT,
+    host TEXT,
+    pid INTEGER,
+    command TEXT
+);
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    created TEXT,
+    updated REAL,
+    sealed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    student_id TEXT,
+    assignment TEXT,
+    label TEXT,
+    created TEXT,
+    segment TEXT NOT NULL,
+    frame_offset INTEGER NOT NULL,
+    frame_length INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_student ON records (student_id, assignment);
+CREATE INDEX IF NOT EXISTS idx_records_assignment ON records (assignment, kind);
+CREATE INDEX IF NOT EXISTS idx_records_run ON records (run_id);
+CREATE INDEX IF NOT EXISTS idx_records_segment ON records (segment, frame_offset);
+"""
+
+_COLUMNS = (
+    "id",
+    "run_id",
+    "kind",
+    "student_id",
+    "assignment",
+    "label",
+    "created",
+    "segment",
+    "frame_offset",
+    "frame_length",
+    "size",
+)
+
+_SUFFIXES = {"zstd": ".jsonl.zst", "zlib": ".jsonl.zz"}
+
+
+_run_id = os.getenv("ARTIFACT_RUN_ID")
+
+
+def current_run_id() -> str:
+    """ID grouping this process's records: ARTIFACT_RUN_ID, or a new unique ID.
+
+    Generated IDs combine a timestamp, the process ID and random bits, so
+    runs started in the same second never collide.
+    """
+    global _run_id
+    if _run_id is None:
+        _run_id = (
+            f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-"
+            f"{secrets.token_hex(3)}"
+        )
+    return _run_id
+
+
+def _codec() -> str:
+    codec = config.ARTIFACT_ARCHIVE_CONFIG["codec"]
+    if codec == "auto":
+        return "zstd" if zstandard is not None else "zlib"
+    if codec == "zstd" and zstandard is None:
+        raise RuntimeError("ARTIFACT_CODEC=zstd needs the zstandard package")
+    if codec not in _SUFFIXES:
+        raise ValueError(f"Unknown ARTIFACT_CODEC {codec!r}")
+    return codec
+
+
+def _decompress(codec: str, frame: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd segments needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(frame)
+    return zlib.decompress(frame)
+
+
+class ArtifactArchive:
+    """Segment files plus an SQLite index under one archive directory."""
+
+    def __init__(self, path: Optional[str] = None):
+        archive_config = config.ARTIFACT_ARCHIVE_CONFIG
+        self.path = path or archive_config["path"]
+        self.segments_dir = os.path.join(self.path, "segments")
+        self.level = archive_config["compression_level"]
+        self.segment_max_bytes = archive_config["segment_max_bytes"]
+        os.makedirs(self.segments_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connect()
+
+    def _connect(self):
+        self._pid = os.getpid()
+        self._conn = sqlite3.connect(
+            os.path.join(self.path, "index.db"), timeout=30, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._segment = None
+        self._runs = set()
+
+    def close(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._seal_segment()
+                self._conn.close()
+
+    def _open_segment(self):
+        codec = _codec()
+        name = (
+            f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-"
+            f"{secrets.token_hex(4)}{_SUFFIXES[codec]}"
+        )
+        handle = open(os.path.join(self.segments_dir, name), "xb")
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO segments (name, codec, created, updated) VALUES (?, ?, ?, ?)",
+                (name, codec, datetime.now().isoformat(), time.time()),
+            )
+        if codec == "zstd":
+            compress = zstandard.ZstdCompressor(level=self.level).compress
+        else:
+            compress = partial(zlib.compress, level=self.level)
+        self._segment = {
+            "name": name,
+            "handle": handle,
+            "compress": compress,
+            "offset": 0,
+        }
+
+    def _seal_segment(self):
+        if self._segment is None:
+            return
+        self._segment["handle"].close()
+        with self._conn:
+            self._conn.execute(
+                "UPDATE segments SET sealed = 1 WHERE name = ?",
+                (self._segment["name"],),
+            )
+        self._segment = None
+
+    def _register_run(self, run_id: str):
+        if run_id in self._runs:
+            return
+        self._conn.execute(
+            "INSERT OR IGNORE INTO runs (run_id, started, host, pid, command) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                run_id,
+                datetime.now().isoformat(),
+                socket.gethostname(),
+                os.getpid(),
+                " ".join(sys.argv),
+            ),
+        )
+        self._runs.add(run_id)
+
+    def append(
+        self,
+        kind: str,
+        payload,
+        student_id: Optional[str] = None,
+        assignment: Optional[str] = None,
+        label: Optional[str] = None,
+        run_id: Optional[str] = None,
+    ) -> int:
+        """Append one record and return its ID.
+
+        Args:
+            kind: Record kind ("raw_response", "grading_output", ...)
+            payload: JSON-serialisable record body
+            student_id: Student the record belongs to, if any
+            assignment: Assignment key (A1..A6)
+            label: Finer-grained request label (e.g. "A6_phase2")
+            run_id: Run to file the record under (default current_run_id())
+        """
+        run_id = run_id or current_run_id()
+        created = datetime.now().isoformat()
+        line = (
+            json.dumps(
+                {
+                    "run_id": run_id,
+                    "kind": kind,
+                    "student_id": student_id,
+                    "assignment": assignment,
+                    "label": label,
+                    "created": created,
+                    "payload": payload,
+                },
+                ensure_ascii=False,
+                default=str,
+            )
+            + "\n"
+        ).encode("utf-8")
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked writer: never touch the parent's segment or connection
+                self._connect()
+            # Written frame first, index row second: a crash in between leaves
+            # unindexed bytes that compact() drops, never a dangling index row.
+            # A segment compacted away under an idle writer is replaced.
+            for _ in range(3):
+                if (
+                    self._segment is None
+                    or self._segment["offset"] >= self.segment_max_bytes
+                ):
+                    self._seal_segment()
+                    self._open_segment()
+                segment = self._segment
+                frame = segment["compress"](line)
+                segment["handle"].write(frame)
+                segment["handle"].flush()
+                offset = segment["offset"]
+                segment["offset"] += len(frame)
+
+                with self._conn:
+                    alive = self._conn.execute(
+                        "UPDATE segments SET updated = ? WHERE name = ?",
+                        (time.time(), segment["name"]),
+                    ).rowcount
+                    if alive:
+                        self._register_run(run_id)
+                        cursor = self._conn.execute(
+                            "INSERT INTO records (run_id, kind, student_id, assignment, label, "
+                            "created, segment, frame_offset, frame_length, size) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (
+                                run_id,
+                                kind,
+                                student_id,
+                                assignment,
+                                label,
+                                created,
+                                segment["name"],
+                                offset,
+                                len(frame),
+                                len(line),
+                            ),
+                        )
+                        return cursor.lastrowid
+                segment["handle"].close()
+                self._segment = None
+        raise RuntimeError(f"Could not append {kind} record to {self.path}")
+
+    def find(
+        self,
+        student_id: Optional[str] = None,
+        assignment: Optional[str] = None,
+        run_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """Index entries matching every given filter, newest first."""
+        clauses, params = [], []
+        for column, value in (
+            ("student_id", student_id),
+            ("assignment", assignment),
+            ("run_id", run_id),
+            ("kind", kind),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+
+        query = f"SELECT {', '.join(_COLUMNS)} FROM records"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY id DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def _codecs(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, codec FROM segments"))
+
+    def read(self, record_id: int) -> dict:
+        """Read one record by ID (retrying once if compaction just moved it)."""
+        for attempt in range(2):
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT r.segment, r.frame_offset, r.frame_length, s.codec "
+                    "FROM records r JOIN segments s ON s.name = r.segment WHERE r.id = ?",
+                    (record_id,),
+                ).fetchone()
+            if row is None:
+                raise KeyError(f"No artifact record {record_id}")
+            segment, offset, length, codec = row
+            try:
+                with open(os.path.join(self.segments_dir, segment), "rb") as f:
+                    f.seek(offset)
+                    frame = f.read(length)
+            except FileNotFoundError:
+                if attempt:
+                    raise
+                continue
+            return {"id": record_id, **json.loads(_decompress(codec, frame))}
+
+    def records(self, **filters) -> Iterator[dict]:
+        """Yield full records matching find() filters, reading each segment in order."""
+        entries = sorted(
+            self.find(**filters), key=lambda e: (e["segment"], e["frame_offset"])
+        )
+        codecs = self._codecs()
+        handle, handle_segment = None, None
+        try:
+            for entry in entries:
+                if entry["segment"] != handle_segment:
+                    if handle is not None:
+                        handle.close()
+                    handle_segment = entry["segment"]
+                    try:
+                        handle = open(
+                            os.path.join(self.segments_dir, handle_segment), "rb"
+                        )
+                    except FileNotFoundError:
+                        handle = None
+                if handle is None:
+                    # Compacted since find(): fall back to a fresh lookup
+                    yield self.read(entry["id"])
+                    continue
+                handle.seek(entry["frame_offset"])
+                frame = handle.read(entry["frame_length"])
+                record = json.loads(_decompress(codecs[entry["segment"]], frame))
+                yield {"id": entry["id"], **record}
+        finally:
+            if handle is not None:
+                handle.close()
+
+    def runs(self, limit: Optional[int] = None) -> List[dict]:
+        """Runs with their record counts, newest first."""
+        query = (
+            "SELECT u.run_id, u.started, u.host, u.pid, u.command, COUNT(r.id) "
+            "FROM runs u LEFT JOIN records r ON r.run_id = u.run_id "
+            "GROUP BY u.run_id ORDER BY u.started DESC"
+        )
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(query).fetchall()
+        names = ("run_id", "started", "host", "pid", "command", "records")
+        return [dict(zip(names, row)) for row in rows]
+
+    def export(self, destination: str, fmt: str = "jsonl", **filters) -> int:
+        """Export matching records and return how many were written.
+
+        fmt "jsonl" writes one uncompressed JSON record per line to the
+        destination file; "files" writes one file per record under
+        destination/<run_id>/ (raw responses as .txt, everything else as
+        pretty-printed .json), like the old grading_outputs/ layout.
+        """
+        count = 0
+        if fmt == "jsonl":
+            os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+            with open(destination, "w", encoding="utf-8") as f:
+                for record in self.records(**filters):
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    count += 1
+            return count
+
+        for record in self.records(**filters):
+            run_dir = os.path.join(destination, record["run_id"])
+            os.makedirs(run_dir, exist_ok=True)
+            stem = "_".join(
+                str(part)
+                for part in (
+                    record["kind"],
+                    record["student_id"],
+                    record["label"] or record["assignment"],
+                    record["id"],
+                )
+                if part
+            ).replace(os.sep, "-")
+            payload = record["payload"]
+            if isinstance(payload, dict) and isinstance(payload.get("text"), str):
+                path, content = os.path.join(run_dir, f"{stem}.txt"), payload["text"]
+            else:
+                path = os.path.join(run_dir, f"{stem}.json")
+                content = json.dumps(record, indent=2, ensure_ascii=False)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            count += 1
+        return count
+
+    def compact(self) -> dict:
+        """Merge finished segments into segments of up to segment_max_bytes.
+
+        Sealed segments and unsealed ones not written for
+        stale_segment_seconds (left by crashed writers) are merged per codec.
+        Frames are copied without recompression and unindexed bytes are
+        dropped. Each merged segment is written and swapped into the index
+        inside one IMMEDIATE transaction, so concurrent writers wait at most
+        that long and readers retry records whose segment was just removed.
+        """
+        stale_before = time.time() - config.ARTIFACT_ARCHIVE_CONFIG[
+            "stale_segment_seconds"
+        ]
+        own = self._segment["name"] if self._segment else None
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE segments SET sealed = 1 "
+                    "WHERE sealed = 0 AND updated < ? AND name IS NOT ?",
+                    (stale_before, own),
+                )
+            rows = self._conn.execute(
+                "SELECT s.name, s.codec, s.sealed, "
+                "COALESCE(SUM(r.frame_length), 0) FROM segments s "
+                "LEFT JOIN records r ON r.segment = s.name GROUP BY s.name ORDER BY s.name"
+            ).fetchall()
+
+        groups = {}
+        for name, codec, sealed, indexed in rows:
+            if not sealed:
+                continue
+            path = os.path.join(self.segments_dir, name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            codec_groups = groups.setdefault(codec, [[]])
+            if codec_groups[-1] and (
+                sum(s["indexed"] for s in codec_groups[-1]) + indexed
+                > self.segment_max_bytes
+            ):
+                codec_groups.append([])
+            codec_groups[-1].append({"name": name, "size": size, "indexed": indexed})
+
+        stats = {"merged_segments": 0, "new_segments": 0, "reclaimed_bytes": 0}
+        for codec, codec_groups in groups.items():
+            for group in codec_groups:
+                wasted = sum(max(s["size"] - s["indexed"], 0) for s in group)
+                if len(group) < 2 and not wasted:
+                    continue
+                self._merge(codec, [s["name"] for s in group])
+                stats["merged_segments"] += len(group)
+                stats["new_segments"] += 1
+                stats["reclaimed_bytes"] += wasted
+
+        stats.update(self.stats())
+        logger.info(f"Compacted artifact archive {self.path}: {stats}")
+        return stats
+
+    def _merge(self, codec: str, names: List[str]):
+        new_name = (
+            f"compact-{datetime.now().strftime('%Y%m%d-%H%M%S')}-"
+            f"{secrets.token_hex(4)}{_SUFFIXES[codec]}"
+        )
+        new_path = os.path.join(self.segments_dir, new_name)
+        placeholders = ", ".join("?" for _ in names)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                entries = self._conn.execute(
+                    f"SELECT id, segment, frame_offset, frame_length FROM records "
+                    f"WHERE segment IN ({placeholders}) ORDER BY segment, frame_offset",
+                    names,
+                ).fetchall()
+                moves, offset, sources = [], 0, {}
+                with open(new_path, "xb") as out:
+                    for record_id, segment, frame_offset, frame_length in entries:
+                        if segment not in sources:
+                            sources[segment] = open(
+                                os.path.join(self.segments_dir, segment), "rb"
+                            )
+                        source = sources[segment]
+                        source.seek(frame_offset)
+                        out.write(source.read(frame_length))
+                        moves.append((new_name, offset, record_id))
+                        offset += frame_length
+                    out.flush()
+                    os.fsync(out.fileno())
+                for source in sources.values():
+                    source.close()
+
+                self._conn.execute(
+                    "INSERT INTO segments (name, codec, created, updated, sealed) "
+                    "VALUES (?, ?, ?, ?, 1)",
+                    (new_name, codec, datetime.now().isoformat(), time.time()),
+                )
+                self._conn.executemany(
+                    "UPDATE records SET segment = ?, frame_offset = ? WHERE id = ?",
+                    moves,
+                )
+                self._conn.execute(
+                    f"DELETE FROM segments WHERE name IN ({placeholders})", names
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                if os.path.exists(new_path):
+                    os.remove(new_path)
+                raise
+
+        for name in names:
+            try:
+                os.remove(os.path.join(self.segments_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            kinds = dict(
+                self._conn.execute(
+                    "SELECT kind, COUNT(*) FROM records GROUP BY kind"
+                ).fetchall()
+            )
+            runs = self._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+            raw_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM records"
+            ).fetchone()[0]
+            segments = self._conn.execute(
+                "SELECT name, sealed FROM segments"
+            ).fetchall()
+        stored_bytes = sum(
+            os.path.getsize(os.path.join(self.segments_dir, name))
+            for name, _ in segments
+            if os.path.exists(os.path.join(self.segments_dir, name))
+        )
+        return {
+            "records": sum(kinds.values()),
+            "kinds": kinds,
+            "runs": runs,
+            "segments": len(segments),
+            "open_segments": sum(1 for _, sealed in segments if not sealed),
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+            "compression_ratio": round(raw_bytes / max(stored_bytes, 1), 2),
+        }
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> ArtifactArchive:
+    """Process-wide archive at ARTIFACT_ARCHIVE_CONFIG["path"], sealed at exit."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = ArtifactArchive()
+            atexit.register(_archive.close)
+        return _archive
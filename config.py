@@ -55,6 +55,47 @@ MODEL_CONFIG = {
 }
 
 
+GRADING_CONFIG = {
+    "a6_concurrent_phases": os.getenv("A6_CONCURRENT_PHASES", "true").lower()
+    == "true",
+    "cache_enabled": os.getenv("GRADING_CACHE", "true").lower() == "true",
+    "cache_dir": os.getenv("GRADING_CACHE_DIR", "grading_cache"),
+    "max_repair_attempts": int(os.getenv("MAX_REPAIR_ATTEMPTS", "2")),
+    "structured_output": os.getenv("STRUCTURED_OUTPUT", "true").lower() == "true",
+    "streaming": os.getenv("STREAMING_GRADING", "false").lower() == "true",
+    "context_cache": os.getenv("CONTEXT_CACHE", "true").lower() == "true",
+    "context_cache_ttl": int(os.getenv("CONTEXT_CACHE_TTL", "3600")),
+}
+
+
+LLM_BACKEND_CONFIG = {
+    # live | record | replay | synthetic | local
+    "mode": os.getenv("LLM_BACKEND", "live").lower(),
+    "recordings_dir": os.getenv("LLM_RECORDINGS_DIR", "llm_recordings"),
+    "replay_latency": os.getenv("LLM_REPLAY_LATENCY", "false").lower() == "true",
+    "synthetic_latency": float(os.getenv("LLM_SYNTHETIC_LATENCY", "0.0")),
+    "synthetic_seed": int(os.getenv("LLM_SYNTHETIC_SEED", "0")),
+    # Per-stage overrides, e.g. "grading=local,generation=live"
+    "stage_backends": dict(
+        (part.strip().lower() for part in item.split("=", 1))
+        for item in os.getenv("LLM_STAGE_BACKENDS", "").split(",")
+        if "=" in item
+    ),
+}
+
+
+LOCAL_LLM_CONFIG = {
+    # OpenAI-compatible server (llama.cpp server, vLLM, Ollama, ...)
+    "base_url": os.getenv("LOCAL_LLM_URL", "http://127.0.0.1:8080").rstrip("/"),
+    # Model name sent to the server; empty uses the requested Gemini model name
+    "model": os.getenv("LOCAL_LLM_MODEL", ""),
+    "api_key": os.getenv("LOCAL_LLM_API_KEY", ""),
+    "timeout": float(os.getenv("LOCAL_LLM_TIMEOUT", "600")),
+    # Concurrent requests; 0 reads total_slots from the llama.cpp /props endpoint
+    "slots": int(os.getenv("LOCAL_LLM_SLOTS", "0")),
+}
+
+
 EVALUATION_CONFIG = {
     "hardness": os.getenv("EVALUATION_HARDNESS", "medium"),
     "strictness": float(os.getenv("EVALUATION_STRICTNESS", "0.7")),
@@ -91,6 +132,189 @@ LOG_CONFIG = {
 }
 
 
+TELEMETRY_CONFIG = {
+    "enabled": os.getenv("LLM_TELEMETRY", "true").lower() == "true",
+    "path": os.getenv("LLM_TELEMETRY_PATH", "telemetry/llm_calls.jsonl"),
+    # USD per million tokens (defaults: gemini-2.0-flash list prices)
+    "input_cost_per_million": float(os.getenv("LLM_INPUT_COST_PER_MILLION", "0.10")),
+    "output_cost_per_million": float(os.getenv("LLM_OUTPUT_COST_PER_MILLION", "0.40")),
+    # Per-model (input, output) USD per million tokens; other models use the above
+    "model_prices": {
+        "gemini-2.0-flash-lite": (0.075, 0.30),
+        "gemini-2.0-flash": (0.10, 0.40),
+        "gemini-2.5-flash": (0.30, 2.50),
+        "gemini-2.5-pro": (1.25, 10.00),
+    },
+}
+
+
+ROUTING_CONFIG = {
+    "enabled": os.getenv("MODEL_ROUTING", "false").lower() == "true",
+    "fast_model": os.getenv("ROUTING_FAST_MODEL", "gemini-2.0-flash-lite"),
+    "strong_model": os.getenv("ROUTING_STRONG_MODEL", "gemini-2.5-pro"),
+    # validation_failure, boundary, test_disagreement, large_submission
+    "triggers": os.getenv(
+        "ROUTING_TRIGGERS",
+        "validation_failure,boundary,test_disagreement,large_submission",
+    ).split(","),
+    # Percent-of-maximum LLM scores treated as grade boundaries
+    "grade_boundaries": [
+        float(b) for b in os.getenv("ROUTING_GRADE_BOUNDARIES", "60,70,80,90").split(",")
+    ],
+    "boundary_margin": float(os.getenv("ROUTING_BOUNDARY_MARGIN", "2.0")),
+    # Escalate when |LLM score fraction - test pass rate| exceeds this
+    "disagreement_threshold": float(os.getenv("ROUTING_DISAGREEMENT", "0.5")),
+    # Submissions larger than this go straight to the strong model
+    "max_fast_source_chars": int(os.getenv("ROUTING_MAX_FAST_CHARS", "120000")),
+}
+
+
+BATCH_GRADING_CONFIG = {
+    # Pack several small submissions into one grading request
+    "enabled": os.getenv("BATCH_GRADING", "false").lower() == "true",
+    "assignments": os.getenv("BATCH_GRADING_ASSIGNMENTS", "A1,A2,A3").split(","),
+    # Estimated prompt tokens per batched request (about 4 characters per token)
+    "max_prompt_tokens": int(os.getenv("BATCH_MAX_PROMPT_TOKENS", "30000")),
+    "max_submissions": int(os.getenv("BATCH_MAX_SUBMISSIONS", "8")),
+    "chars_per_token": 4,
+}
+
+
+FINGERPRINT_CONFIG = {
+    "starter_index_dir": os.getenv("STARTER_INDEX_DIR", "starter_index"),
+    "min_tokens": int(os.getenv("STARTER_MIN_TOKENS", "20")),
+}
+
+
+PLAGIARISM_CONFIG = {
+    "kgram": int(os.getenv("PLAGIARISM_KGRAM", "12")),
+    "window": int(os.getenv("PLAGIARISM_WINDOW", "8")),
+    "min_shared": int(os.getenv("PLAGIARISM_MIN_SHARED", "5")),
+    "max_document_frequency": float(os.getenv("PLAGIARISM_MAX_DF", "0.2")),
+    "report_threshold": float(os.getenv("PLAGIARISM_REPORT_THRESHOLD", "30")),
+    "reports_dir": os.getenv("PLAGIARISM_REPORTS_DIR", "plagiarism_reports"),
+    "max_workers": int(os.getenv("PLAGIARISM_WORKERS", str(os.cpu_count() or 1))),
+}
+
+
+SIMILARITY_ARCHIVE_CONFIG = {
+    "path": os.getenv("SIMILARITY_ARCHIVE_PATH", "similarity_archive/archive.db"),
+    "semester": os.getenv("SIMILARITY_ARCHIVE_SEMESTER"),
+    "num_perm": int(os.getenv("SIMILARITY_ARCHIVE_NUM_PERM", "128")),
+    "bands": int(os.getenv("SIMILARITY_ARCHIVE_BANDS", "32")),
+    "threshold": float(os.getenv("SIMILARITY_ARCHIVE_THRESHOLD", "0.5")),
+    "seed": 1,
+}
+
+
+REUSE_CONFIG = {
+    "enabled": os.getenv("REUSE_RESULTS", "true").lower() == "true",
+    "path": os.getenv("REUSE_STORE_PATH", "reuse_store/reuse.db"),
+    # Fingerprint Jaccard similarity for a diff-only review of a graded twin
+    "near_threshold": float(os.getenv("REUSE_NEAR_THRESHOLD", "0.85")),
+    # Larger diffs are graded from scratch
+    "max_diff_chars": int(os.getenv("REUSE_MAX_DIFF_CHARS", "30000")),
+}
+
+
+ARTIFACT_ARCHIVE_CONFIG = {
+    "enabled": os.getenv("ARTIFACT_ARCHIVE", "true").lower() == "true",
+    "path": os.getenv("ARTIFACT_ARCHIVE_DIR", "artifact_archive"),
+    # "zstd" needs the zstandard package; "auto" falls back to zlib without it
+    "codec": os.getenv("ARTIFACT_CODEC", "auto"),
+    "compression_level": int(os.getenv("ARTIFACT_COMPRESSION_LEVEL", "6")),
+    # A writer starts a new segment once its current one reaches this size
+    "segment_max_bytes": int(os.getenv("ARTIFACT_SEGMENT_MAX_BYTES", str(64 << 20))),
+    # Unsealed segments untouched for this long belong to crashed writers
+    "stale_segment_seconds": int(os.getenv("ARTIFACT_STALE_SEGMENT_SECONDS", "86400")),
+    # Also write the old per-attempt raw_*.txt and per-result JSON files
+    "legacy_files": os.getenv("ARTIFACT_LEGACY_FILES", "false").lower() == "true",
+}
+
+
+DESCRIPTION_STORE_CONFIG = {
+    "cache_dir": os.getenv("DESCRIPTION_CACHE_DIR", "description_cache"),
+    # PDFs with at least this many pages are extracted by several processes
+    "parallel_pages": int(os.getenv("DESCRIPTION_PARALLEL_PAGES", "16")),
+    "workers": int(os.getenv("DESCRIPTION_WORKERS", str(os.cpu_count() or 1))),
+}
+
+
+SPEC_RETRIEVAL_CONFIG = {
+    # Put the best-matching description sections into each grading prompt
+    "enabled": os.getenv("SPEC_RETRIEVAL", "true").lower() == "true",
+    "token_budget": int(os.getenv("SPEC_TOKEN_BUDGET", "1500")),
+    # Longer sections are split so one section cannot take the whole budget
+    "max_section_tokens": int(os.getenv("SPEC_MAX_SECTION_TOKENS", "400")),
+    # Persian text averages fewer characters per token than English
+    "chars_per_token": 3,
+    "k1": 1.5,
+    "b": 0.75,
+}
+
+
+REFERENCE_ORACLE_CONFIG = {
+    # Reference solution of an assignment: <solutions_dir>/<assignment>, either
+    # a Makefile project or .cpp files
+    "solutions_dir": os.getenv("REFERENCE_SOLUTIONS_DIR", "reference_solutions"),
+    "build_dir": os.getenv("REFERENCE_BUILD_DIR", "reference_builds"),
+    "compile_command": os.getenv("REFERENCE_COMPILE_COMMAND", "g++ -std=c++2a -O2"),
+    # Per-run limits; inputs exceeding them are discarded
+    "timeout": float(os.getenv("REFERENCE_TIMEOUT", "5")),
+    "memory_mb": int(os.getenv("REFERENCE_MEMORY_MB", "512")),
+    "max_output_bytes": int(os.getenv("REFERENCE_MAX_OUTPUT_BYTES", str(1 << 20))),
+    "workers": int(os.getenv("REFERENCE_WORKERS", str(os.cpu_count() or 1))),
+}
+
+
+STRESS_TEST_CONFIG = {
+    # Suites live in test_cases/practice<N>/<dir>/[P<phase>/]<size>/
+    "dir": os.getenv("STRESS_TEST_DIR", "stress"),
+    "small_count": int(os.getenv("STRESS_SMALL_COUNT", "50")),
+    "large_count": int(os.getenv("STRESS_LARGE_COUNT", "3")),
+    # judge.sh TIME_LIMIT and COMPILER, for timing submissions like the judge
+    "time_limit": float(os.getenv("STRESS_TIME_LIMIT", "10")),
+    "compile_command": os.getenv("STRESS_COMPILE_COMMAND", "g++ -std=c++2a"),
+    # Large inputs are kept only if the reference needs at most this share
+    # of the time limit
+    "reference_share": 0.5,
+    "large_output_mb": int(os.getenv("STRESS_LARGE_OUTPUT_MB", "64")),
+    # Time each graded submission on the large suites
+    "measure_performance": os.getenv("STRESS_PERFORMANCE", "true").lower() == "true",
+    "performance_log": os.getenv(
+        "STRESS_PERFORMANCE_LOG", os.path.join("test_results", "performance.jsonl")
+    ),
+}
+
+
+MINIMIZER_CONFIG = {
+    # Rerun failing judge tests and shrink them to short reproducers
+    "enabled": os.getenv("FAILURE_MINIMIZER", "true").lower() == "true",
+    "max_failures": int(os.getenv("MINIMIZER_MAX_FAILURES", "3")),
+    # Per-student limits on candidate executions and wall-clock time
+    "budget": int(os.getenv("MINIMIZER_BUDGET", "300")),
+    "seconds": float(os.getenv("MINIMIZER_SECONDS", "120")),
+    "timeout": float(os.getenv("MINIMIZER_TIMEOUT", "5")),
+    "workers": int(os.getenv("MINIMIZER_WORKERS", str(os.cpu_count() or 1))),
+}
+
+TRIAGE_CONFIG = {
+    # Interim grading runs only a coverage-preserving subset of the judge tests;
+    # final grading leaves this off and runs the full suite
+    "enabled": os.getenv("JUDGE_TRIAGE", "false").lower() == "true",
+    "compile_command": os.getenv(
+        "TRIAGE_COMPILE_COMMAND", "g++ -std=c++2a --coverage -O0"
+    ),
+    "gcov_command": os.getenv("GCOV_COMMAND", "gcov"),
+    "build_dir": os.getenv("TRIAGE_BUILD_DIR", "reference_builds/coverage"),
+    "report_name": "triage.json",
+    # Judge cost of a test beyond the reference's runtime (build copy, diff)
+    "test_overhead": float(os.getenv("TRIAGE_TEST_OVERHEAD", "0.05")),
+    "timeout": float(os.getenv("TRIAGE_TIMEOUT", "10")),
+    "workers": int(os.getenv("TRIAGE_WORKERS", str(os.cpu_count() or 1))),
+}
+
+
 PRACTICE_CONFIGS = {
     "A1": {
         "name": "Assignment 1 - Basic Programming",
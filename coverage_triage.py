@@ -0,0 +1,303 @@
+"""
+Coverage-guided judge test selection for triage grading.
+
+analyze() builds the reference solution with gcov instrumentation, runs it
+on every judge test and records which source lines and branches each test
+covers. A weighted greedy set cover (cost: the test's reference runtime plus
+a fixed judge overhead) followed by redundancy elimination picks a small
+subset with the same coverage, written as triage.json beside the tests
+directory (judge/ or judge/P<k>/) together with the coverage and time kept.
+
+In triage mode (TRIAGE_CONFIG["enabled"], `grade --triage`) the judge runs
+on triage_judge_dir(), a copy of the judge directory holding only the
+selected tests. Final grading leaves triage off and runs the full suite.
+"""
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+import subprocess
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import config
+import reference_oracle
+import stress_tests
+
+logger = logging.getLogger(__name__)
+
+
+def _reference(key: str, assignment: str) -> Optional[str]:
+    # Per-phase reference (A6.2) first, then the assignment's (A6)
+    for candidate in dict.fromkeys([key, assignment]):
+        try:
+            return reference_oracle.reference_path(candidate)
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def _gcov_units(build_dir: str, run_dir: str) -> set:
+    """Covered lines and taken branches recorded by one instrumented run."""
+    gcda_dir, gcda_files = None, []
+    for root, _, names in os.walk(run_dir):
+        found = sorted(name for name in names if name.endswith(".gcda"))
+        if found:
+            gcda_dir, gcda_files = root, found
+            break
+    if not gcda_files:
+        return set()
+    for name in os.listdir(build_dir):
+        if name.endswith(".gcno"):
+            shutil.copy2(os.path.join(build_dir, name), gcda_dir)
+
+    process = subprocess.run(
+        [config.TRIAGE_CONFIG["gcov_command"], "-b", "--json-format", "--stdout"]
+        + gcda_files,
+        cwd=gcda_dir,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    units = set()
+    for document in process.stdout.splitlines():
+        if not document.startswith("{"):
+            continue
+        for source in json.loads(document).get("files", []):
+            # Headers from the toolchain (/usr/include/...) are absolute
+            if os.path.isabs(source["file"]):
+                continue
+            for line in source.get("lines", []):
+                if not line["count"]:
+                    continue
+                unit = f"{source['file']}:{line['line_number']}"
+                units.add(unit)
+                units.update(
+                    f"{unit}:b{index}"
+                    for index, branch in enumerate(line.get("branches", []))
+                    if branch["count"]
+                )
+    return units
+
+
+def test_coverage(
+    instrumented: str, input_text: str, args: Sequence[str] = ()
+) -> dict:
+    """Run an instrumented build on one input and collect its coverage.
+
+    Returns:
+        {"status", "units": set of "file:line" and "file:line:b<k>"}
+    """
+    with tempfile.TemporaryDirectory(prefix="coverage-") as run_dir:
+        run = reference_oracle.run_sandboxed(
+            instrumented,
+            input_text,
+            args,
+            config.TRIAGE_CONFIG["timeout"],
+            env={"GCOV_PREFIX": run_dir},
+        )
+        units = _gcov_units(os.path.dirname(instrumented), run_dir)
+    return {"status": run["status"], "units": units}
+
+
+def select_tests(coverage: Dict[str, set], costs: Dict[str, float]) -> List[str]:
+    """Cheap subset of tests covering every unit any test covers.
+
+    Greedy weighted set cover (most new units per unit of cost), then drops
+    the most expensive tests whose units the others already cover.
+
+    Returns:
+        Selected test names, in the order of coverage
+    """
+    uncovered = set().union(*coverage.values()) if coverage else set()
+    selected = []
+    while uncovered:
+        best = max(
+            (name for name in coverage if name not in selected),
+            key=lambda name: len(coverage[name] & uncovered) / costs[name],
+        )
+        if not coverage[best] & uncovered:
+            break
+        selected.append(best)
+        uncovered -= coverage[best]
+
+    for name in sorted(selected, key=lambda name: -costs[name]):
+        others = [other for other in selected if other != name]
+        if coverage[name] <= set().union(*(coverage[other] for other in others)):
+            selected = others
+    return [name for name in coverage if name in selected]
+
+
+def analyze_suite(
+    assignment: str, key: str, tests_dir: str, args: Sequence[str] = ()
+) -> Optional[dict]:
+    """Select the triage subset of one judge tests directory and save it.
+
+    Tests the reference does not pass cleanly have no coverage to compare
+    and are always kept.
+
+    Returns:
+        The triage report written to triage.json, or None without a
+        reference solution
+    """
+    triage_config = config.TRIAGE_CONFIG
+    reference = _reference(key, assignment)
+    tests = reference_oracle.read_test_files(tests_dir)
+    if not reference or not tests:
+        return None
+
+    executable = reference_oracle.build_executable(
+        reference,
+        config.REFERENCE_ORACLE_CONFIG["build_dir"],
+        key,
+        config.PRACTICE_CONFIGS.get(assignment.split(".")[0], {}),
+    )
+    instrumented = reference_oracle.build_executable(
+        reference,
+        triage_config["build_dir"],
+        key,
+        compile_command=triage_config["compile_command"],
+        use_makefile=False,
+    )
+
+    def measure(test: tuple) -> tuple:
+        name, input_text, _ = test
+        run = reference_oracle.run_sandboxed(
+            executable, input_text, args, triage_config["timeout"]
+        )
+        return name, run, test_coverage(instrumented, input_text, args)
+
+    with ThreadPoolExecutor(triage_config["workers"]) as executor:
+        measured = list(executor.map(measure, tests))
+
+    costs, coverage, always = {}, {}, []
+    for name, run, covered in measured:
+        costs[name] = run["seconds"] + triage_config["test_overhead"]
+        if run["status"] == "ok" and covered["status"] == "ok" and covered["units"]:
+            coverage[name] = covered["units"]
+        else:
+            always.append(name)
+    chosen = set(select_tests(coverage, costs)) | set(always)
+    selected = [name for name, _, _ in tests if name in chosen]
+
+    units = set().union(*coverage.values()) if coverage else set()
+    kept = set().union(*(coverage.get(name, set()) for name in selected))
+    full_seconds = sum(costs.values())
+    triage_seconds = sum(costs[name] for name in selected)
+    report = {
+        "assignment": key,
+        "generated_at": datetime.now().isoformat(),
+        "reference": reference,
+        "tests": [name for name, _, _ in tests],
+        "selected": selected,
+        "unanalyzed": always,
+        "coverage_units": len(units),
+        "kept_units": len(kept & units),
+        "coverage_kept_percent": round(100 * len(kept & units) / len(units), 1)
+        if units
+        else 100.0,
+        "full_seconds": round(full_seconds, 3),
+        "triage_seconds": round(triage_seconds, 3),
+        "time_saved_percent": round(100 * (1 - triage_seconds / full_seconds), 1)
+        if full_seconds
+        else 0.0,
+    }
+    path = os.path.join(os.path.dirname(tests_dir), triage_config["report_name"])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logger.info(
+        f"Triage for {key}: {len(selected)}/{len(tests)} tests keep "
+        f"{report['kept_units']}/{report['coverage_units']} coverage units, "
+        f"saving {report['time_saved_percent']}% of judge time"
+    )
+    return report
+
+
+def analyze(assignment: str) -> List[dict]:
+    """Triage reports of every judge tests directory of an assignment."""
+    reports = []
+    for key, tests_dir, args in stress_tests.judge_suites(assignment):
+        report = analyze_suite(assignment, key, tests_dir, args)
+        if report:
+            reports.append(report)
+        else:
+            logger.warning(f"No reference solution or tests for {key}, skipped")
+    return reports
+
+
+def selected_tests(tests_dir: str) -> Optional[set]:
+    """Triage selection of a tests directory, or None if missing or stale."""
+    path = os.path.join(
+        os.path.dirname(tests_dir), config.TRIAGE_CONFIG["report_name"]
+    )
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    current = [name for name, _, _ in reference_oracle.read_test_files(tests_dir)]
+    if current != report["tests"]:
+        logger.warning(f"{path} is stale (judge tests changed), running all tests")
+        return None
+    return set(report["selected"])
+
+
+def triage_judge_dir(judge_dir: str, dest: str) -> Optional[dict]:
+    """Copy a judge directory to dest with only the triage-selected tests.
+
+    Returns:
+        None if no tests directory has a current selection, else
+        {"kept", "total"} test counts over all tests directories
+    """
+    selections = {}
+    for root in [judge_dir] + [
+        os.path.join(judge_dir, name) for name in sorted(os.listdir(judge_dir))
+    ]:
+        tests_dir = os.path.join(root, "tests")
+        if os.path.isdir(tests_dir):
+            selected = selected_tests(tests_dir)
+            if selected is not None:
+                names = reference_oracle.read_test_files(tests_dir)
+                selections[os.path.realpath(tests_dir)] = (
+                    selected,
+                    {name for name, _, _ in names},
+                )
+    if not selections:
+        return None
+
+    def ignore(directory: str, names: List[str]) -> List[str]:
+        if directory == judge_dir:
+            # Submission copies of earlier runs (temp-run, temp-P3)
+            return [name for name in names if name.startswith("temp")]
+        selected, tests = selections.get(os.path.realpath(directory), (None, ()))
+        return [
+            name
+            for name in names
+            if name.split(".")[0] in tests and name.split(".")[0] not in selected
+        ]
+
+    shutil.copytree(judge_dir, dest, ignore=ignore, symlinks=True)
+    counts = {"kept": 0, "total": 0}
+    for selected, tests in selections.values():
+        counts["kept"] += len(selected & tests)
+        counts["total"] += len(tests)
+    return counts
+
+
+def render_reports(reports: List[dict]) -> str:
+    """Coverage and judge time kept by each triage selection, as text."""
+    lines = []
+    for report in reports:
+        lines.append(
+            f"{report['assignment']}: {len(report['selected'])}/"
+            f"{len(report['tests'])} tests, coverage "
+            f"{report['kept_units']}/{report['coverage_units']} units "
+            f"({report['coverage_kept_percent']}%), reference time "
+            f"{report['triage_seconds']}s of {report['full_seconds']}s "
+            f"({report['time_saved_percent']}% saved)"
+        )
+        if report["unanalyzed"]:
+            lines.append(f"   Always run: {', '.join(report['unanalyzed'])}")
+    return "\n".join(lines)
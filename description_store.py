@@ -0,0 +1,316 @@
+"""
+Cached, lazily-loaded assignment description store.
+
+Assignment description PDFs under PRACTICES_DIR are mapped to assignment
+keys (A1, A6, A6.2, ...) by a small index that is refreshed from file
+names and stat data only, so finding one assignment's PDFs never opens
+the others. Each PDF is extracted once: its page text and layout blocks
+are cached on disk under its SHA-256, and PyMuPDF is only imported on a
+cache miss. Large PDFs are extracted by several processes.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when the cached page format or text normalisation changes
+EXTRACTOR_VERSION = 3
+
+_ASSIGNMENT_RE = re.compile(r"(?<![A-Za-z0-9])A(\d+)(?:\.(\d+))?", re.IGNORECASE)
+
+
+def _assignment_keys(relative_path: str) -> List[str]:
+    """Assignment keys of a description PDF from its directory and file name.
+
+    "A6/APS04-A6.2-Description.pdf" gives ["A6", "A6.2", "APS04-A6.2-Description"].
+    """
+    keys = []
+    parts = relative_path.replace(os.sep, "/").split("/")
+    stem = os.path.splitext(parts[-1])[0]
+    for part in parts[:-1] + [stem]:
+        for match in _ASSIGNMENT_RE.finditer(part):
+            keys.append(f"A{match.group(1)}")
+            if match.group(2):
+                keys.append(f"A{match.group(1)}.{match.group(2)}")
+    keys.append(stem)
+    return list(dict.fromkeys(keys))
+
+
+def _page_record(page) -> dict:
+    import fitz
+
+    blocks = []
+    layout = page.get_text(
+        "dict", flags=fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+    )
+    for number, block in enumerate(layout["blocks"]):
+        spans = [span for line in block.get("lines", []) for span in line["spans"]]
+        if not spans:
+            continue
+        # Font of the block is the one covering most of its characters
+        main = max(spans, key=lambda span: len(span["text"].strip()))
+        x0, y0, x1, y1 = block["bbox"]
+        blocks.append(
+            [
+                round(x0, 1),
+                round(y0, 1),
+                round(x1, 1),
+                round(y1, 1),
+                "\n".join(
+                    "".join(span["text"] for span in line["spans"])
+                    for line in block["lines"]
+                ),
+                number,
+                block["type"],
+                round(main["size"], 1),
+                main["flags"],
+                [
+                    [round(line["bbox"][0], 1), round(line["bbox"][2], 1)]
+                    for line in block["lines"]
+                ],
+            ]
+        )
+    return {"text": page.get_text(), "blocks": blocks}
+
+
+def _extract_pages(pdf_path: str, start: int, stop: int) -> List[dict]:
+    """Extract pages [start, stop) of a PDF (run in worker processes too)."""
+    import fitz
+
+    doc = fitz.open(pdf_path)
+    try:
+        return [_page_record(doc[number]) for number in range(start, stop)]
+    finally:
+        doc.close()
+
+
+def document_text(pages: List[dict]) -> str:
+    """Full description text from extracted pages, with page separators."""
+    text_content = []
+    for page_num, page in enumerate(pages):
+        page_text = page["text"].replace("\n\n", "\n").replace("  ", " ")
+        if page_num > 0:
+            text_content.append(f"\n--- Page {page_num + 1} ---\n")
+        text_content.append(page_text)
+    return "".join(text_content).strip()
+
+
+class DescriptionStore:
+    """Assignment-to-PDF index plus an on-disk extraction cache keyed by PDF hash."""
+
+    def __init__(
+        self, practices_dir: Optional[str] = None, cache_dir: Optional[str] = None
+    ):
+        store_config = config.DESCRIPTION_STORE_CONFIG
+        self.practices_dir = practices_dir or config.PRACTICES_DIR
+        self.cache_dir = cache_dir or store_config["cache_dir"]
+        self.parallel_pages = store_config["parallel_pages"]
+        self.workers = store_config["workers"]
+        self._index_path = os.path.join(self.cache_dir, "index.json")
+        self._lock = threading.Lock()
+        self._index = None
+        self._documents = {}
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("practices_dir") == os.path.abspath(self.practices_dir):
+                return index
+        except (OSError, ValueError):
+            pass
+        return {"practices_dir": os.path.abspath(self.practices_dir), "files": {}}
+
+    def _save_index(self, index: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self._index_path)
+
+    def index(self) -> dict:
+        """Relative PDF path -> {"size", "mtime_ns", "keys", "sha256"}.
+
+        Refreshed from a directory walk and stat() calls; hashes are carried
+        over for files whose size and mtime did not change.
+        """
+        with self._lock:
+            if self._index is not None:
+                return self._index["files"]
+
+            index = self._load_index()
+            files = {}
+            if os.path.isdir(self.practices_dir):
+                for root, dirs, names in os.walk(self.practices_dir):
+                    dirs.sort()
+                    for name in sorted(names):
+                        if not name.lower().endswith(".pdf"):
+                            continue
+                        path = os.path.join(root, name)
+                        relative_path = os.path.relpath(path, self.practices_dir)
+                        stat = os.stat(path)
+                        entry = {
+                            "size": stat.st_size,
+                            "mtime_ns": stat.st_mtime_ns,
+                            "keys": _assignment_keys(relative_path),
+                        }
+                        previous = index["files"].get(relative_path, {})
+                        if (
+                            previous.get("size") == entry["size"]
+                            and previous.get("mtime_ns") == entry["mtime_ns"]
+                        ):
+                            entry["sha256"] = previous.get("sha256")
+                        files[relative_path] = entry
+
+            index["files"] = files
+            if files != self._load_index()["files"]:
+                self._save_index(index)
+            self._index = index
+            return files
+
+    def files(self, assignment: str) -> List[str]:
+        """Description PDFs of an assignment ("A1", "A6", "A6.2" or a file stem).
+
+        Falls back to a substring match on file names, as the old
+        description lookup did.
+        """
+        key = assignment.lower()
+        files = self.index()
+        matches = [
+            path
+            for path, entry in files.items()
+            if key in (k.lower() for k in entry["keys"])
+        ]
+        if not matches:
+            matches = [
+                path
+                for path in files
+                if key in os.path.splitext(os.path.basename(path))[0].lower()
+            ]
+        return [os.path.join(self.practices_dir, path) for path in matches]
+
+    def _sha256(self, pdf_path: str) -> str:
+        relative_path = os.path.relpath(pdf_path, self.practices_dir)
+        entry = self.index().get(relative_path)
+        if entry and entry.get("sha256"):
+            return entry["sha256"]
+
+        digest = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+
+        if entry is not None:
+            with self._lock:
+                entry["sha256"] = sha256
+                self._save_index(self._index)
+        return sha256
+
+    def document(self, pdf_path: str) -> dict:
+        """Extracted PDF: {"pdf", "sha256", "pages": [{"text", "blocks"}], "text"}.
+
+        Blocks are PyMuPDF text blocks [x0, y0, x1, y1, text, block_no,
+        block_type, font_size, font_flags, line_extents], with the font
+        covering most of the block and the [x0, x1] of each text line.
+        Served from memory or the disk cache when possible.
+        """
+        sha256 = self._sha256(pdf_path)
+        if sha256 in self._documents:
+            return self._documents[sha256]
+
+        cache_path = os.path.join(
+            self.cache_dir, f"{sha256}-v{EXTRACTOR_VERSION}.json"
+        )
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            document = self._extract(pdf_path, sha256)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(document, f, ensure_ascii=False)
+            os.replace(temp_path, cache_path)
+
+        document["text"] = document_text(document["pages"])
+        self._documents[sha256] = document
+        return document
+
+    def _extract(self, pdf_path: str, sha256: str) -> dict:
+        import fitz
+
+        with fitz.open(pdf_path) as doc:
+            page_count = len(doc)
+
+        workers = min(self.workers, page_count)
+        if page_count >= self.parallel_pages and workers > 1:
+            step = -(-page_count // workers)
+            starts = list(range(0, page_count, step))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunks = executor.map(
+                    _extract_pages,
+                    [pdf_path] * len(starts),
+                    starts,
+                    [min(start + step, page_count) for start in starts],
+                )
+                pages = [page for chunk in chunks for page in chunk]
+        else:
+            pages = _extract_pages(pdf_path, 0, page_count)
+
+        logger.info(f"Extracted {page_count} pages from {pdf_path}")
+        return {
+            "pdf": os.path.basename(pdf_path),
+            "sha256": sha256,
+            "extracted": datetime.now().isoformat(),
+            "pages": pages,
+        }
+
+    def text(self, assignment: str) -> Optional[str]:
+        """Full description text of an assignment, or None if it has no PDF.
+
+        Several PDFs (e.g. the A6 phases) are joined in file name order,
+        each under a header naming its file.
+        """
+        paths = self.files(assignment)
+        if not paths:
+            return None
+        if len(paths) == 1:
+            return self.document(paths[0])["text"]
+        return "\n\n".join(
+            f"=== {os.path.splitext(os.path.basename(path))[0]} ===\n"
+            f"{self.document(path)['text']}"
+            for path in paths
+        )
+
+    def assignments(self) -> Dict[str, List[str]]:
+        """Assignment key -> description PDF file names, from the index only."""
+        keys = {}
+        for path, entry in self.index().items():
+            for key in entry["keys"]:
+                keys.setdefault(key, []).append(os.path.basename(path))
+        return keys
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(practices_dir: Optional[str] = None) -> DescriptionStore:
+    """Shared DescriptionStore for a practices directory (default PRACTICES_DIR)."""
+    practices_dir = practices_dir or config.PRACTICES_DIR
+    with _stores_lock:
+        if practices_dir not in _stores:
+            _stores[practices_dir] = DescriptionStore(practices_dir)
+        return _stores[practices_dir]
@@ -0,0 +1,217 @@
+"""
+Starter-code and vendor file fingerprint index.
+
+Instructor-provided skeletons, CSV loaders and bundled third-party headers are
+registered once per assignment. Each submission is then checked against the
+index so those files can be skipped by static analysis, prompt packing and
+similarity checks.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+SOURCE_EXTENSIONS = (".cpp", ".h", ".hpp")
+
+
+CPP_KEYWORDS = frozenset(
+    """
+    auto bool break case catch char class const constexpr continue default
+    delete do double else enum explicit false float for friend if inline int
+    long namespace new nullptr operator override private protected public
+    return short signed sizeof static struct switch template this throw true
+    try typedef typename unsigned using virtual void while
+    """.split()
+)
+
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+    |(?P<preproc>^[ \t]*\#[^\n]*)
+    |(?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+    |(?P<number>\b\d[\w.']*)
+    |(?P<ident>[A-Za-z_]\w*)
+    |(?P<op>::|->|<<=?|>>=?|&&|\|\||\+\+|--|[-+*/%=!<>&|^]=?|[{}()\[\];,.?:~])
+    |(?P<ws>\s+)
+    """,
+    re.S | re.M | re.X,
+)
+
+
+def tokenize_source(
+    source: str, normalize_identifiers: bool = True
+) -> List[Tuple[str, int]]:
+    """Tokenize C++ source into (token, line) pairs with comments and layout dropped.
+
+    With normalize_identifiers, non-keyword identifiers become "ID" and
+    string/number literals become "STR"/"NUM", so renamed copies still match.
+    """
+    tokens = []
+    line = 1
+    for match in _TOKEN_RE.finditer(source):
+        kind = match.lastgroup
+        text = match.group()
+
+        if kind == "preproc":
+            tokens.append((" ".join(text.split()), line))
+        elif kind == "string":
+            tokens.append(("STR" if normalize_identifiers else text, line))
+        elif kind == "number":
+            tokens.append(("NUM" if normalize_identifiers else text, line))
+        elif kind == "ident":
+            if normalize_identifiers and text not in CPP_KEYWORDS:
+                tokens.append(("ID", line))
+            else:
+                tokens.append((text, line))
+        elif kind == "op":
+            tokens.append((text, line))
+
+        line += text.count("\n")
+
+    return tokens
+
+
+def file_sha256(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's raw bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def token_hash(source: str) -> Tuple[str, int]:
+    """Return (hash, token_count) of the layout-normalized token stream."""
+    tokens = [tok for tok, _ in tokenize_source(source, normalize_identifiers=False)]
+    digest = hashlib.sha256("\x1f".join(tokens).encode("utf-8")).hexdigest()
+    return digest, len(tokens)
+
+
+def _index_path(assignment: str) -> str:
+    return os.path.join(
+        config.FINGERPRINT_CONFIG["starter_index_dir"], f"{assignment}.json"
+    )
+
+
+def _iter_source_files(root_dir: str):
+    for root, _, files in os.walk(root_dir):
+        for file in files:
+            if file.endswith(SOURCE_EXTENSIONS):
+                yield os.path.join(root, file)
+
+
+def load_starter_index(assignment: str) -> dict:
+    """Load the starter index for an assignment (empty index if none exists)."""
+    path = _index_path(assignment)
+    if not os.path.exists(path):
+        return {"assignment": assignment, "files": []}
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"Failed to load starter index {path}: {e}")
+        return {"assignment": assignment, "files": []}
+
+
+def build_starter_index(assignment: str, source_dirs: List[str]) -> str:
+    """Register every source file under source_dirs as starter code for assignment.
+
+    Existing entries are kept; files are de-duplicated by SHA-256.
+    Returns the path of the saved index.
+    """
+    index = load_starter_index(assignment)
+    known = {entry["sha256"] for entry in index["files"]}
+    added = 0
+
+    for source_dir in source_dirs:
+        if not os.path.exists(source_dir):
+            logger.warning(f"Starter source directory not found: {source_dir}")
+            continue
+
+        for file_path in _iter_source_files(source_dir):
+            sha = file_sha256(file_path)
+            if sha in known:
+                continue
+
+            with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+                normalized_hash, token_count = token_hash(f.read())
+
+            index["files"].append(
+                {
+                    "path": os.path.relpath(file_path, source_dir),
+                    "sha256": sha,
+                    "token_hash": normalized_hash,
+                    "tokens": token_count,
+                    "source": os.path.abspath(source_dir),
+                }
+            )
+            known.add(sha)
+            added += 1
+
+    index["updated"] = datetime.now().isoformat()
+
+    path = _index_path(assignment)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+
+    logger.info(
+        f"Starter index for {assignment}: {added} new files, {len(index['files'])} total"
+    )
+    return path
+
+
+def find_starter_files(
+    project_path: str, assignment: str, index: Optional[dict] = None
+) -> List[Dict[str, str]]:
+    """Return submission files matching the assignment's starter index.
+
+    Each entry has the file path relative to project_path, the match kind
+    ("exact" or "normalized") and the indexed starter path it matched.
+    """
+    if index is None:
+        index = load_starter_index(assignment)
+    if not index["files"]:
+        return []
+
+    min_tokens = config.FINGERPRINT_CONFIG["min_tokens"]
+    by_sha = {entry["sha256"]: entry for entry in index["files"]}
+    by_tokens = {
+        entry["token_hash"]: entry
+        for entry in index["files"]
+        if entry["tokens"] >= min_tokens
+    }
+
+    matches = []
+    for file_path in _iter_source_files(project_path):
+        rel_path = os.path.relpath(file_path, project_path)
+        try:
+            entry = by_sha.get(file_sha256(file_path))
+            kind = "exact"
+            if entry is None:
+                with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+                    entry = by_tokens.get(token_hash(f.read())[0])
+                kind = "normalized"
+        except OSError as e:
+            logger.warning(f"Could not fingerprint {file_path}: {e}")
+            continue
+
+        if entry is not None:
+            matches.append({"path": rel_path, "match": kind, "starter": entry["path"]})
+
+    if matches:
+        logger.info(
+            f"Excluding {len(matches)} starter/vendor files from {project_path}"
+        )
+    return matches
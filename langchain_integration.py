@@ -1,17 +1,30 @@
 import os
+import re
 import json
+import sqlite3
+import hashlib
+import time
 import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Annotated, Optional
 from dotenv import load_dotenv
-from pydantic import BaseModel, Field
-import google.generativeai as genai
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, create_model
 
 load_dotenv()
 
 
-from config import MODEL_CONFIG
-
-genai.configure(api_key=MODEL_CONFIG["api_key"])
+from config import (
+    MODEL_CONFIG,
+    GRADING_CONFIG,
+    ROUTING_CONFIG,
+    BATCH_GRADING_CONFIG,
+    ARTIFACT_ARCHIVE_CONFIG,
+)
+import artifact_archive
+import llm_clients
+import telemetry
 
 
 def setup_logging():
@@ -469,6 +482,28 @@ class A6GradingOutput(BaseModel):
     generated_comment: str = Field(description="Constructive feedback comment")
 
 
+def _a6_phase_model(name: str, prefix: str):
+    """Build a phase sub-model from the A6GradingOutput fields with the given prefix."""
+    fields = {
+        field_name: (field.annotation, field)
+        for field_name, field in A6GradingOutput.model_fields.items()
+        if field_name.startswith(prefix) or field_name == "generated_comment"
+    }
+    return create_model(name, **fields)
+
+
+A6Phase1GradingOutput = _a6_phase_model("A6Phase1GradingOutput", "p1_")
+A6Phase2GradingOutput = _a6_phase_model("A6Phase2GradingOutput", "p2_")
+A6Phase3GradingOutput = _a6_phase_model("A6Phase3GradingOutput", "p3_")
+
+
+A6_PHASE_MODELS = {
+    "phase1": A6Phase1GradingOutput,
+    "phase2": A6Phase2GradingOutput,
+    "phase3": A6Phase3GradingOutput,
+}
+
+
 def get_grading_model(assignment_type):
     """Returns the appropriate grading model for the assignment type."""
     models = {
@@ -482,6 +517,24 @@ def get_grading_model(assignment_type):
     return models.get(assignment_type, A1GradingOutput)
 
 
+def grading_prompt_version(assignment_type: str) -> str:
+    """Content-hash version of the prompts that grade an assignment.
+
+    Taken from prompts.get_grading_template; with concurrent A6 phases it
+    combines the three phase templates. Cached LLM outputs are only reused
+    when their version matches.
+    """
+    from prompts import get_grading_template
+
+    if assignment_type == "A6" and GRADING_CONFIG["a6_concurrent_phases"]:
+        versions = "".join(
+            get_grading_template("A6", phase_model, phase)[1]
+            for phase, phase_model in A6_PHASE_MODELS.items()
+        )
+        return hashlib.sha256(versions.encode("utf-8")).hexdigest()[:16]
+    return get_grading_template(assignment_type, get_grading_model(assignment_type))[1]
+
+
 def get_grading_prompt(
     assignment_type,
     practice_description,
@@ -502,92 +555,489 @@ def get_grading_prompt(
     )
 
 
-def grade_student_project(
-    test_results: str,
-    static_analysis: str,
-    source_code: str,
-    practice_description: str,
-    assignment_type: str = "A1",
-    student_id: str = None,
-    save_outputs: bool = True,
-) -> BaseModel:
-    """Grades a student project using Gemini API with assignment-specific criteria."""
+def _grading_cache_path(full_prompt: str, model_name: str = None) -> str:
+    """Cache file for a grading prompt, keyed by model, generation config and prompt."""
+    key_material = json.dumps(
+        {
+            "model": model_name or MODEL_CONFIG["model"],
+            "generation": MODEL_CONFIG["grading"],
+            "structured_output": GRADING_CONFIG["structured_output"],
+            "prompt": full_prompt,
+        },
+        sort_keys=True,
+    )
+    key = hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+    return os.path.join(GRADING_CONFIG["cache_dir"], f"{key}.json")
 
-    import os
-    import json
-    from datetime import datetime
 
-    grading_model = get_grading_model(assignment_type)
-    prompt = get_grading_prompt(
-        assignment_type,
-        practice_description,
-        test_results,
-        static_analysis,
-        source_code,
+def _legacy_artifacts() -> bool:
+    return (
+        ARTIFACT_ARCHIVE_CONFIG["legacy_files"] or not ARTIFACT_ARCHIVE_CONFIG["enabled"]
     )
 
-    model = genai.GenerativeModel(
-        MODEL_CONFIG["model"],
-        generation_config=genai.types.GenerationConfig(
-            temperature=MODEL_CONFIG["grading"]["temperature"],
-            top_p=MODEL_CONFIG["grading"]["top_p"],
-            top_k=MODEL_CONFIG["grading"]["top_k"],
-            max_output_tokens=MODEL_CONFIG["grading"]["max_output_tokens"],
-        ),
-    )
 
-    from prompts import get_format_instructions
+def _legacy_artifact_name(stem: str, extension: str) -> str:
+    # Microseconds keep attempts and concurrent runs from overwriting each other
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return os.path.join(
+        os.getcwd(), "grading_outputs", f"{stem}_{timestamp}{extension}"
+    )
 
-    format_instructions = get_format_instructions(assignment_type, grading_model)
 
-    full_prompt = prompt + format_instructions
+def _archive_raw_response(
+    response_text: str,
+    student_id: Optional[str],
+    label: str,
+    **metadata,
+) -> Optional[str]:
+    """Append a raw LLM response to the artifact archive.
 
-    max_retries = MODEL_CONFIG["retry"]["max_retries"]
-    for attempt in range(max_retries):
+    Returns the legacy grading_outputs/raw_*.txt path to save the response
+    to as well (ARTIFACT_LEGACY_FILES, or the archive disabled), else None.
+    """
+    if ARTIFACT_ARCHIVE_CONFIG["enabled"]:
         try:
-            logger.info(
-                f"Starting grading attempt {attempt + 1} for student {student_id}, assignment {assignment_type}"
+            artifact_archive.get_archive().append(
+                "raw_response",
+                {"text": response_text, **metadata},
+                student_id=student_id,
+                assignment=label.split("_")[0],
+                label=label,
             )
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Failed to archive raw response for {label}: {e}")
+    if not _legacy_artifacts():
+        return None
+    return _legacy_artifact_name(f"raw_{student_id}_{label}", ".txt")
+
+
+def _response_generation_config(
+    grading_model, fields=None, model=None
+) -> Optional[dict]:
+    """Per-request generation config constraining output to grading_model's schema.
+
+    Returns None when structured output is disabled, so the model's own
+    generation config and the text format instructions are used alone. The
+    synthetic backend then gets the schema as "synthetic_schema", to draw
+    its reply from; it is not a constraint and no other backend reads it.
+    """
+    from prompts import get_response_schema
+
+    if not GRADING_CONFIG["structured_output"]:
+        if getattr(model, "backend", None) != "synthetic":
+            return None
+        return {"synthetic_schema": get_response_schema(grading_model, fields)}
+
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": get_response_schema(grading_model, fields),
+    }
 
-            response = model.generate_content(full_prompt)
-
-            from prompts import parse_and_validate_response
-
-            response_text = response.text
-
-            def _validator(d: dict):
 
-                grading_model(**d)
+_field_validator_cache = {}
+
+
+def _field_validators(grading_model) -> dict:
+    """Per-field validators (type plus ge/le constraints) for a grading model."""
+    validators = _field_validator_cache.get(grading_model)
+    if validators is None:
+        validators = {
+            name: TypeAdapter(Annotated[field.annotation, field])
+            for name, field in grading_model.model_fields.items()
+        }
+        _field_validator_cache[grading_model] = validators
+    return validators
+
+
+def _stream_response(
+    model, full_prompt: str, generation_config, grading_model, stats: Counter
+) -> tuple:
+    """Stream a grading response, validating each field as soon as it completes.
+
+    Returns (response_text, first_score_time, last_chunk), where
+    first_score_time is the perf_counter time the first valid score arrived
+    and last_chunk carries the usage metadata of the whole stream. A reply
+    that is not a bare object (prose before it, a malformed field) is read to
+    the end without field checks and left to the lenient parser. Only a
+    stream with no object in sight (StreamingJSONFieldParser.hopeless) raises
+    ValueError and stops reading; dropping the stream iterator ends the
+    request. Fields that fail their constraints are left for _repair_fields
+    once the stream completes.
+    """
+    from prompts import StreamingJSONFieldParser
+
+    validators = _field_validators(grading_model)
+    parser = StreamingJSONFieldParser()
+    first_score_time = None
+    last_chunk = None
+    parts = []
+
+    for chunk in model.generate_content(
+        full_prompt, generation_config=generation_config, stream=True
+    ):
+        last_chunk = chunk
+        parts.append(chunk.text)
+        for name, value in parser.feed(chunk.text):
+            validator = validators.get(name)
+            if validator is None:
+                continue
+            try:
+                validator.validate_python(value)
+            except ValidationError:
+                stats["stream_invalid_fields"] += 1
+                continue
+            if first_score_time is None and name != "generated_comment":
+                first_score_time = time.perf_counter()
+
+        if parser.hopeless:
+            stats["stream_cancels"] += 1
+            received = "".join(parts)
+            raise ValueError(
+                f"Cancelled stream without a JSON object after {len(received)} characters: {received[:200]!r}"
+            )
 
-            parsed = parse_and_validate_response(
-                response_text,
-                validator=_validator,
-                description=f"grading for {student_id} {assignment_type}",
-                save_raw_to=os.path.join(
-                    os.getcwd(),
-                    "grading_outputs",
-                    f"raw_{student_id}_{assignment_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+    if parser.off_format:
+        stats["stream_off_format"] += 1
+    return "".join(parts), first_score_time, last_chunk
+
+
+def _model_name(model) -> str:
+    """Bare model name served by a handle (e.g. "gemini-2.0-flash")."""
+    name = getattr(model, "model_name", None) or MODEL_CONFIG["model"]
+    return name.split("/")[-1]
+
+
+def _record_call(
+    model,
+    stats: Counter,
+    stage: str,
+    label: str,
+    student_id: str,
+    start: float,
+    outcome: str,
+    prompt: str,
+    attempt: int = 1,
+    response=None,
+    response_text: str = "",
+    cache_hit: bool = False,
+):
+    """Emit a telemetry record for one LLM call made for label (e.g. "A6_phase1").
+
+    Token counts and estimated cost are also added to stats.
+    """
+    record = telemetry.record_llm_call(
+        stage,
+        label.split("_")[0],
+        student_id,
+        time.perf_counter() - start,
+        outcome,
+        attempt=attempt,
+        cache_hit=cache_hit,
+        response=response,
+        prompt_chars=len(prompt),
+        response_chars=len(response_text or ""),
+        label=label,
+        model=_model_name(model),
+        backend=getattr(model, "backend", "live"),
+    )
+    stats["prompt_tokens"] += record["prompt_tokens"] or 0
+    stats["output_tokens"] += record["output_tokens"] or 0
+    stats["cost_usd"] += record["cost_usd"]
+
+
+def _failure_outcome(error: Exception) -> str:
+    from prompts import ResponseValidationError
+
+    if isinstance(error, ResponseValidationError):
+        return "validation_error"
+    if isinstance(error, ValueError):
+        return "parse_error"
+    return "error"
+
+
+def _invalid_fields(grading_model, parsed, error) -> Optional[dict]:
+    """Map invalid or missing field names to their validation messages.
+
+    Returns None when the failure cannot be repaired field by field (the
+    response is not an object, or the error is not tied to a model field).
+    """
+    if not isinstance(parsed, dict) or not isinstance(error, ValidationError):
+        return None
+
+    invalid = {}
+    for err in error.errors():
+        loc = err.get("loc") or ()
+        if not loc or loc[0] not in grading_model.model_fields:
+            return None
+        invalid.setdefault(loc[0], err["msg"])
+    return invalid or None
+
+
+def _repair_fields(
+    model,
+    grading_model,
+    parsed: dict,
+    error,
+    student_id: str,
+    label: str,
+    stats: Counter,
+) -> Optional[dict]:
+    """Re-request only the fields that failed validation and merge them back in.
+
+    Returns the repaired dict, or None if the fields could not be repaired
+    within GRADING_CONFIG["max_repair_attempts"] follow-up requests.
+    """
+    from prompts import get_repair_prompt, parse_and_validate_response
+
+    for repair_attempt in range(GRADING_CONFIG["max_repair_attempts"]):
+        invalid = _invalid_fields(grading_model, parsed, error)
+        if invalid is None:
+            return None
+
+        accepted = {
+            k: v
+            for k, v in parsed.items()
+            if k in grading_model.model_fields and k not in invalid
+        }
+        previous = {k: parsed[k] for k in invalid if k in parsed}
+        repair_prompt = get_repair_prompt(
+            label, grading_model, accepted, invalid, previous
+        )
+
+        logger.info(
+            f"Repair attempt {repair_attempt + 1} for student {student_id}, {label}: "
+            f"{', '.join(invalid)}"
+        )
+        stats["repair_requests"] += 1
+        repair_start = time.perf_counter()
+        response = None
+        try:
+            response = model.generate_content(
+                repair_prompt,
+                generation_config=_response_generation_config(
+                    grading_model, list(invalid), model
                 ),
             )
+            fixes = parse_and_validate_response(
+                response.text,
+                description=f"field repair for {student_id} {label}",
+            )
+        except Exception as e:
+            _record_call(
+                model,
+                stats,
+                "repair",
+                label,
+                student_id,
+                repair_start,
+                _failure_outcome(e),
+                repair_prompt,
+                attempt=repair_attempt + 1,
+                response=response,
+            )
+            logger.warning(
+                f"Field repair failed for student {student_id}, {label}: {e}"
+            )
+            return None
+
+        _record_call(
+            model,
+            stats,
+            "repair",
+            label,
+            student_id,
+            repair_start,
+            "ok",
+            repair_prompt,
+            attempt=repair_attempt + 1,
+            response=response,
+            response_text=response.text,
+        )
+
+        if not isinstance(fixes, dict):
+            return None
+        parsed = {**accepted, **{k: v for k, v in fixes.items() if k in invalid}}
 
-            result_dict = parsed
-            grading_output = grading_model(**result_dict)
-
+        try:
+            repaired = grading_model.model_validate(parsed).model_dump()
+            stats["repaired"] += 1
+            return repaired
+        except ValidationError as e:
+            error = e
+
+    return None
+
+
+def _generate_validated(
+    model,
+    full_prompt: str,
+    grading_model,
+    student_id: str,
+    label: str,
+    stats: Optional[Counter] = None,
+    prefix_cache=None,
+) -> dict:
+    """Send one grading prompt, retrying until the response validates against grading_model.
+
+    Successful results are cached on disk by prompt hash, so re-running a
+    request (or one phase of a split request) skips the API call. A response
+    that parses but has invalid or missing fields is repaired with a short
+    follow-up request for just those fields before falling back to a full retry.
+
+    With GRADING_CONFIG["structured_output"], requests carry the model's
+    response schema and a JSON mime type; the lenient text parser is then only
+    needed when a reply is not strict JSON. With GRADING_CONFIG["streaming"],
+    the reply is streamed and a stream without a JSON object is cancelled and
+    retried early (see _stream_response).
+
+    With a prefix_cache (llm_clients.get_prefix_cache), the static prompt
+    prefix is served from the batch's context cache and only the suffix is
+    sent; full_prompt still keys the disk cache and telemetry.
+
+    Attempts, parse failures, validation failures, parser fallbacks, stream
+    cancels and repairs are counted in stats, along with the seconds to the
+    first usable score and the seconds spent on failed attempts.
+    """
+    if stats is None:
+        stats = Counter()
+
+    from prompts import parse_response_model, ResponseValidationError
+
+    cache_path = _grading_cache_path(full_prompt, _model_name(model))
+    if GRADING_CONFIG["cache_enabled"] and os.path.exists(cache_path):
+        cache_start = time.perf_counter()
+        with open(cache_path, "r", encoding="utf-8") as f:
+            logger.info(f"Grading cache hit for student {student_id}, {label}")
+            stats["cache_hits"] += 1
+            cached = grading_model.model_validate(json.load(f)).model_dump()
+        _record_call(
+            model,
+            stats,
+            "grading",
+            label,
+            student_id,
+            cache_start,
+            "cache_hit",
+            full_prompt,
+            cache_hit=True,
+        )
+        return cached
+
+    stats["requests"] += 1
+    generation_config = _response_generation_config(grading_model, model=model)
+    response_text = ""
+    request_start = time.perf_counter()
+    max_retries = MODEL_CONFIG["retry"]["max_retries"]
+    for attempt in range(max_retries):
+        attempt_start = time.perf_counter()
+        response = None
+        response_text = ""
+        try:
             logger.info(
-                f"Successfully graded student {student_id} for {assignment_type}"
+                f"Starting grading attempt {attempt + 1} for student {student_id}, {label}"
             )
 
-            if save_outputs and student_id:
-                saved_path = save_grading_output(
-                    grading_output, assignment_type, student_id, result_dict
+            stats["attempts"] += 1
+            handle, prompt = model, full_prompt
+            if prefix_cache is not None:
+                handle, prompt = prefix_cache.request(model, full_prompt)
+            if GRADING_CONFIG["streaming"]:
+                response_text, first_score_time, response = _stream_response(
+                    handle, prompt, generation_config, grading_model, stats
+                )
+            else:
+                response = handle.generate_content(
+                    prompt, generation_config=generation_config
+                )
+                response_text = response.text
+                first_score_time = time.perf_counter()
+            if prefix_cache is not None:
+                prefix_cache.record_usage(response)
+            try:
+                grading_output, strict = parse_response_model(
+                    response_text,
+                    grading_model,
+                    description=f"grading for {student_id} {label}",
+                    save_raw_to=_archive_raw_response(
+                        response_text,
+                        student_id,
+                        label,
+                        attempt=attempt + 1,
+                        model=_model_name(model),
+                    ),
+                )
+            except ResponseValidationError as e:
+                stats["validation_failures"] += 1
+                _record_call(
+                    model,
+                    stats,
+                    "grading",
+                    label,
+                    student_id,
+                    attempt_start,
+                    "validation_error",
+                    full_prompt,
+                    attempt=attempt + 1,
+                    response=response,
+                    response_text=response_text,
+                )
+                logger.warning(
+                    f"Validation failed (attempt {attempt + 1}) for student {student_id}, {label}: {e.cause}"
+                )
+                parsed = _repair_fields(
+                    model, grading_model, e.parsed, e.cause, student_id, label, stats
+                )
+                if parsed is None:
+                    raise
+            except ValueError:
+                stats["parse_failures"] += 1
+                raise
+            else:
+                if not strict:
+                    stats["parser_fallbacks"] += 1
+                parsed = grading_output.model_dump()
+                _record_call(
+                    model,
+                    stats,
+                    "grading",
+                    label,
+                    student_id,
+                    attempt_start,
+                    "ok",
+                    full_prompt,
+                    attempt=attempt + 1,
+                    response=response,
+                    response_text=response_text,
                 )
-                logger.info(f"Grading output saved to {saved_path}")
 
-            return grading_output
+            stats["first_score_seconds"] += (
+                first_score_time or time.perf_counter()
+            ) - request_start
+
+            if GRADING_CONFIG["cache_enabled"]:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                with open(cache_path, "w", encoding="utf-8") as f:
+                    json.dump(parsed, f, ensure_ascii=False)
+
+            return parsed
 
         except json.JSONDecodeError as e:
+            stats["failed_attempt_seconds"] += time.perf_counter() - attempt_start
+            _record_call(
+                model,
+                stats,
+                "grading",
+                label,
+                student_id,
+                attempt_start,
+                "parse_error",
+                full_prompt,
+                attempt=attempt + 1,
+                response=response,
+                response_text=response_text,
+            )
             logger.warning(
-                f"JSON parsing failed (attempt {attempt + 1}) for student {student_id}: {e}"
+                f"JSON parsing failed (attempt {attempt + 1}) for student {student_id}, {label}: {e}"
             )
             if attempt == max_retries - 1:
                 logger.error(
@@ -598,8 +1048,23 @@ def grade_student_project(
                 )
             continue
         except Exception as e:
+            stats["failed_attempt_seconds"] += time.perf_counter() - attempt_start
+            if not isinstance(e, ResponseValidationError):
+                _record_call(
+                    model,
+                    stats,
+                    "grading",
+                    label,
+                    student_id,
+                    attempt_start,
+                    _failure_outcome(e),
+                    full_prompt,
+                    attempt=attempt + 1,
+                    response=response,
+                    response_text=response_text,
+                )
             logger.error(
-                f"API call failed (attempt {attempt + 1}) for student {student_id}: {e}"
+                f"API call failed (attempt {attempt + 1}) for student {student_id}, {label}: {e}"
             )
             if attempt == max_retries - 1:
                 logger.error(
@@ -614,26 +1079,772 @@ def grade_student_project(
     raise ValueError("Unexpected error in grading function")
 
 
+def _grade_a6_phases(
+    model,
+    test_results: str,
+    static_analysis: str,
+    source_code: str,
+    practice_description: str,
+    student_id: str,
+    stats: Counter,
+) -> dict:
+    """Grade the three A6 phases as concurrent requests and merge them into one result.
+
+    Each phase has its own sub-model, retries and cache entry, so wall time is
+    roughly that of the slowest phase and one bad phase response does not
+    force the others to be regenerated.
+    """
+    from prompts import get_grading_prompt_parts
+
+    def _phase_prompt(phase: str, phase_model) -> tuple:
+        return get_grading_prompt_parts(
+            "A6",
+            phase_model,
+            practice_description,
+            test_results,
+            static_analysis,
+            source_code,
+            phase=phase,
+        )
+
+    return _run_a6_phases(model, _phase_prompt, student_id, stats)
+
+
+def _run_a6_phases(
+    model, phase_prompt, student_id: str, stats: Counter, label: str = ""
+) -> dict:
+    """Send one request per A6 phase concurrently and merge the phase results.
+
+    phase_prompt(phase, phase_model) returns the (prefix, suffix) of a
+    phase's prompt; label is appended to the request labels (e.g. "_diff").
+    """
+    phase_stats = {phase: Counter() for phase in A6_PHASE_MODELS}
+
+    def _grade_phase(phase: str) -> dict:
+        phase_model = A6_PHASE_MODELS[phase]
+        prefix, suffix = phase_prompt(phase, phase_model)
+        return _generate_validated(
+            model,
+            prefix + suffix,
+            phase_model,
+            student_id,
+            f"A6_{phase}{label}",
+            phase_stats[phase],
+            llm_clients.get_prefix_cache(
+                "grading", f"A6_{phase}", prefix, _model_name(model)
+            ),
+        )
+
+    with ThreadPoolExecutor(max_workers=len(A6_PHASE_MODELS)) as executor:
+        futures = {
+            phase: executor.submit(_grade_phase, phase) for phase in A6_PHASE_MODELS
+        }
+        phase_results = {phase: future.result() for phase, future in futures.items()}
+
+    for counts in phase_stats.values():
+        stats.update(counts)
+
+    merged = {}
+    comments = []
+    for phase, result in phase_results.items():
+        comment = result.pop("generated_comment", "")
+        merged.update(result)
+        comments.append(f"**{phase.replace('phase', 'Phase ')}:** {comment}")
+    merged["generated_comment"] = "\n\n".join(comments)
+
+    return merged
+
+
+def _grade_request(
+    model,
+    assignment_type: str,
+    grading_model,
+    test_results: str,
+    static_analysis: str,
+    source_code: str,
+    practice_description: str,
+    student_id: str,
+    stats: Counter,
+) -> dict:
+    """Grade one submission with a model handle (A6 as concurrent phases)."""
+    if assignment_type == "A6" and GRADING_CONFIG["a6_concurrent_phases"]:
+        return _grade_a6_phases(
+            model,
+            test_results,
+            static_analysis,
+            source_code,
+            practice_description,
+            student_id,
+            stats,
+        )
+
+    from prompts import get_grading_prompt_parts
+
+    prefix, suffix = get_grading_prompt_parts(
+        assignment_type,
+        grading_model,
+        practice_description,
+        test_results,
+        static_analysis,
+        source_code,
+    )
+    return _generate_validated(
+        model,
+        prefix + suffix,
+        grading_model,
+        student_id,
+        assignment_type,
+        stats,
+        llm_clients.get_prefix_cache(
+            "grading", assignment_type, prefix, _model_name(model)
+        ),
+    )
+
+
+_PASS_RATE_RE = re.compile(r"(\d+)/(\d+)\s+(?:tests\s+)?passed")
+
+
+def _test_pass_rate(test_results: str) -> Optional[float]:
+    """Pass rate from the last "N/M passed" line of a test summary, if any."""
+    matches = _PASS_RATE_RE.findall(test_results or "")
+    if not matches:
+        return None
+    passed, total = (int(n) for n in matches[-1])
+    return passed / total if total else None
+
+
+def _score_fraction(grading_model, result: dict) -> Optional[float]:
+    """Sum of LLM scores as a fraction of their maximum (le bounds)."""
+    total = maximum = 0.0
+    for name, field in grading_model.model_fields.items():
+        upper = next(
+            (m.le for m in field.metadata if getattr(m, "le", None) is not None),
+            None,
+        )
+        if upper is None or name not in result:
+            continue
+        total += float(result[name])
+        maximum += upper
+    return total / maximum if maximum else None
+
+
+def _escalation_triggers(
+    grading_model, result: dict, fast_stats: Counter, pass_rate: Optional[float]
+) -> list:
+    """Configured escalation triggers that fire for a fast-tier grading result."""
+    routing_config = ROUTING_CONFIG
+    enabled = routing_config["triggers"]
+    triggers = []
+
+    if "validation_failure" in enabled and fast_stats["validation_failures"]:
+        triggers.append("validation_failure")
+
+    fraction = _score_fraction(grading_model, result)
+    if fraction is None:
+        return triggers
+
+    if "boundary" in enabled and any(
+        abs(fraction * 100 - boundary) <= routing_config["boundary_margin"]
+        for boundary in routing_config["grade_boundaries"]
+    ):
+        triggers.append("boundary")
+
+    if (
+        "test_disagreement" in enabled
+        and pass_rate is not None
+        and abs(fraction - pass_rate) > routing_config["disagreement_threshold"]
+    ):
+        triggers.append("test_disagreement")
+
+    return triggers
+
+
+def _tier_summary(model_name: str, start: float, stats: Counter) -> dict:
+    return {
+        "model": model_name,
+        "seconds": round(time.perf_counter() - start, 3),
+        "prompt_tokens": stats["prompt_tokens"],
+        "output_tokens": stats["output_tokens"],
+        "cost_usd": round(stats["cost_usd"], 6),
+    }
+
+
+def _grade_with_routing(
+    assignment_type: str,
+    grading_model,
+    test_results: str,
+    static_analysis: str,
+    source_code: str,
+    practice_description: str,
+    student_id: str,
+    pass_rate: Optional[float],
+    stats: Counter,
+) -> tuple:
+    """Grade with the fast tier, escalating to the strong tier when a trigger fires.
+
+    Returns (result_dict, decision). The decision records the triggers, the
+    per-tier time, tokens and cost, and for non-escalated submissions the
+    estimated cost saved versus grading the same tokens on the strong model.
+    """
+    routing_config = ROUTING_CONFIG
+    fast_model, strong_model = (
+        routing_config["fast_model"],
+        routing_config["strong_model"],
+    )
+    request = (
+        assignment_type,
+        grading_model,
+        test_results,
+        static_analysis,
+        source_code,
+        practice_description,
+        student_id,
+    )
+    decision = {
+        "fast_model": fast_model,
+        "strong_model": strong_model,
+        "triggers": [],
+        "escalated": False,
+    }
+
+    result = None
+    if (
+        "large_submission" in routing_config["triggers"]
+        and len(source_code) > routing_config["max_fast_source_chars"]
+    ):
+        decision["triggers"].append("large_submission")
+    else:
+        fast_stats = Counter()
+        start = time.perf_counter()
+        try:
+            result = _grade_request(
+                llm_clients.get_stage_model("grading", fast_model),
+                *request,
+                fast_stats,
+            )
+        except ValueError as e:
+            logger.warning(f"Fast tier failed for student {student_id}: {e}")
+            decision["triggers"].append("validation_failure")
+        else:
+            decision["triggers"] += _escalation_triggers(
+                grading_model, result, fast_stats, pass_rate
+            )
+        decision["fast"] = _tier_summary(fast_model, start, fast_stats)
+        stats.update(fast_stats)
+
+    if decision["triggers"]:
+        decision["escalated"] = True
+        strong_stats = Counter()
+        start = time.perf_counter()
+        result = _grade_request(
+            llm_clients.get_stage_model("grading", strong_model),
+            *request,
+            strong_stats,
+        )
+        decision["strong"] = _tier_summary(strong_model, start, strong_stats)
+        decision["estimated_cost_saved_usd"] = -decision.get("fast", {}).get(
+            "cost_usd", 0.0
+        )
+        stats.update(strong_stats)
+    else:
+        fast = decision["fast"]
+        strong_cost = telemetry.estimate_cost(
+            fast["prompt_tokens"], fast["output_tokens"], strong_model
+        )
+        decision["estimated_cost_saved_usd"] = round(strong_cost - fast["cost_usd"], 6)
+
+    logger.info(
+        f"Routing for student {student_id} ({assignment_type}): "
+        f"{'escalated to ' + strong_model if decision['escalated'] else 'kept ' + fast_model}"
+        f"{' (' + ', '.join(decision['triggers']) + ')' if decision['triggers'] else ''}"
+    )
+    return result, decision
+
+
+def grade_student_project(
+    test_results: str,
+    static_analysis: str,
+    source_code: str,
+    practice_description: str,
+    assignment_type: str = "A1",
+    student_id: str = None,
+    save_outputs: bool = True,
+    test_pass_rate: Optional[float] = None,
+) -> BaseModel:
+    """Grades a student project using Gemini API with assignment-specific criteria.
+
+    With ROUTING_CONFIG["enabled"], the submission is graded by the fast tier
+    first and escalated to the strong tier only when a configured trigger
+    fires; test_pass_rate (0-1, parsed from test_results if omitted) feeds
+    the test-disagreement trigger.
+    """
+
+    grading_model = get_grading_model(assignment_type)
+    response_stats = Counter()
+    routing = None
+
+    if ROUTING_CONFIG["enabled"]:
+        if test_pass_rate is None:
+            test_pass_rate = _test_pass_rate(test_results)
+        result_dict, routing = _grade_with_routing(
+            assignment_type,
+            grading_model,
+            test_results,
+            static_analysis,
+            source_code,
+            practice_description,
+            student_id,
+            test_pass_rate,
+            response_stats,
+        )
+    else:
+        result_dict = _grade_request(
+            llm_clients.get_stage_model("grading"),
+            assignment_type,
+            grading_model,
+            test_results,
+            static_analysis,
+            source_code,
+            practice_description,
+            student_id,
+            response_stats,
+        )
+
+    # Every path above returns a dict that was already validated against
+    # grading_model (or its A6 phase sub-models), so skip a second validation.
+    grading_output = grading_model.model_construct(**result_dict)
+
+    logger.info(
+        f"Successfully graded student {student_id} for {assignment_type} "
+        f"(response stats: {dict(response_stats)})"
+    )
+
+    if save_outputs and student_id:
+        saved_path = save_grading_output(
+            grading_output,
+            assignment_type,
+            student_id,
+            result_dict,
+            response_stats,
+            routing,
+        )
+        logger.info(f"Grading output saved to {saved_path}")
+
+    return grading_output
+
+
+def grade_near_duplicate(
+    assignment_type: str,
+    twin: dict,
+    diff_text: str,
+    test_results: str,
+    static_analysis: str,
+    student_id: str = None,
+    save_outputs: bool = True,
+) -> BaseModel:
+    """Grade a near-duplicate submission with a diff-only review of its graded twin.
+
+    The request carries the usual static prefix (so it shares the batch's
+    context cache) but only the twin's grades and the source diff instead of
+    the full source tree.
+
+    A6 is reviewed per phase, like a full A6 grading, with each phase's
+    grades of the twin and its own sub-model.
+
+    Args:
+        twin: Match from submission_reuse.ReuseStore.find (kind "near")
+        diff_text: Unified diff from the twin's source to this submission
+    """
+    from prompts import get_grading_prompt_parts, get_diff_review_inputs
+
+    grading_model = get_grading_model(assignment_type)
+    model = llm_clients.get_stage_model("grading")
+    response_stats = Counter()
+
+    if assignment_type == "A6" and GRADING_CONFIG["a6_concurrent_phases"]:
+
+        def _phase_prompt(phase: str, phase_model) -> tuple:
+            prefix, _ = get_grading_prompt_parts(
+                "A6", phase_model, "", "", "", "", phase=phase
+            )
+            twin_result = {
+                name: value
+                for name, value in twin["grading_result"].items()
+                if name in phase_model.model_fields
+            }
+            return prefix, get_diff_review_inputs(
+                twin_result,
+                diff_text,
+                twin["similarity"],
+                test_results,
+                static_analysis,
+            )
+
+        result_dict = _run_a6_phases(
+            model, _phase_prompt, student_id, response_stats, label="_diff"
+        )
+    else:
+        prefix, _ = get_grading_prompt_parts(
+            assignment_type, grading_model, "", "", "", ""
+        )
+        suffix = get_diff_review_inputs(
+            twin["grading_result"],
+            diff_text,
+            twin["similarity"],
+            test_results,
+            static_analysis,
+        )
+        result_dict = _generate_validated(
+            model,
+            prefix + suffix,
+            grading_model,
+            student_id,
+            f"{assignment_type}_diff",
+            response_stats,
+            llm_clients.get_prefix_cache(
+                "grading", assignment_type, prefix, _model_name(model)
+            ),
+        )
+    grading_output = grading_model(**result_dict)
+
+    if save_outputs and student_id:
+        save_grading_output(
+            grading_output,
+            assignment_type,
+            student_id,
+            result_dict,
+            response_stats,
+            reuse={
+                "kind": "near",
+                "twin_student_id": twin["student_id"],
+                "similarity": twin["similarity"],
+                "diff_chars": len(diff_text),
+            },
+        )
+    return grading_output
+
+
+def _estimated_tokens(text: str) -> int:
+    return len(text) // BATCH_GRADING_CONFIG["chars_per_token"] + 1
+
+
+def _pack_batches(assignment_type: str, grading_model, submissions: list) -> tuple:
+    """Greedily pack submissions into batches under the prompt token budget.
+
+    Returns (batches, singles): submissions that would not fit in a batch
+    on their own are graded individually.
+    """
+    from prompts import get_batch_grading_prompt_parts
+
+    prefix, _ = get_batch_grading_prompt_parts(assignment_type, grading_model, [])
+    budget = BATCH_GRADING_CONFIG["max_prompt_tokens"] - _estimated_tokens(prefix)
+
+    batches, singles, current, used = [], [], [], 0
+    for submission in submissions:
+        size = _estimated_tokens(
+            submission["practice_description"]
+            + submission["test_results"]
+            + submission["static_analysis"]
+            + submission["source_code"]
+        )
+        if size > budget:
+            singles.append(submission)
+            continue
+        if current and (
+            used + size > budget
+            or len(current) >= BATCH_GRADING_CONFIG["max_submissions"]
+        ):
+            batches.append(current)
+            current, used = [], 0
+        current.append(submission)
+        used += size
+    if current:
+        batches.append(current)
+    return batches, singles
+
+
+def _grade_batch(
+    model, assignment_type: str, grading_model, batch: list, stats: Counter
+) -> dict:
+    """Grade a batch of submissions in one request.
+
+    Returns {student_id: result dict} for the items that came back valid
+    (cached by neutral submission ID, so identical inputs hit the cache);
+    a failed request or an invalid, missing or unknown item simply leaves
+    those students out, for the caller to grade individually.
+    """
+    from prompts import (
+        get_batch_grading_prompt_parts,
+        get_batch_response_schema,
+        parse_and_validate_response,
+    )
+
+    # Neutral IDs keep student identities out of the prompt and cache key
+    ids = {f"S{i + 1}": submission for i, submission in enumerate(batch)}
+    prefix, suffix = get_batch_grading_prompt_parts(
+        assignment_type,
+        grading_model,
+        [
+            {
+                "submission_id": submission_id,
+                "practice_description": submission["practice_description"],
+                "test_results": submission["test_results"],
+                "static_analysis": submission["static_analysis"],
+                "source_code": submission["source_code"],
+            }
+            for submission_id, submission in ids.items()
+        ],
+    )
+    full_prompt = prefix + suffix
+    label = f"{assignment_type}_batch"
+    batch_id = ",".join(submission["student_id"] for submission in batch)
+
+    cache_path = _grading_cache_path(full_prompt, _model_name(model))
+    if GRADING_CONFIG["cache_enabled"] and os.path.exists(cache_path):
+        cache_start = time.perf_counter()
+        with open(cache_path, "r", encoding="utf-8") as f:
+            stats["cache_hits"] += 1
+            cached = json.load(f)
+        _record_call(
+            model,
+            stats,
+            "grading",
+            label,
+            batch_id,
+            cache_start,
+            "cache_hit",
+            full_prompt,
+            cache_hit=True,
+        )
+        return {
+            ids[sid]["student_id"]: grading_model.model_validate(item).model_dump()
+            for sid, item in cached.items()
+        }
+
+    generation_config = None
+    if GRADING_CONFIG["structured_output"]:
+        generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": get_batch_response_schema(grading_model, list(ids)),
+        }
+    elif getattr(model, "backend", None) == "synthetic":
+        generation_config = {
+            "synthetic_schema": get_batch_response_schema(grading_model, list(ids))
+        }
+
+    stats["requests"] += 1
+    prefix_cache = llm_clients.get_prefix_cache(
+        "grading", label, prefix, _model_name(model)
+    )
+    start = time.perf_counter()
+    response = None
+    response_text = ""
+    try:
+        handle, prompt = prefix_cache.request(model, full_prompt)
+        response = handle.generate_content(prompt, generation_config=generation_config)
+        prefix_cache.record_usage(response)
+        response_text = response.text
+        parsed = parse_and_validate_response(
+            response_text,
+            description=f"batched grading for {label} ({batch_id})",
+            save_raw_to=_archive_raw_response(
+                response_text,
+                None,
+                label,
+                students={sid: s["student_id"] for sid, s in ids.items()},
+                model=_model_name(model),
+            ),
+        )
+    except Exception as e:
+        _record_call(
+            model,
+            stats,
+            "grading",
+            label,
+            batch_id,
+            start,
+            _failure_outcome(e),
+            full_prompt,
+            response=response,
+            response_text=response_text,
+        )
+        logger.warning(f"Batched grading failed for {label} ({batch_id}): {e}")
+        return {}
+
+    _record_call(
+        model,
+        stats,
+        "grading",
+        label,
+        batch_id,
+        start,
+        "ok",
+        full_prompt,
+        response=response,
+        response_text=response_text,
+    )
+
+    items = parsed.get("results") if isinstance(parsed, dict) else None
+    results = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        submission_id = item.pop("submission_id", None)
+        if submission_id not in ids or submission_id in results:
+            stats["batch_unknown_items"] += 1
+            continue
+        try:
+            item = grading_model.model_validate(item).model_dump()
+        except ValidationError as e:
+            stats["batch_invalid_items"] += 1
+            logger.warning(
+                f"Batched result for {ids[submission_id]['student_id']} is invalid: {e}"
+            )
+            continue
+        results[submission_id] = item
+
+    if GRADING_CONFIG["cache_enabled"] and len(results) == len(batch):
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False)
+    return {ids[sid]["student_id"]: item for sid, item in results.items()}
+
+
+def grade_student_projects_batched(
+    assignment_type: str, submissions: list, save_outputs: bool = True
+) -> tuple:
+    """Grade several small submissions of one assignment with batched requests.
+
+    Submissions are packed into requests under
+    BATCH_GRADING_CONFIG["max_prompt_tokens"] (and at most max_submissions per
+    request) so the instructions, criteria and format instructions are sent
+    once per batch instead of once per student. Each returned item is
+    validated against the assignment's grading model; failed requests and
+    invalid or missing items are graded again with grade_student_project.
+    Batches and fallbacks are sent concurrently up to
+    llm_clients.stage_concurrency("grading") (a local server's slot count).
+
+    Args:
+        assignment_type: Assignment key (A1, A2, ...)
+        submissions: Dicts with student_id, test_results, static_analysis,
+            source_code, practice_description and optionally test_pass_rate
+        save_outputs: Save each grading output to grading_outputs/
+
+    Returns:
+        ({student_id: grading output, or None if grading failed}, batch stats)
+    """
+    start = time.perf_counter()
+    grading_model = get_grading_model(assignment_type)
+    batches, singles = _pack_batches(assignment_type, grading_model, submissions)
+    model = llm_clients.get_stage_model("grading")
+
+    # Independent requests run concurrently up to the backend's slot count
+    workers = llm_clients.stage_concurrency("grading")
+    request_stats = [Counter() for _ in batches]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batch_results = list(
+            executor.map(
+                lambda batch, counts: _grade_batch(
+                    model, assignment_type, grading_model, batch, counts
+                ),
+                batches,
+                request_stats,
+            )
+        )
+
+    outputs = {}
+    batch_stats = Counter(batches=len(batches), workers=workers)
+    for counts in request_stats:
+        batch_stats.update(counts)
+    for batch, results in zip(batches, batch_results):
+        for submission in batch:
+            result_dict = results.get(submission["student_id"])
+            if result_dict is None:
+                singles.append(submission)
+                batch_stats["fallbacks"] += 1
+                continue
+            batch_stats["batched_submissions"] += 1
+            grading_output = grading_model.model_construct(**result_dict)
+            outputs[submission["student_id"]] = grading_output
+            if save_outputs:
+                save_grading_output(
+                    grading_output,
+                    assignment_type,
+                    submission["student_id"],
+                    result_dict,
+                    batch={"size": len(batch)},
+                )
+
+    def _grade_single(submission: dict):
+        try:
+            return grade_student_project(
+                submission["test_results"],
+                submission["static_analysis"],
+                submission["source_code"],
+                submission["practice_description"],
+                assignment_type=assignment_type,
+                student_id=submission["student_id"],
+                save_outputs=save_outputs,
+                test_pass_rate=submission.get("test_pass_rate"),
+            )
+        except Exception as e:
+            logger.error(
+                f"Grading failed for student {submission['student_id']}: {e}"
+            )
+            return None
+
+    batch_stats["single_requests"] += len(singles)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for submission, output in zip(singles, executor.map(_grade_single, singles)):
+            outputs[submission["student_id"]] = output
+
+    batch_stats["seconds"] = time.perf_counter() - start
+    logger.info(
+        f"Batched grading of {len(submissions)} {assignment_type} submissions: "
+        f"{dict(batch_stats)}"
+    )
+    return outputs, batch_stats
+
+
 def save_grading_output(
-    grading_output: BaseModel, assignment_type: str, student_id: str, raw_dict: dict
+    grading_output: BaseModel,
+    assignment_type: str,
+    student_id: str,
+    raw_dict: dict,
+    response_stats: Optional[Counter] = None,
+    routing: Optional[dict] = None,
+    reuse: Optional[dict] = None,
+    batch: Optional[dict] = None,
 ):
-    """Save grading output as JSON file with timestamp."""
-    import os
-    from datetime import datetime
+    """Save a grading output and its metadata to the artifact archive.
 
-    outputs_dir = os.path.join(os.getcwd(), "grading_outputs")
-    os.makedirs(outputs_dir, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{student_id}_{assignment_type}_{timestamp}.json"
-    filepath = os.path.join(outputs_dir, filename)
+    With ARTIFACT_LEGACY_FILES (or the archive disabled) it is also written
+    as a pretty-printed JSON file in grading_outputs/.
 
+    Returns:
+        Where the output was saved (file path, or archive run and record ID)
+    """
     output_data = {
         "student_id": student_id,
         "assignment_type": assignment_type,
+        "run_id": artifact_archive.current_run_id(),
         "timestamp": datetime.now().isoformat(),
         "grading_output": raw_dict,
-        "model_used": MODEL_CONFIG["model"],
+        "model_used": (
+            routing["strong_model" if routing["escalated"] else "fast_model"]
+            if routing
+            else MODEL_CONFIG["model"]
+        ),
+        "prompt_version": grading_prompt_version(assignment_type),
+        "routing": routing,
+        "reuse": reuse,
+        "batch": batch,
+        "structured_output_mode": GRADING_CONFIG["structured_output"],
+        "streaming_mode": GRADING_CONFIG["streaming"],
+        "response_stats": {
+            k: round(v, 3) if isinstance(v, float) else v
+            for k, v in (response_stats or {}).items()
+        },
         "structured_output": (
             grading_output.model_dump()
             if hasattr(grading_output, "model_dump")
@@ -641,8 +1852,131 @@ def save_grading_output(
         ),
     }
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    location = None
+    if ARTIFACT_ARCHIVE_CONFIG["enabled"]:
+        archive = artifact_archive.get_archive()
+        record_id = archive.append(
+            "grading_output",
+            output_data,
+            student_id=student_id,
+            assignment=assignment_type,
+            label=assignment_type,
+        )
+        location = (
+            f"{archive.path} (run {output_data['run_id']}, record {record_id})"
+        )
+    if _legacy_artifacts():
+        location = _legacy_artifact_name(f"{student_id}_{assignment_type}", ".json")
+        os.makedirs(os.path.dirname(location), exist_ok=True)
+        with open(location, "w", encoding="utf-8") as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ Grading output saved to: {location}")
+    return location
+
+
+def _saved_grading_outputs(outputs_dir: str = None):
+    """Yield saved grading outputs: legacy JSON files, then archived records.
+
+    An explicit outputs_dir reads only that directory's JSON files.
+    """
+    directory = outputs_dir or os.path.join(os.getcwd(), "grading_outputs")
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(data, dict):
+                yield data
+
+    if outputs_dir or not ARTIFACT_ARCHIVE_CONFIG["enabled"]:
+        return
+    if not os.path.exists(os.path.join(ARTIFACT_ARCHIVE_CONFIG["path"], "index.db")):
+        return
+    for record in artifact_archive.get_archive().records(kind="grading_output"):
+        yield record["payload"]
+
+
+def summarize_response_stats(outputs_dir: str = None) -> dict:
+    """Aggregate response_stats from saved grading outputs, split by output mode.
+
+    Used to compare parse failure rates, retry counts, time to first score
+    and retry latency across output modes (STRUCTURED_OUTPUT and
+    STREAMING_GRADING on and off). Batched gradings are counted apart: their
+    request shares one response with other submissions.
+    """
+    summary = {}
+    batched = Counter()
+    for data in _saved_grading_outputs(outputs_dir):
+        if "response_stats" not in data:
+            continue
+        if data.get("batch") or data["response_stats"].get("batched"):
+            batched["gradings"] += 1
+            continue
 
-    print(f"✅ Grading output saved to: {filepath}")
-    return filepath
+        mode = "structured" if data.get("structured_output_mode") else "text"
+        if data.get("streaming_mode"):
+            mode += "+stream"
+        totals = summary.setdefault(mode, Counter())
+        totals["gradings"] += 1
+        totals.update(data["response_stats"])
+
+    for mode, totals in summary.items():
+        attempts = max(totals["attempts"], 1)
+        summary[mode] = dict(totals)
+        summary[mode]["parse_failure_rate"] = round(
+            totals["parse_failures"] / attempts, 3
+        )
+        failed_attempts = totals["attempts"] - totals["requests"]
+        summary[mode]["retries_per_request"] = round(
+            failed_attempts / max(totals["requests"], 1), 3
+        )
+        summary[mode]["avg_first_score_seconds"] = round(
+            totals["first_score_seconds"] / max(totals["requests"], 1), 3
+        )
+        summary[mode]["avg_failed_attempt_seconds"] = round(
+            totals["failed_attempt_seconds"] / max(failed_attempts, 1), 3
+        )
+    if batched:
+        summary["batched"] = dict(batched)
+    return summary
+
+
+def summarize_routing(outputs_dir: str = None) -> dict:
+    """Aggregate routing decisions from saved grading outputs.
+
+    Latency saved per kept submission is estimated as the mean strong-tier
+    time observed on escalated submissions minus the fast-tier time.
+    """
+    decisions = [
+        data["routing"]
+        for data in _saved_grading_outputs(outputs_dir)
+        if data.get("routing")
+    ]
+
+    if not decisions:
+        return {}
+
+    escalated = [d for d in decisions if d["escalated"]]
+    kept = [d for d in decisions if not d["escalated"]]
+    strong_times = [d["strong"]["seconds"] for d in escalated if "strong" in d]
+    mean_strong = sum(strong_times) / len(strong_times) if strong_times else None
+
+    return {
+        "gradings": len(decisions),
+        "escalated": len(escalated),
+        "escalation_rate": round(len(escalated) / len(decisions), 3),
+        "triggers": dict(Counter(t for d in decisions for t in d["triggers"])),
+        "estimated_cost_saved_usd": round(
+            sum(d.get("estimated_cost_saved_usd", 0.0) for d in decisions), 4
+        ),
+        "estimated_seconds_saved": (
+            round(sum(mean_strong - d["fast"]["seconds"] for d in kept), 2)
+            if mean_strong is not None
+            else None
+        ),
+    }
@@ -0,0 +1,736 @@
+"""
+Long-lived Gemini client registry and pluggable LLM backends.
+
+genai.configure() discards the library's cached service clients, so calling
+it per request (and building a new GenerativeModel each time) also throws
+away the underlying connection. This module configures the library once,
+creates the shared service client up front, and hands out one
+GenerativeModel per (model, generation config) pair. All handles share that
+client's connection pool; lookups are lock-protected, so handles can be used
+from worker threads and from asyncio tasks (via generate_content_async).
+
+LLM_BACKEND_CONFIG["mode"] selects what the handles talk to:
+
+- live: the Gemini API
+- record: the Gemini API, saving every response under its prompt hash
+- replay: recorded responses only, no network or API key needed
+- synthetic: schema-valid random scores with configurable latency
+- local: an OpenAI-compatible HTTP server (llama.cpp server, vLLM, ...)
+
+so the whole pipeline can be run and benchmarked offline.
+LLM_BACKEND_CONFIG["stage_backends"] overrides the mode per MODEL_CONFIG
+stage, e.g. local grading with Gemini test generation.
+"""
+
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+import logging
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Optional
+
+import google.generativeai as genai
+from google.generativeai import caching
+from google.generativeai import client as genai_client
+
+from config import MODEL_CONFIG, GRADING_CONFIG, LLM_BACKEND_CONFIG, LOCAL_LLM_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+BACKEND_MODES = ("live", "record", "replay", "synthetic", "local")
+
+
+_lock = threading.Lock()
+_configured = False
+_handles = {}
+_prefix_caches = {}
+_slot_semaphores = {}
+_stats = {"created": 0, "reused": 0}
+
+
+class LLMResponse:
+    """Minimal stand-in for a Gemini response: .text and optional .usage_metadata."""
+
+    def __init__(self, text: str, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+def _chunked(text: str, size: int = 64) -> list:
+    """Split a response into stream chunks for the offline backends."""
+    return [LLMResponse(text[i : i + size]) for i in range(0, len(text), size)] or [
+        LLMResponse("")
+    ]
+
+
+def _request_key(model_name: str, base_config: dict, prompt, request_config) -> str:
+    """Hash identifying one request: model, generation configs and prompt."""
+    key_material = json.dumps(
+        {
+            "model": model_name,
+            "generation": base_config,
+            "request": request_config,
+            "prompt": prompt,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+def _recording_path(key: str) -> str:
+    return os.path.join(LLM_BACKEND_CONFIG["recordings_dir"], f"{key}.json")
+
+
+class RecordingModel:
+    """Live model handle that saves every response keyed by prompt hash."""
+
+    backend = "record"
+
+    def __init__(self, handle, model_name: str, base_config: dict):
+        self._handle = handle
+        self.model_name = model_name
+        self.base_config = base_config
+
+    def _save(self, prompt, generation_config, response, latency: float):
+        key = _request_key(self.model_name, self.base_config, prompt, generation_config)
+        path = _recording_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "prompt_hash": key,
+                    "model": self.model_name,
+                    "text": response.text,
+                    "latency_seconds": round(latency, 3),
+                    "recorded": datetime.now().isoformat(),
+                    # Request inputs, so benchmark_recordings can resend them
+                    "generation": self.base_config,
+                    "request": generation_config,
+                    "prompt": prompt,
+                },
+                f,
+                ensure_ascii=False,
+                default=str,
+            )
+
+    def _record_stream(self, prompt, generation_config, chunks, start: float):
+        # Only fully consumed streams are saved; a cancelled stream is not.
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk.text)
+            yield chunk
+        self._save(
+            prompt,
+            generation_config,
+            LLMResponse("".join(parts)),
+            time.perf_counter() - start,
+        )
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        start = time.perf_counter()
+        response = self._handle.generate_content(
+            prompt, generation_config=generation_config, stream=stream
+        )
+        if stream:
+            return self._record_stream(prompt, generation_config, response, start)
+        self._save(prompt, generation_config, response, time.perf_counter() - start)
+        return response
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        start = time.perf_counter()
+        response = await self._handle.generate_content_async(
+            prompt, generation_config=generation_config
+        )
+        self._save(prompt, generation_config, response, time.perf_counter() - start)
+        return response
+
+
+class ReplayModel:
+    """Serves responses saved by RecordingModel; raises LookupError on a miss."""
+
+    backend = "replay"
+
+    def __init__(self, model_name: str, base_config: dict):
+        self.model_name = model_name
+        self.base_config = base_config
+
+    def _load(self, prompt, generation_config) -> dict:
+        key = _request_key(self.model_name, self.base_config, prompt, generation_config)
+        path = _recording_path(key)
+        if not os.path.exists(path):
+            raise LookupError(f"No recorded response for prompt hash {key}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _replay_stream(self, recording: dict):
+        chunks = _chunked(recording["text"])
+        delay = (
+            recording.get("latency_seconds", 0) / len(chunks)
+            if LLM_BACKEND_CONFIG["replay_latency"]
+            else 0
+        )
+        for chunk in chunks:
+            time.sleep(delay)
+            yield chunk
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        recording = self._load(prompt, generation_config)
+        if stream:
+            return self._replay_stream(recording)
+        if LLM_BACKEND_CONFIG["replay_latency"]:
+            time.sleep(recording.get("latency_seconds", 0))
+        return LLMResponse(recording["text"])
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        recording = self._load(prompt, generation_config)
+        if LLM_BACKEND_CONFIG["replay_latency"]:
+            await asyncio.sleep(recording.get("latency_seconds", 0))
+        return LLMResponse(recording["text"])
+
+
+_BOUNDS_RE = re.compile(r"between (-?[\d.]+) and (-?[\d.]+)")
+
+
+class SyntheticModel:
+    """Returns random but schema-valid JSON after a configurable delay.
+
+    Values follow the response_schema of the request (see
+    prompts.get_response_schema): scores are drawn in half-point steps within
+    the bounds stated in each field description, arrays get min_items
+    entries and string enums take their values in order. Requests sent
+    without structured output carry the same schema as "synthetic_schema",
+    which only this backend reads; requests with neither get an empty JSON
+    object. Output is deterministic per prompt and seed.
+    """
+
+    backend = "synthetic"
+
+    def __init__(self, model_name: str, base_config: dict):
+        self.model_name = model_name
+        self.base_config = base_config
+
+    def _value(self, schema: dict, rng: random.Random, index: int = 0):
+        schema_type = schema.get("type")
+        if schema_type == "object":
+            return {
+                name: self._value(prop, rng, index)
+                for name, prop in schema.get("properties", {}).items()
+            }
+        if schema_type == "array":
+            return [
+                self._value(schema.get("items", {}), rng, i)
+                for i in range(schema.get("min_items", 1))
+            ]
+        if schema_type == "string":
+            if schema.get("enum"):
+                return schema["enum"][index % len(schema["enum"])]
+            return "Synthetic feedback generated for offline benchmarking."
+        bounds = _BOUNDS_RE.search(schema.get("description", ""))
+        if bounds is None:
+            return 0
+        low, high = float(bounds.group(1)), float(bounds.group(2))
+        steps = int((high - low) * 2)
+        return low + rng.randint(0, steps) / 2
+
+    def _text(self, prompt, generation_config) -> str:
+        key = _request_key(self.model_name, self.base_config, prompt, generation_config)
+        rng = random.Random(f"{LLM_BACKEND_CONFIG['synthetic_seed']}:{key}")
+        generation_config = generation_config or {}
+        schema = (
+            generation_config.get("response_schema")
+            or generation_config.get("synthetic_schema")
+            or {}
+        )
+        return json.dumps(self._value(schema, rng) if schema else {})
+
+    def _synthetic_stream(self, text: str):
+        chunks = _chunked(text)
+        for chunk in chunks:
+            time.sleep(LLM_BACKEND_CONFIG["synthetic_latency"] / len(chunks))
+            yield chunk
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        text = self._text(prompt, generation_config)
+        if stream:
+            return self._synthetic_stream(text)
+        time.sleep(LLM_BACKEND_CONFIG["synthetic_latency"])
+        return LLMResponse(text)
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        await asyncio.sleep(LLM_BACKEND_CONFIG["synthetic_latency"])
+        return LLMResponse(self._text(prompt, generation_config))
+
+
+def _local_slots(base_url: str) -> int:
+    """Concurrent request slots of a local server (LOCAL_LLM_SLOTS or /props)."""
+    if LOCAL_LLM_CONFIG["slots"] > 0:
+        return LOCAL_LLM_CONFIG["slots"]
+    try:
+        with urllib.request.urlopen(f"{base_url}/props", timeout=5) as response:
+            return max(int(json.load(response).get("total_slots", 1)), 1)
+    except (OSError, ValueError) as e:
+        logger.info(f"Could not read slots from {base_url}/props, using 1: {e}")
+        return 1
+
+
+def _json_schema(schema: dict) -> dict:
+    """Convert a Gemini response schema (prompts.get_response_schema) to JSON Schema."""
+    result = {}
+    for key, value in schema.items():
+        if key == "format" and value == "enum":
+            continue
+        if key == "properties":
+            value = {name: _json_schema(prop) for name, prop in value.items()}
+        elif key == "items":
+            value = _json_schema(value)
+        result[{"min_items": "minItems", "max_items": "maxItems"}.get(key, key)] = value
+    return result
+
+
+class LocalModel:
+    """Handle for an OpenAI-compatible chat completions server.
+
+    Works with llama.cpp's server, vLLM, Ollama and similar. Requests are
+    limited to the server's slot count (one semaphore per server), so
+    callers can submit from as many threads as they like. Response schemas
+    become JSON-schema response formats, and usage is mapped onto Gemini's
+    usage_metadata fields for telemetry.
+    """
+
+    backend = "local"
+
+    def __init__(self, model_name: str, base_config: dict):
+        self.model_name = LOCAL_LLM_CONFIG["model"] or model_name
+        self.base_config = base_config
+        self.base_url = LOCAL_LLM_CONFIG["base_url"]
+
+        with _lock:
+            server = _slot_semaphores.get(self.base_url)
+        if server is None:
+            slots = _local_slots(self.base_url)
+            with _lock:
+                server = _slot_semaphores.setdefault(
+                    self.base_url, (slots, threading.BoundedSemaphore(slots))
+                )
+                logger.info(f"Local LLM server {self.base_url}: {slots} slots")
+        # Slot count of the server, and the semaphore holding requests to it
+        self.slots, self._slots = server
+
+    def _payload(self, prompt, generation_config, stream: bool) -> dict:
+        config = {**self.base_config, **(generation_config or {})}
+        payload = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": stream,
+        }
+        for name, field in (
+            ("temperature", "temperature"),
+            ("top_p", "top_p"),
+            ("top_k", "top_k"),
+            ("max_output_tokens", "max_tokens"),
+        ):
+            if config.get(name) is not None:
+                payload[field] = config[name]
+        if config.get("response_schema"):
+            payload["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "response",
+                    "schema": _json_schema(config["response_schema"]),
+                },
+            }
+        elif config.get("response_mime_type") == "application/json":
+            payload["response_format"] = {"type": "json_object"}
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    def _open(self, payload: dict):
+        headers = {"Content-Type": "application/json"}
+        if LOCAL_LLM_CONFIG["api_key"]:
+            headers["Authorization"] = f"Bearer {LOCAL_LLM_CONFIG['api_key']}"
+        request = urllib.request.Request(
+            f"{self.base_url}/v1/chat/completions",
+            data=json.dumps(payload).encode("utf-8"),
+            headers=headers,
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=LOCAL_LLM_CONFIG["timeout"])
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(
+                f"Local LLM request failed with HTTP {e.code}: {e.read()[:500]!r}"
+            ) from e
+
+    @staticmethod
+    def _usage(usage: Optional[dict]):
+        if not usage:
+            return None
+        return SimpleNamespace(
+            prompt_token_count=usage.get("prompt_tokens"),
+            candidates_token_count=usage.get("completion_tokens"),
+            total_token_count=usage.get("total_tokens"),
+            cached_content_token_count=(usage.get("prompt_tokens_details") or {}).get(
+                "cached_tokens", 0
+            ),
+        )
+
+    def _stream(self, payload: dict):
+        # The slot is held until the stream is consumed or closed.
+        with self._slots:
+            response = self._open(payload)
+            try:
+                for line in response:
+                    line = line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:") :].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    choices = event.get("choices") or []
+                    delta = (choices[0].get("delta") or {}) if choices else {}
+                    text = delta.get("content")
+                    usage = self._usage(event.get("usage"))
+                    if text or usage:
+                        yield LLMResponse(text or "", usage)
+            finally:
+                response.close()
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        payload = self._payload(prompt, generation_config, stream)
+        if stream:
+            return self._stream(payload)
+        with self._slots:
+            with self._open(payload) as response:
+                body = json.load(response)
+        return LLMResponse(
+            body["choices"][0]["message"].get("content") or "",
+            self._usage(body.get("usage")),
+        )
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        return await asyncio.to_thread(self.generate_content, prompt, generation_config)
+
+
+def configure(api_key: Optional[str] = None) -> None:
+    """Configure the Gemini library once per process and create the shared client."""
+    global _configured
+    if _configured:
+        return
+
+    with _lock:
+        if _configured:
+            return
+        genai.configure(api_key=api_key or MODEL_CONFIG["api_key"])
+        try:
+            genai_client.get_default_generative_client()
+        except Exception as e:
+            logger.warning(f"Could not create Gemini client yet: {e}")
+        _configured = True
+        logger.info("Configured shared Gemini client")
+
+
+def _make_handle(mode: str, model_name: str, generation_config: dict):
+    if mode == "replay":
+        return ReplayModel(model_name, generation_config)
+    if mode == "synthetic":
+        return SyntheticModel(model_name, generation_config)
+    if mode == "local":
+        return LocalModel(model_name, generation_config)
+
+    configure()
+    handle = genai.GenerativeModel(
+        model_name,
+        generation_config=genai.types.GenerationConfig(**generation_config),
+    )
+    if mode == "record":
+        return RecordingModel(handle, model_name, generation_config)
+    return handle
+
+
+def get_model(
+    model_name: Optional[str] = None, backend: Optional[str] = None, **generation_config
+):
+    """Return the shared model handle for a model and generation config.
+
+    Args:
+        model_name: Model name (defaults to MODEL_CONFIG["model"])
+        backend: Backend mode (defaults to LLM_BACKEND_CONFIG["mode"])
+        **generation_config: GenerationConfig fields (temperature, top_p, ...)
+
+    Returns:
+        Handle with generate_content(prompt, generation_config=None,
+        stream=False), reused
+        across calls with the same arguments and backend mode
+    """
+    mode = backend or LLM_BACKEND_CONFIG["mode"]
+    if mode not in BACKEND_MODES:
+        raise ValueError(f"Unknown LLM backend {mode!r}; expected one of {BACKEND_MODES}")
+
+    model_name = model_name or MODEL_CONFIG["model"]
+    key = (mode, model_name, tuple(sorted(generation_config.items())))
+
+    with _lock:
+        handle = _handles.get(key)
+        if handle is not None:
+            _stats["reused"] += 1
+            return handle
+
+    handle = _make_handle(mode, model_name, generation_config)
+    with _lock:
+        if key not in _handles:
+            _handles[key] = handle
+            _stats["created"] += 1
+        else:
+            _stats["reused"] += 1
+        return _handles[key]
+
+
+def stage_backend(stage: str) -> str:
+    """Backend mode for a MODEL_CONFIG stage (LLM_STAGE_BACKENDS or LLM_BACKEND)."""
+    return LLM_BACKEND_CONFIG["stage_backends"].get(stage, LLM_BACKEND_CONFIG["mode"])
+
+
+def stage_concurrency(stage: str) -> int:
+    """Requests of a stage to send at once: the local server's slots, else 1."""
+    if stage_backend(stage) == "local":
+        return get_stage_model(stage).slots
+    return 1
+
+
+def get_stage_model(stage: str, model_name: Optional[str] = None):
+    """Return the model handle for a MODEL_CONFIG stage ("grading" or "generation").
+
+    model_name overrides MODEL_CONFIG["model"] (e.g. for routing tiers) while
+    keeping the stage's generation settings.
+    """
+    stage_config = MODEL_CONFIG[stage]
+    return get_model(
+        model_name or MODEL_CONFIG["model"],
+        backend=stage_backend(stage),
+        temperature=stage_config["temperature"],
+        top_p=stage_config["top_p"],
+        top_k=stage_config["top_k"],
+        max_output_tokens=stage_config["max_output_tokens"],
+    )
+
+
+def stats() -> dict:
+    """Return handle counts: distinct handles, handles created and lookups reused."""
+    with _lock:
+        return {"handles": len(_handles), **_stats}
+
+
+class PrefixCache:
+    """Context-cache handle for the static prompt prefix of one assignment.
+
+    In live mode the prefix is uploaded once as Gemini cached content and
+    requests send only their per-submission suffix through a model bound to
+    it. Otherwise (offline backends, record mode, prefixes below the service
+    minimum, CONTEXT_CACHE=false) requests carry the full prompt, whose
+    stable prefix still allows implicit caching by the service.
+    """
+
+    def __init__(self, label: str, prefix: str, handle=None, cached_content=None):
+        self.label = label
+        self.prefix = prefix
+        self.handle = handle
+        self.cached_content = cached_content
+        self.requests = 0
+        self.explicit_hits = 0
+        self.implicit_hits = 0
+        self._lock = threading.Lock()
+
+    def request(self, model, full_prompt: str) -> tuple:
+        """Return the (handle, prompt) pair to send for a full prompt."""
+        with self._lock:
+            self.requests += 1
+            if self.handle is not None and full_prompt.startswith(self.prefix):
+                self.explicit_hits += 1
+                return self.handle, full_prompt[len(self.prefix) :]
+        return model, full_prompt
+
+    def record_usage(self, response):
+        """Count an implicit hit when the service reports cached prompt tokens."""
+        usage = getattr(response, "usage_metadata", None)
+        if self.handle is None and getattr(usage, "cached_content_token_count", 0):
+            with self._lock:
+                self.implicit_hits += 1
+
+    def stats(self) -> dict:
+        hits = self.explicit_hits + self.implicit_hits
+        return {
+            "label": self.label,
+            "explicit": self.handle is not None,
+            "prefix_chars": len(self.prefix),
+            "requests": self.requests,
+            "explicit_hits": self.explicit_hits,
+            "implicit_hits": self.implicit_hits,
+            "hit_rate": round(hits / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+def get_prefix_cache(
+    stage: str, label: str, prefix: str, model_name: Optional[str] = None
+) -> PrefixCache:
+    """Return the batch-wide PrefixCache for a prompt prefix, creating it once.
+
+    Args:
+        stage: MODEL_CONFIG stage whose generation settings the cached model uses
+        label: Name for logs and reports (e.g. "A1", "A6 phase2")
+        prefix: Static prompt prefix shared by every request of the batch
+        model_name: Model the prefix is cached for (defaults to MODEL_CONFIG["model"])
+    """
+    mode = stage_backend(stage)
+    model_name = (model_name or MODEL_CONFIG["model"]).split("/")[-1]
+    key = (
+        mode,
+        model_name,
+        stage,
+        hashlib.sha256(prefix.encode("utf-8")).hexdigest(),
+    )
+
+    with _lock:
+        prefix_cache = _prefix_caches.get(key)
+        if prefix_cache is not None:
+            return prefix_cache
+
+    handle = cached_content = None
+    if mode == "live" and GRADING_CONFIG["context_cache"]:
+        configure()
+        stage_config = MODEL_CONFIG[stage]
+        try:
+            cached_content = caching.CachedContent.create(
+                model=f"models/{model_name}",
+                display_name=f"grading prefix {label}",
+                contents=[prefix],
+                ttl=timedelta(seconds=GRADING_CONFIG["context_cache_ttl"]),
+            )
+            handle = genai.GenerativeModel.from_cached_content(
+                cached_content,
+                generation_config=genai.types.GenerationConfig(**stage_config),
+            )
+            logger.info(f"Created context cache for {label} ({len(prefix)} chars)")
+        except Exception as e:
+            logger.info(f"Context cache unavailable for {label}, sending inline: {e}")
+            handle = cached_content = None
+
+    with _lock:
+        if key not in _prefix_caches:
+            _prefix_caches[key] = PrefixCache(label, prefix, handle, cached_content)
+        elif cached_content is not None:
+            cached_content.delete()
+        return _prefix_caches[key]
+
+
+def prefix_cache_stats() -> list:
+    """Per-prefix request and hit counts for the current batch."""
+    with _lock:
+        caches = list(_prefix_caches.values())
+    return [prefix_cache.stats() for prefix_cache in caches]
+
+
+def release_prefix_caches() -> list:
+    """Delete uploaded context caches at the end of a batch and return their stats."""
+    with _lock:
+        caches = list(_prefix_caches.values())
+        _prefix_caches.clear()
+
+    stats = []
+    for prefix_cache in caches:
+        stats.append(prefix_cache.stats())
+        if prefix_cache.cached_content is not None:
+            try:
+                prefix_cache.cached_content.delete()
+            except Exception as e:
+                logger.warning(f"Failed to delete context cache {prefix_cache.label}: {e}")
+    return stats
+
+
+def benchmark_recordings(
+    backend: str, limit: Optional[int] = None, workers: Optional[int] = None
+) -> dict:
+    """Resend recorded prompts to a backend and compare with the recorded latency.
+
+    Recordings made with LLM_BACKEND=record (see RecordingModel) hold the
+    prompt, generation config and Gemini latency of each request. They are
+    sent to the given backend from `workers` threads (default: the local
+    server's slot count, else 1). The report gives throughput next to the
+    recorded Gemini figures for the same prompt set.
+    """
+    recordings_dir = LLM_BACKEND_CONFIG["recordings_dir"]
+    recordings = []
+    if os.path.isdir(recordings_dir):
+        for name in sorted(os.listdir(recordings_dir)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(recordings_dir, name), "r", encoding="utf-8") as f:
+                recording = json.load(f)
+            if "prompt" in recording:
+                recordings.append(recording)
+    recordings = recordings[:limit] if limit else recordings
+    if not recordings:
+        return {"backend": backend, "requests": 0}
+
+    if workers is None:
+        workers = 1
+        if backend == "local":
+            workers = LocalModel(MODEL_CONFIG["model"], {}).slots
+
+    def _send(recording: dict) -> tuple:
+        handle = get_model(
+            recording["model"], backend=backend, **(recording.get("generation") or {})
+        )
+        start = time.perf_counter()
+        try:
+            response = handle.generate_content(
+                recording["prompt"], generation_config=recording.get("request")
+            )
+        except Exception as e:
+            logger.warning(f"Benchmark request {recording['prompt_hash']} failed: {e}")
+            return time.perf_counter() - start, None
+        return time.perf_counter() - start, response
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_send, recordings))
+    wall = time.perf_counter() - start
+
+    succeeded = [(seconds, r) for seconds, r in results if r is not None]
+    output_chars = sum(len(r.text) for _, r in succeeded)
+    output_tokens = sum(
+        getattr(getattr(r, "usage_metadata", None), "candidates_token_count", 0) or 0
+        for _, r in succeeded
+    )
+    wall = max(wall, 1e-9)
+    # Gemini, as recorded (requests were sent one at a time)
+    recorded_seconds = max(sum(r.get("latency_seconds", 0) for r in recordings), 1e-9)
+    recorded_chars = sum(len(r.get("text", "")) for r in recordings)
+
+    return {
+        "backend": backend,
+        "requests": len(recordings),
+        "failed": len(recordings) - len(succeeded),
+        "workers": workers,
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(len(succeeded) / wall, 3),
+        "mean_latency_seconds": round(
+            sum(seconds for seconds, _ in succeeded) / max(len(succeeded), 1), 3
+        ),
+        "output_chars_per_second": round(output_chars / wall, 1),
+        "output_tokens_per_second": round(output_tokens / wall, 1),
+        "recorded_mean_latency_seconds": round(recorded_seconds / len(recordings), 3),
+        "recorded_requests_per_second": round(len(recordings) / recorded_seconds, 3),
+        "recorded_output_chars_per_second": round(recorded_chars / recorded_seconds, 1),
+    }
@@ -1,16 +1,29 @@
 # main_agent.py
 import tools
+import fingerprints
+import plagiarism
+import similarity_archive
+import artifact_archive
+import submission_reuse
+import spec_index
+import sample_tests
+import stress_tests
+import minimizer
+import coverage_triage
+import telemetry
+import llm_clients
 import sheets_updater
 import langchain_integration
 import config
-from prompts import get_grading_prompt, get_format_instructions
-from langchain_integration import A6GradingOutput
 
 import argparse
+import shlex
 import os
 import csv
 import json
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 
@@ -465,6 +478,9 @@ def save_full_feedback(
     test_results: dict,
     analysis_report: str,
     source_code: str,
+    excluded_files: list = None,
+    archive_matches: list = None,
+    reuse: dict = None,
 ):
     """Save full feedback as CSV row and a detailed markdown document."""
     outputs_dir = os.path.join(os.getcwd(), "feedback_outputs")
@@ -522,9 +538,35 @@ def save_full_feedback(
             f.write(str(llm_structured))
         f.write("\n\n")
 
+        f.write("## Failing Test Reproducers\n")
+        failure_report = test_results.get("failure_report")
+        if failure_report and failure_report["failures"]:
+            for failure in failure_report["failures"]:
+                point = failure["divergence"]
+                f.write(f"### {failure['test']} ({failure['outcome']})\n")
+                f.write(
+                    f"- First divergent output line {point['line']}: expected "
+                    f"`{point['expected']}`, got `{point['actual']}`\n"
+                )
+                if failure["reproducer"]:
+                    f.write(
+                        f"- Reduced from {failure['lines_before']} to "
+                        f"{failure['lines_after']} input lines:\n\n"
+                        f"```\n{failure['reproducer']}```\n"
+                    )
+                f.write("\n")
+        else:
+            f.write("None\n\n")
+
         f.write("## Test Results\n")
         try:
-            f.write(json.dumps(test_results, indent=2, ensure_ascii=False))
+            f.write(
+                json.dumps(
+                    {k: v for k, v in test_results.items() if k != "judge_output"},
+                    indent=2,
+                    ensure_ascii=False,
+                )
+            )
         except Exception:
             f.write(str(test_results))
         f.write("\n\n")
@@ -533,6 +575,46 @@ def save_full_feedback(
         f.write(analysis_report if analysis_report else "No analysis available")
         f.write("\n\n")
 
+        f.write("## Excluded Starter/Vendor Files\n")
+        if excluded_files:
+            for entry in excluded_files:
+                f.write(
+                    f"- `{entry['path']}` ({entry['match']} match of `{entry['starter']}`)\n"
+                )
+        else:
+            f.write("None\n")
+        f.write("\n")
+
+        f.write("## Cross-Semester Similarity\n")
+        if archive_matches:
+            for match in archive_matches:
+                f.write(
+                    f"- {match['similarity']}% similar to {match['student_id']} "
+                    f"({match['semester'] or 'unknown semester'}, {match['repo_url']} @ {match['commit_sha']})\n"
+                )
+        else:
+            f.write("No archived submission above threshold\n")
+        f.write("\n")
+
+        f.write("## Result Reuse\n")
+        if reuse:
+            reused_stages = {
+                "all_stages": "test results, static analysis and LLM grading",
+                "diff_review": "test results and static analysis; LLM diff-only review",
+                "tests_only": "test results and static analysis; full LLM grading (diff too large or grading prompts changed)",
+            }
+            f.write(
+                f"- {reuse['kind'].capitalize()} match ({reuse['similarity']}% fingerprint "
+                f"similarity) of graded submission {reuse['student_id']} "
+                f"(reuse store entry {reuse['entry_id']})\n"
+            )
+            f.write(f"- Reused: {reused_stages[reuse['mode']]}\n")
+            if reuse.get("diff"):
+                f.write(f"\n```diff\n{reuse['diff'][:20000]}\n```\n")
+        else:
+            f.write("Graded from scratch\n")
+        f.write("\n")
+
         f.write("## Source Code (truncated)\n")
         f.write(source_code[:20000] if source_code else "")
 
@@ -871,8 +953,8 @@ def calculate_a6_scores(llm_grades, test_results):
     return phase_grades
 
 
-def _grade_student_flow(student_id, repo_url, assignment_type):
-    """Run full grading pipeline for a single student and return summary paths."""
+def _prepare_submission(student_id, repo_url, assignment_type):
+    """Clone, test and analyse a submission; return its grading inputs or None."""
     print_header(f"🎯 GRADING STUDENT: {student_id} - {assignment_type}")
 
     project_path = tools.clone_student_repo(repo_url, student_id=student_id)
@@ -880,18 +962,102 @@ def _grade_student_flow(student_id, repo_url, assignment_type):
         print(f"{Colors.RED}❌ Failed to clone repository for {student_id}{Colors.END}")
         return None
 
-    print_section("📋 RUNNING TESTS", "", Colors.GREEN)
-    test_results = tools.build_and_run_tests(project_path, assignment_type)
-    print(f"✅ Tests completed: {test_results['execution_summary']}")
+    starter_files = fingerprints.find_starter_files(project_path, assignment_type)
+    excluded_paths = [entry["path"] for entry in starter_files]
+    if starter_files:
+        print(f"✅ Excluding {len(starter_files)} starter/vendor files")
+
+    signature = None
+    reuse = None
+    if config.REUSE_CONFIG["enabled"]:
+        print_section("♻️ DUPLICATE CHECK", "", Colors.GREEN)
+        signature = submission_reuse.submission_signature(project_path, excluded_paths)
+        reuse_store = submission_reuse.ReuseStore()
+        try:
+            reuse = reuse_store.find(signature, assignment_type)
+        finally:
+            reuse_store.close()
+        if reuse:
+            print(
+                f"♻️  {reuse['kind'].capitalize()} match ({reuse['similarity']}%) of "
+                f"graded submission {reuse['student_id']}"
+            )
+        else:
+            print("✅ No graded twin found")
+
+    if reuse:
+        test_results = reuse["test_results"]
+        analysis_report = reuse["analysis_report"]
+        print("♻️  Reusing test and static analysis results")
+    else:
+        print_section("📋 RUNNING TESTS", "", Colors.GREEN)
+        test_results = tools.build_and_run_tests(project_path, assignment_type)
+        print(f"✅ Tests completed: {test_results['execution_summary']}")
+
+        if (
+            config.MINIMIZER_CONFIG["enabled"]
+            and test_results.get("total_tests")
+            and test_results["passed_tests"] < test_results["total_tests"]
+        ):
+            report = minimizer.explain_failures(
+                project_path, assignment_type, student_id
+            )
+            if report and report["failures"]:
+                # The prompt gets reproducers instead of the raw judge log
+                test_results["failure_report"] = report
+                test_results["judge_output"] = test_results["execution_summary"]
+                test_results["execution_summary"] = minimizer.condense_judge_output(
+                    test_results["judge_output"], report
+                )
+                print(report["summary"])
+
+        if config.STRESS_TEST_CONFIG["measure_performance"]:
+            performance = stress_tests.measure_performance(
+                project_path, assignment_type, student_id
+            )
+            if performance:
+                test_results["performance"] = performance
+                test_results["execution_summary"] += "\n" + performance["summary"]
+                print(performance["summary"])
 
-    print_section("🔬 STATIC ANALYSIS", "", Colors.GREEN)
-    analysis_report = tools.run_static_analysis(project_path)
-    print("✅ Static analysis completed")
+        print_section("🔬 STATIC ANALYSIS", "", Colors.GREEN)
+        analysis_report = tools.run_static_analysis(project_path, excluded_paths)
+        print("✅ Static analysis completed")
 
     print_section("📖 READING SOURCE CODE", "", Colors.GREEN)
-    source_code = tools.read_project_files(project_path)
+    source_code = tools.read_project_files(project_path, excluded_paths)
     print(f"✅ Source code read: {len(source_code):,} characters")
 
+    prompt_version = langchain_integration.grading_prompt_version(assignment_type)
+    if reuse and reuse["prompt_version"] != prompt_version:
+        print("♻️  Grading prompts changed since the twin was graded; full LLM grading")
+        reuse["mode"] = "tests_only"
+    elif reuse and reuse["kind"] == "exact":
+        reuse["mode"] = "all_stages"
+    elif reuse:
+        reuse["diff"] = submission_reuse.source_diff(reuse["source_code"], source_code)
+        reuse["mode"] = "diff_review" if reuse["diff"] is not None else "tests_only"
+
+    print_section("🗄️ CROSS-SEMESTER SIMILARITY", "", Colors.GREEN)
+    archive = similarity_archive.SimilarityArchive()
+    try:
+        archive_matches = similarity_archive.check_and_archive(
+            archive,
+            project_path,
+            student_id,
+            assignment_type,
+            repo_url=repo_url,
+            excluded_files=excluded_paths,
+        )
+    finally:
+        archive.close()
+    for match in archive_matches:
+        print(
+            f"{Colors.YELLOW}⚠️  {match['similarity']}% similar to archived submission "
+            f"{match['student_id']} ({match['repo_url']}){Colors.END}"
+        )
+    print(f"✅ Archive checked: {len(archive_matches)} historic matches")
+
     print_section("🧠 CODE QUALITY ANALYSIS", "", Colors.GREEN)
     code_analysis = tools.analyze_code_quality(source_code)
     print("✅ Code analysis completed")
@@ -918,6 +1084,19 @@ def _grade_student_flow(student_id, repo_url, assignment_type):
     assignment_config = config.PRACTICE_CONFIGS[assignment_type]
     assignment_desc = assignment_config.get("name", f"Assignment {assignment_type}")
 
+    spec = spec_index.relevant_spec(
+        assignment_type, source_code + "\n" + test_results["execution_summary"]
+    )
+    if spec["text"]:
+        print(
+            f"📄 Spec context: {len(spec['sections'])} sections, "
+            f"~{spec['tokens']} of ~{spec['total_tokens']} description tokens"
+        )
+        assignment_desc += (
+            "\n\nRELEVANT SPECIFICATION SECTIONS (from the assignment PDF):\n"
+            + spec["text"]
+        )
+
     enhanced_desc = f"""
 ASSIGNMENT DESCRIPTION:
 {assignment_desc}
@@ -934,33 +1113,45 @@ CODE ANALYSIS SUMMARY:
 - Comment Lines: {code_analysis['comment_lines']}
 """
 
-    print_section("🤖 GENERATING GRADING PROMPT", "", Colors.GREEN)
-    grading_prompt = get_grading_prompt(
-        assignment_type=assignment_type,
-        practice_description=enhanced_desc,
-        test_results=test_results["execution_summary"],
-        static_analysis=analysis_report,
-        source_code=source_code,
-    )
+    return {
+        "test_results": test_results,
+        "starter_files": starter_files,
+        "analysis_report": analysis_report,
+        "source_code": source_code,
+        "archive_matches": archive_matches,
+        "enhanced_desc": enhanced_desc,
+        "signature": signature,
+        "prompt_version": prompt_version,
+        "reuse": reuse,
+    }
 
-    format_instructions = get_format_instructions("A6", A6GradingOutput)
 
-    print("✅ Enhanced grading prompt generated")
-    print(f"📏 Prompt length: {len(grading_prompt):,} characters")
+def _grading_inputs(submission):
+    """Keyword arguments for langchain_integration grading from a prepared submission."""
+    test_results = submission["test_results"]
+    return {
+        "test_results": test_results["execution_summary"],
+        "static_analysis": submission["analysis_report"],
+        "source_code": submission["source_code"],
+        "practice_description": submission["enhanced_desc"],
+        "test_pass_rate": (
+            test_results["passed_tests"] / test_results["total_tests"]
+            if test_results.get("total_tests")
+            else None
+        ),
+    }
 
-    print_section("🎯 RUNNING AI GRADING", "", Colors.GREEN)
-    try:
-        llm_response = langchain_integration.grade_student_project(
-            test_results=test_results["execution_summary"],
-            static_analysis=analysis_report,
-            source_code=source_code,
-            practice_description=enhanced_desc,
-            assignment_type=assignment_type,
-            student_id=student_id,
-        )
 
-        print("✅ Grading completed successfully!")
+def _report_grading(student_id, assignment_type, submission, llm_response):
+    """Display a grading result, update the sheet and save the full feedback."""
+    test_results = submission["test_results"]
+    analysis_report = submission["analysis_report"]
+    source_code = submission["source_code"]
+    starter_files = submission["starter_files"]
+    archive_matches = submission["archive_matches"]
+    reuse = submission["reuse"]
 
+    try:
         # Display results
         grading_data = llm_response.model_dump()
 
@@ -1085,19 +1276,29 @@ CODE ANALYSIS SUMMARY:
             f"{Colors.BLUE}All assignments (A1-A6) now have comprehensive recommendations.{Colors.END}"
         )
 
+        # Triage grades come from a subset of the judge tests: they are shown
+        # and saved as feedback, but neither recorded as the grade nor reused
+        interim = config.TRIAGE_CONFIG["enabled"]
         if assignment_type == "A6":
             final_grade_data = calculate_a6_scores(
                 llm_response.model_dump(), test_results
             )
-            sheets_updater.update_multi_phase_grades(
-                student_id, final_grade_data, assignment_type
-            )
+            if not interim:
+                sheets_updater.update_multi_phase_grades(
+                    student_id, final_grade_data, assignment_type
+                )
         else:
             final_grade_data = calculate_scores(
                 llm_response.model_dump(), test_results, assignment_type
             )
-            sheets_updater.update_student_grade(
-                student_id, final_grade_data, assignment_type
+            if not interim:
+                sheets_updater.update_student_grade(
+                    student_id, final_grade_data, assignment_type
+                )
+        if interim:
+            print(
+                f"{Colors.YELLOW}⚡ Triage grade: not written to the sheet or "
+                f"the reuse store{Colors.END}"
             )
 
         # Save full feedback
@@ -1109,8 +1310,33 @@ CODE ANALYSIS SUMMARY:
             test_results,
             analysis_report,
             source_code,
+            excluded_files=starter_files,
+            archive_matches=archive_matches,
+            reuse=reuse,
         )
 
+        if (
+            submission["signature"]
+            and not interim
+            and not (reuse and reuse["mode"] == "all_stages")
+        ):
+            reuse_store = submission_reuse.ReuseStore()
+            try:
+                reuse_store.add(
+                    submission["signature"],
+                    assignment_type,
+                    student_id,
+                    source_code,
+                    test_results,
+                    analysis_report,
+                    llm_response.model_dump(),
+                    reused_from=reuse["entry_id"] if reuse else None,
+                    reuse_kind=reuse["mode"] if reuse else None,
+                    prompt_version=submission["prompt_version"],
+                )
+            finally:
+                reuse_store.close()
+
         print(
             f"✅ Student {student_id} processed successfully! Saved feedback to: {details_path}"
         )
@@ -1121,6 +1347,149 @@ CODE ANALYSIS SUMMARY:
         return None
 
 
+def _grade_student_flow(student_id, repo_url, assignment_type):
+    """Run full grading pipeline for a single student and return summary paths."""
+    submission = _prepare_submission(student_id, repo_url, assignment_type)
+    if submission is None:
+        return None
+
+    print_section("🎯 RUNNING AI GRADING", "", Colors.GREEN)
+    try:
+        llm_response = _grade_prepared(student_id, assignment_type, submission)
+    except Exception as e:
+        print(f"{Colors.RED}❌ Grading failed: {e}{Colors.END}")
+        return None
+
+    print("✅ Grading completed successfully!")
+    return _report_grading(student_id, assignment_type, submission, llm_response)
+
+
+def _grade_students(rows):
+    """Grade sheet rows one at a time, overlapping their LLM grading requests.
+
+    Submissions are prepared (cloned, judged, analysed) in order, and their
+    grading stage runs in a pool of llm_clients.stage_concurrency("grading")
+    threads: a local server's slot count, else one request at a time as
+    before. Results are reported in row order as they complete.
+    """
+    workers = llm_clients.stage_concurrency("grading")
+    if workers <= 1:
+        for student_id, repo_url, assignment_type in rows:
+            _grade_student_flow(student_id, repo_url, assignment_type)
+        return
+
+    def report(student_id, assignment_type, submission, future):
+        try:
+            llm_response = future.result()
+        except Exception as e:
+            print(f"{Colors.RED}❌ Grading failed for {student_id}: {e}{Colors.END}")
+            return
+        _report_grading(student_id, assignment_type, submission, llm_response)
+
+    print(f"🎯 Grading up to {workers} submissions at once (server slots)")
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for student_id, repo_url, assignment_type in rows:
+            submission = _prepare_submission(student_id, repo_url, assignment_type)
+            if submission is not None:
+                future = executor.submit(
+                    _grade_prepared, student_id, assignment_type, submission
+                )
+                pending.append((student_id, assignment_type, submission, future))
+            while pending and pending[0][3].done():
+                report(*pending.popleft())
+        while pending:
+            report(*pending.popleft())
+
+
+def _grade_prepared(student_id, assignment_type, submission):
+    """Grade a prepared submission, reusing a graded twin's result where possible."""
+    reuse = submission["reuse"]
+    inputs = _grading_inputs(submission)
+
+    if reuse and reuse["mode"] == "all_stages":
+        print(f"♻️  Reusing the grading of identical submission {reuse['student_id']}")
+        grading_model = langchain_integration.get_grading_model(assignment_type)
+        llm_response = grading_model(**reuse["grading_result"])
+        langchain_integration.save_grading_output(
+            llm_response,
+            assignment_type,
+            student_id,
+            reuse["grading_result"],
+            reuse={"kind": "exact", "twin_student_id": reuse["student_id"]},
+        )
+        return llm_response
+
+    if reuse and reuse["mode"] == "diff_review":
+        print(
+            f"♻️  Diff-only review against {reuse['student_id']} "
+            f"({len(reuse['diff']):,} diff characters)"
+        )
+        return langchain_integration.grade_near_duplicate(
+            assignment_type,
+            reuse,
+            reuse["diff"],
+            inputs["test_results"],
+            inputs["static_analysis"],
+            student_id,
+        )
+
+    return langchain_integration.grade_student_project(
+        assignment_type=assignment_type, student_id=student_id, **inputs
+    )
+
+
+def _grade_students_batched(rows):
+    """Grade sheet rows, packing small assignments into batched LLM requests.
+
+    Submissions of BATCH_GRADING_CONFIG["assignments"] are prepared first and
+    then graded together per assignment; other assignments, and submissions
+    whose grading is reused from a graded twin, use the normal per-student
+    flow.
+    """
+    pending = {}
+    for student_id, repo_url, assignment_type in rows:
+        if assignment_type not in config.BATCH_GRADING_CONFIG["assignments"]:
+            _grade_student_flow(student_id, repo_url, assignment_type)
+            continue
+        submission = _prepare_submission(student_id, repo_url, assignment_type)
+        if submission is None:
+            continue
+        if submission["reuse"] and submission["reuse"]["mode"] != "tests_only":
+            try:
+                llm_response = _grade_prepared(student_id, assignment_type, submission)
+            except Exception as e:
+                print(f"{Colors.RED}❌ Grading failed: {e}{Colors.END}")
+                continue
+            _report_grading(student_id, assignment_type, submission, llm_response)
+            continue
+        pending.setdefault(assignment_type, []).append((student_id, submission))
+
+    for assignment_type, entries in pending.items():
+        print_section(
+            f"🎯 RUNNING BATCHED AI GRADING ({assignment_type})", "", Colors.GREEN
+        )
+        outputs, batch_stats = langchain_integration.grade_student_projects_batched(
+            assignment_type,
+            [
+                {"student_id": student_id, **_grading_inputs(submission)}
+                for student_id, submission in entries
+            ],
+        )
+        print(
+            f"✅ {len(entries)} submissions in {batch_stats['batches']} batched requests "
+            f"({batch_stats['batched_submissions']} graded in batch, "
+            f"{batch_stats['single_requests']} individually) in {batch_stats['seconds']:.1f}s"
+        )
+
+        for student_id, submission in entries:
+            llm_response = outputs.get(student_id)
+            if llm_response is None:
+                print(f"{Colors.RED}❌ Grading failed for {student_id}{Colors.END}")
+                continue
+            _report_grading(student_id, assignment_type, submission, llm_response)
+
+
 def run_cli():
     parser = argparse.ArgumentParser(description="AP Grader Agent - CLI")
     sub = parser.add_subparsers(dest="mode", required=True)
@@ -1134,45 +1503,434 @@ def run_cli():
         "--num", type=int, default=3, help="Number of test cases to generate"
     )
     g.add_argument("--llm", action="store_true", help="Use LLM for generation")
+    g.add_argument(
+        "--samples",
+        action="store_true",
+        help="Extract all worked examples from the PDF as judge tests (no LLM)",
+    )
+    g.add_argument(
+        "--dest",
+        help="Directory for --samples tests (default test_cases/practice<N>/samples)",
+    )
+    g.add_argument(
+        "--reference",
+        nargs="?",
+        const=True,
+        help="Take expected outputs from a reference solution "
+        "(default reference_solutions/<assignment>)",
+    )
+    g.add_argument(
+        "--ref-args", default="", help="Arguments for the reference, e.g. CSV paths"
+    )
+
+    # Reference oracle mode
+    o = sub.add_parser(
+        "oracle",
+        help="Compute expected outputs for candidate inputs with a reference solution",
+    )
+    o.add_argument("assignment", help="Assignment key (e.g., A1 or A6.2)")
+    o.add_argument("inputs", help="Directory searched recursively for *.in files")
+    o.add_argument(
+        "--reference",
+        help="Reference solution (default reference_solutions/<assignment>)",
+    )
+    o.add_argument(
+        "--ref-args", default="", help="Arguments for the reference, e.g. CSV paths"
+    )
+    o.add_argument(
+        "--dest", help="Output directory (default test_cases/practice<N>/verified)"
+    )
+
+    # Stress-test mode
+    st = sub.add_parser(
+        "stress",
+        help="Generate randomized stress tests from an input grammar and a reference",
+    )
+    st.add_argument(
+        "assignment",
+        choices=sorted(stress_tests.GRAMMARS),
+        help="Assignment grammar (A6.<phase> for the A6 phases)",
+    )
+    st.add_argument("--size", choices=["small", "large"], default="small")
+    st.add_argument("--count", type=int, help="Number of input scripts")
+    st.add_argument("--seed", type=int, help="Random seed (default: time-based)")
+    st.add_argument(
+        "--reference",
+        help="Reference solution (default reference_solutions/<assignment>)",
+    )
+    st.add_argument(
+        "--dest", help="Suite directory (default test_cases/practice<N>/stress/...)"
+    )
+    st.add_argument(
+        "--measure",
+        metavar="PROJECT",
+        help="Instead of generating, time a checked-out submission on the large suites",
+    )
+
+    # Coverage triage mode
+    tg = sub.add_parser(
+        "triage",
+        help="Pick a coverage-preserving subset of judge tests for triage grading",
+    )
+    tg.add_argument("assignment", help="Assignment key (e.g., A2, A6 or A6.2)")
 
     # Grade mode
     r = sub.add_parser("grade", help="Run grading for students (single or batch)")
     r.add_argument("--student", help="Student ID (single) or 'all' for sheet batch")
     r.add_argument("--repo", help="Repository URL for single student")
     r.add_argument("--assignment", help="Assignment type for single student (A1..A6)")
+    r.add_argument(
+        "--triage",
+        action="store_true",
+        help="Interim grading: run only the judge tests selected by 'triage', "
+        "without writing the sheet or the reuse store",
+    )
+
+    # Starter-code index mode
+    s = sub.add_parser(
+        "starter-index",
+        help="Register instructor-provided starter/vendor files for an assignment",
+    )
+    s.add_argument("assignment", help="Assignment key (e.g., A6)")
+    s.add_argument("paths", nargs="+", help="Directories containing starter files")
+
+    # Plagiarism mode
+    p = sub.add_parser(
+        "plagiarism", help="Run cohort-wide similarity detection for an assignment"
+    )
+    p.add_argument("assignment", help="Assignment key (e.g., A1)")
+    p.add_argument(
+        "--dir",
+        default=config.CLONE_DIR,
+        help="Directory with one checked-out submission per subdirectory",
+    )
+    p.add_argument("--phase", help="Sheet phase for multi-phase assignments")
+    p.add_argument(
+        "--update-sheet",
+        action="store_true",
+        help="Write per-student maximum similarity to the plagiarism column",
+    )
+
+    # Similarity archive mode
+    a = sub.add_parser(
+        "archive", help="Manage the persistent cross-semester similarity archive"
+    )
+    a.add_argument("action", choices=["ingest", "query", "compact", "stats"])
+    a.add_argument(
+        "path", nargs="?", help="repos.json (ingest) or project directory (query)"
+    )
+    a.add_argument("--assignment", help="Assignment key (e.g., A6)")
+    a.add_argument(
+        "--semester",
+        help="Semester label stored with ingested entries (query: semester to skip)",
+    )
+
+    # Response statistics mode
+    rs = sub.add_parser(
+        "response-stats",
+        help="Summarize LLM parse failures and retries from saved grading outputs",
+    )
+    rs.add_argument(
+        "--dir",
+        help="Grading outputs directory (default grading_outputs/ and the artifact archive)",
+    )
+
+    # Artifact archive mode
+    ar = sub.add_parser(
+        "artifacts",
+        help="Query, export and compact the archive of raw LLM responses and grading outputs",
+    )
+    ar.add_argument(
+        "action", choices=["runs", "list", "show", "export", "compact", "stats"]
+    )
+    ar.add_argument(
+        "target", nargs="?", help="Record ID (show) or destination path (export)"
+    )
+    ar.add_argument("--student", help="Filter by student ID")
+    ar.add_argument("--assignment", help="Filter by assignment key (e.g., A6)")
+    ar.add_argument("--run", help="Filter by run ID")
+    ar.add_argument(
+        "--kind", help="Filter by record kind (raw_response, grading_output)"
+    )
+    ar.add_argument(
+        "--limit", type=int, help="Maximum number of runs or records listed"
+    )
+    ar.add_argument(
+        "--format",
+        default="jsonl",
+        choices=["jsonl", "files"],
+        help="Export as one JSONL file or as one file per record",
+    )
+
+    # LLM telemetry report mode
+    tr = sub.add_parser(
+        "telemetry", help="Aggregate per-call LLM token, cost and latency telemetry"
+    )
+    tr.add_argument(
+        "--by",
+        default="assignment",
+        choices=["assignment", "stage", "label", "student_id", "model", "backend"],
+        help="Record field to group by",
+    )
+    tr.add_argument("--path", help="Telemetry JSONL file (default from config)")
+
+    # LLM backend benchmark mode
+    lb = sub.add_parser(
+        "llm-bench",
+        help="Replay recorded prompts against a backend and compare with Gemini",
+    )
+    lb.add_argument(
+        "--backend",
+        default="local",
+        choices=list(llm_clients.BACKEND_MODES),
+        help="Backend to send the recorded prompts to",
+    )
+    lb.add_argument("--limit", type=int, help="Maximum number of recorded prompts")
+    lb.add_argument(
+        "--workers", type=int, help="Concurrent requests (default: server slots)"
+    )
 
     args = parser.parse_args()
 
-    if args.mode == "generate":
+    if args.mode == "llm-bench":
+        result = llm_clients.benchmark_recordings(
+            args.backend, limit=args.limit, workers=args.workers
+        )
+        print_header(f"⏱️ LLM BACKEND BENCHMARK ({args.backend.upper()})")
+        if not result["requests"]:
+            print("No recordings with prompts found; record some with LLM_BACKEND=record")
+            return
+        print(
+            f"  {args.backend}: {result['requests_per_second']} req/s, "
+            f"{result['mean_latency_seconds']}s mean latency, "
+            f"{result['output_chars_per_second']} chars/s with {result['workers']} "
+            f"workers ({result['failed']} failed of {result['requests']})"
+        )
+        print(
+            f"  recorded Gemini: {result['recorded_requests_per_second']} req/s, "
+            f"{result['recorded_mean_latency_seconds']}s mean latency, "
+            f"{result['recorded_output_chars_per_second']} chars/s"
+        )
+
+    elif args.mode == "telemetry":
+        report = telemetry.aggregate_report(args.path, by=args.by)
+        print_header(f"📈 LLM TELEMETRY BY {args.by.upper()}")
+        if not report:
+            print("No telemetry records found")
+        for key, group in report.items():
+            print(
+                f"  {key}: {group['calls']} calls ({group['cache_hits']} cached, "
+                f"{group['failed_attempts']} failed), {group['prompt_tokens']} in / "
+                f"{group['output_tokens']} out tokens, ${group['cost_usd']:.4f}, "
+                f"{group['seconds']}s ({group['mean_seconds_per_call']}s/call), "
+                f"{group['students']} students"
+            )
+
+    elif args.mode == "response-stats":
+        summary = langchain_integration.summarize_response_stats(args.dir)
+        if not summary:
+            print("No grading outputs with response stats found")
+        for mode, totals in summary.items():
+            print(f"{mode}: {json.dumps(totals)}")
+
+        routing = langchain_integration.summarize_routing(args.dir)
+        if routing:
+            print(f"routing: {json.dumps(routing)}")
+
+    elif args.mode == "artifacts":
+        archive = artifact_archive.ArtifactArchive()
+        filters = {
+            "student_id": args.student,
+            "assignment": args.assignment,
+            "run_id": args.run,
+            "kind": args.kind,
+        }
+        try:
+            if args.action == "runs":
+                for run in archive.runs(args.limit or 20):
+                    print(
+                        f"  {run['run_id']}  {run['started']}  {run['records']} records  "
+                        f"{run['command']}"
+                    )
+            elif args.action == "list":
+                for entry in archive.find(limit=args.limit or 50, **filters):
+                    print(
+                        f"  #{entry['id']} {entry['created']} {entry['run_id']} "
+                        f"{entry['kind']} {entry['student_id'] or '-'} "
+                        f"{entry['label'] or entry['assignment'] or '-'} ({entry['size']:,} bytes)"
+                    )
+            elif args.action == "show":
+                record = archive.read(int(args.target))
+                print(json.dumps(record, indent=2, ensure_ascii=False))
+            elif args.action == "export":
+                count = archive.export(args.target, args.format, **filters)
+                print(f"Exported {count} records to {args.target}")
+            elif args.action == "compact":
+                print(f"Artifact archive compacted: {archive.compact()}")
+            else:
+                print(f"Artifact archive stats: {archive.stats()}")
+        finally:
+            archive.close()
+
+    elif args.mode == "archive":
+        archive = similarity_archive.SimilarityArchive()
+        try:
+            if args.action == "ingest":
+                added = similarity_archive.ingest_repos_file(
+                    archive, args.path, args.assignment, args.semester
+                )
+                print(f"Archived {added} new submissions")
+            elif args.action == "query":
+                hashes = plagiarism.fingerprint_submission(args.path)["hashes"]
+                matches = archive.query(
+                    hashes,
+                    assignment=args.assignment,
+                    exclude_semester=args.semester or False,
+                )
+                for match in matches:
+                    print(
+                        f"  {match['similarity']:.1f}% {match['student_id']} "
+                        f"{match['semester'] or ''} {match['repo_url']}"
+                    )
+            elif args.action == "compact":
+                print(f"Archive compacted: {archive.compact()}")
+            else:
+                print(f"Archive stats: {archive.stats()}")
+        finally:
+            archive.close()
+
+    elif args.mode == "plagiarism":
+        submissions = plagiarism.collect_submissions(args.dir)
+        report = plagiarism.detect_plagiarism(submissions, args.assignment)
+        report_path = plagiarism.save_plagiarism_report(report)
+
+        print_header(f"🕵️ PLAGIARISM REPORT: {args.assignment}")
+        print(
+            f"Compared {report['students']} submissions "
+            f"({report['candidate_pairs']} candidate pairs) in {report['total_seconds']}s"
+        )
+        for pair in report["pairs"][:10]:
+            print(f"  {pair['a']} ↔ {pair['b']}: {pair['similarity']:.1f}%")
+        print(f"Full report saved to: {report_path}")
+
+        if args.update_sheet:
+            sheets_updater.update_plagiarism_scores(
+                report["max_similarity"], args.assignment, args.phase
+            )
+
+    elif args.mode == "starter-index":
+        index_path = fingerprints.build_starter_index(args.assignment, args.paths)
+        print(f"Starter index saved to: {index_path}")
+
+    elif args.mode == "generate":
+        if args.samples:
+            manifest = sample_tests.extract_sample_tests(args.assignment, args.dest)
+            for test in manifest["tests"]:
+                print(
+                    f"  {test['input']:<24} {test['pdf']} p.{test['input_page']} "
+                    f"{test['input_label']} -> {test['output_label']}"
+                )
+            print(
+                f"Extracted {len(manifest['tests'])} sample tests for "
+                f"{args.assignment} at: {manifest['directory']} (see samples.json)"
+            )
+            return
+
         # Generate testcases
         tests_dir = tools.generate_testcases_from_description(
-            args.assignment, args.num, args.llm
+            args.assignment,
+            args.num,
+            args.llm,
+            reference=args.reference,
+            reference_args=shlex.split(args.ref_args),
         )
         print(f"Generated test cases at: {tests_dir}")
 
+    elif args.mode == "oracle":
+        manifest = tools.verify_testcases(
+            args.assignment,
+            args.inputs,
+            reference=args.reference,
+            reference_args=shlex.split(args.ref_args),
+            dest=args.dest,
+        )
+        print(
+            f"Kept {len(manifest['tests'])}/{manifest['candidates']} inputs in "
+            f"{manifest['seconds']}s, rejected: {manifest['rejected'] or 'none'}"
+        )
+        print(f"Verified tests at: {manifest['directory']} (see verified.json)")
+
+    elif args.mode == "stress":
+        if args.measure:
+            performance = stress_tests.measure_performance(
+                args.measure, args.assignment
+            )
+            print(performance["summary"] if performance else "No large stress suites")
+            return
+
+        manifest = stress_tests.generate_suite(
+            args.assignment,
+            args.size,
+            count=args.count,
+            seed=args.seed,
+            reference=args.reference,
+            dest=args.dest,
+        )
+        print(
+            f"Kept {len(manifest['tests'])}/{manifest['candidates']} scripts "
+            f"(seed {manifest['seed']}, rejected: {manifest['rejected'] or 'none'})"
+        )
+        print(f"Stress suite at: {manifest['directory']} (see stress.json)")
+
+    elif args.mode == "triage":
+        reports = coverage_triage.analyze(args.assignment)
+        if not reports:
+            print(f"No judge tests with a reference solution for {args.assignment}")
+            return
+        print(coverage_triage.render_reports(reports))
+        print("Selections saved as triage.json beside each judge tests directory")
+
     elif args.mode == "grade":
-        if args.student == "all":
-            # Batch from sheet
-            sheet = sheets_updater.get_sheet()
-            student_ids = sheet.col_values(1)[1:]
-            github_urls = sheet.col_values(4)[1:]
-            assignment_types = sheet.col_values(5)[1:]
-
-            for student_id, repo_url, assignment_type in zip(
-                student_ids, github_urls, assignment_types
-            ):
-                if not repo_url or not assignment_type:
-                    print(f"Skipping {student_id}: missing data")
-                    continue
-                _grade_student_flow(student_id, repo_url, assignment_type)
-        else:
-            # Single student
-            if not args.student or not args.repo or not args.assignment:
+        try:
+            if args.triage:
+                config.TRIAGE_CONFIG["enabled"] = True
+            if args.student == "all":
+                # Batch from sheet
+                sheet = sheets_updater.get_sheet()
+                student_ids = sheet.col_values(1)[1:]
+                github_urls = sheet.col_values(4)[1:]
+                assignment_types = sheet.col_values(5)[1:]
+
+                rows = []
+                for student_id, repo_url, assignment_type in zip(
+                    student_ids, github_urls, assignment_types
+                ):
+                    if not repo_url or not assignment_type:
+                        print(f"Skipping {student_id}: missing data")
+                        continue
+                    rows.append((student_id, repo_url, assignment_type))
+
+                if config.BATCH_GRADING_CONFIG["enabled"]:
+                    _grade_students_batched(rows)
+                else:
+                    _grade_students(rows)
+            else:
+                # Single student
+                if not args.student or not args.repo or not args.assignment:
+                    print(
+                        "For single student grading provide --student, --repo and --assignment"
+                    )
+                    return
+                _grade_student_flow(args.student, args.repo, args.assignment)
+        finally:
+            # Also on errors and Ctrl-C: uploaded caches cost until their TTL
+            for prefix_stats in llm_clients.release_prefix_caches():
                 print(
-                    "For single student grading provide --student, --repo and --assignment"
+                    f"Prompt prefix {prefix_stats['label']}: "
+                    f"{prefix_stats['requests']} requests, "
+                    f"hit rate {prefix_stats['hit_rate']:.0%}"
+                    f"{' (explicit cache)' if prefix_stats['explicit'] else ''}"
                 )
-                return
-            _grade_student_flow(args.student, args.repo, args.assignment)
 
 
 if __name__ == "__main__":
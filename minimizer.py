@@ -0,0 +1,352 @@
+"""
+Failing-input minimisation for feedback.
+
+When a submission fails judge tests, explain_failures() reruns them on a
+build of the submission, finds the failing ones and shrinks each failing
+input with delta debugging (ddmin over input lines) while the submission
+keeps diverging from the reference solution in the same way (wrong answer
+or crash). Candidate inputs run in parallel and the work per student is
+capped by MINIMIZER_CONFIG["budget"] executions and ["seconds"]. The short
+reproducer and the first divergent output line replace the raw judge log in
+the grading prompt and are written to the feedback file. In triage mode only
+the coverage-selected judge tests are rerun.
+"""
+
+import os
+import re
+import time
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+import config
+import coverage_triage
+import reference_oracle
+import stress_tests
+
+logger = logging.getLogger(__name__)
+
+
+def ddmin(
+    items: Sequence[str],
+    is_failing: Callable[[List[str]], bool],
+    workers: int = 1,
+    budget: int = 200,
+) -> tuple:
+    """Minimise a failing list with Zeller's ddmin.
+
+    Each round tests the n chunks and their complements as one parallel
+    batch. Untested candidates count as passing once the budget runs out, so
+    the result is always a failing list, if not a 1-minimal one.
+
+    Returns:
+        (minimal failing items, number of is_failing calls)
+    """
+    cache = {}
+    runs = 0
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+
+        def failing(candidates: List[tuple]) -> List[tuple]:
+            nonlocal runs
+            todo = list(dict.fromkeys(c for c in candidates if c not in cache))
+            todo = todo[: max(budget - runs, 0)]
+            results = executor.map(
+                lambda candidate: is_failing([items[i] for i in candidate]), todo
+            )
+            cache.update(zip(todo, results))
+            runs += len(todo)
+            return [candidate for candidate in candidates if cache.get(candidate)]
+
+        current = tuple(range(len(items)))
+        n = 2
+        while len(current) >= 2 and runs < budget:
+            size = -(-len(current) // n)
+            chunks = [current[i : i + size] for i in range(0, len(current), size)]
+            complements = [
+                tuple(i for i in current if i not in set(chunk)) for chunk in chunks
+            ]
+            found = failing(chunks + complements)
+            subsets = [c for c in found if c in chunks]
+            if subsets:
+                current, n = subsets[0], 2
+            elif found:
+                current, n = found[0], max(n - 1, 2)
+            elif n < len(current):
+                n = min(n * 2, len(current))
+            else:
+                break
+
+    return [items[i] for i in current], runs
+
+
+def _lines(output: str) -> List[str]:
+    normalized = reference_oracle.normalize_output(output)
+    return normalized.split("\n") if normalized else []
+
+
+def divergence(expected: str, actual: str) -> Optional[dict]:
+    """First differing output line, compared like diff -bB, or None if equal.
+
+    Returns:
+        {"line", "expected", "actual"}; a missing line is "<end of output>"
+    """
+    expected_lines, actual_lines = _lines(expected), _lines(actual)
+    for number in range(max(len(expected_lines), len(actual_lines))):
+        want = expected_lines[number] if number < len(expected_lines) else None
+        got = actual_lines[number] if number < len(actual_lines) else None
+        if want != got:
+            return {
+                "line": number + 1,
+                "expected": want if want is not None else "<end of output>",
+                "actual": got if got is not None else "<end of output>",
+            }
+    return None
+
+
+def _outcome(run: dict, expected: str) -> Optional[str]:
+    """Failure kind of a run (wrong_answer, crash, timeout, output_limit) or None."""
+    if run["status"] != "ok":
+        return run["status"]
+    return "wrong_answer" if divergence(expected, run["output"]) else None
+
+
+def minimize_failure(
+    student: str,
+    reference: str,
+    input_text: str,
+    args: Sequence[str] = (),
+    budget: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> Optional[dict]:
+    """Shrink an input on which the student's program diverges from the reference.
+
+    Args:
+        student, reference: Executables
+        input_text: Failing input
+        args: Command-line arguments for both (CSV paths)
+        budget: Maximum candidate executions (default MINIMIZER_CONFIG["budget"])
+        deadline: time.monotonic() value after which candidates count as passing
+
+    Returns:
+        None if the reference fails on the input or the student does not
+        diverge; else {"input", "outcome", "divergence", "lines_before",
+        "lines_after", "executions"}
+    """
+    minimizer_config = config.MINIMIZER_CONFIG
+    timeout = minimizer_config["timeout"]
+    budget = budget or minimizer_config["budget"]
+
+    def outcome(text: str) -> tuple:
+        expected = reference_oracle.run_sandboxed(reference, text, args, timeout)
+        if expected["status"] != "ok":
+            return None, expected, None
+        actual = reference_oracle.run_sandboxed(student, text, args, timeout)
+        return _outcome(actual, expected["output"]), expected, actual
+
+    original, _, _ = outcome(input_text)
+    if original is None:
+        return None
+
+    lines = input_text.splitlines()
+    executions = 0
+    if original != "timeout":
+
+        def is_failing(candidate: List[str]) -> bool:
+            if deadline and time.monotonic() > deadline:
+                return False
+            return outcome("\n".join(candidate) + "\n")[0] == original
+
+        lines, executions = ddmin(
+            lines, is_failing, minimizer_config["workers"], budget
+        )
+
+    reproducer = "\n".join(lines) + "\n"
+    _, expected, actual = outcome(reproducer)
+    return {
+        "input": reproducer,
+        "outcome": original,
+        "divergence": divergence(expected["output"], actual["output"])
+        or {"line": None, "expected": "", "actual": f"<{actual['status']}>"},
+        "lines_before": len(input_text.splitlines()),
+        "lines_after": len(lines),
+        "executions": executions + 2,
+    }
+
+
+def _compile_reference(key: str, assignment: str) -> Optional[str]:
+    # Per-phase reference (A6.2) first, then the assignment's (A6)
+    for candidate in dict.fromkeys([key, assignment]):
+        try:
+            return reference_oracle.compile_reference(candidate)
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def explain_failures(
+    project_path: str, assignment: str, student_id: Optional[str] = None
+) -> Optional[dict]:
+    """Find the submission's failing judge tests and minimise them.
+
+    The submission is built like the judge builds it. Without a reference
+    solution the failures are still located and their first divergent line
+    reported, but not minimised.
+
+    Returns:
+        None if the submission does not build or has no judge tests, else
+        {"failures": [{"test", "outcome", "divergence", "reproducer",
+        "lines_before", "lines_after", "executions"}], "results": {test:
+        outcome or "passed"}, "executions", "summary"}
+    """
+    minimizer_config = config.MINIMIZER_CONFIG
+    suites = stress_tests.judge_suites(assignment)
+    if not suites:
+        return None
+
+    started = time.monotonic()
+    deadline = started + minimizer_config["seconds"]
+    budget = minimizer_config["budget"]
+    failures = []
+    results = {}
+    executions = 0
+    with tempfile.TemporaryDirectory(prefix="minimize-build-") as build_root:
+        try:
+            student = reference_oracle.build_executable(
+                project_path,
+                build_root,
+                "submission",
+                config.PRACTICE_CONFIGS.get(assignment.split(".")[0], {}),
+                compile_command=config.STRESS_TEST_CONFIG["compile_command"],
+            )
+        except RuntimeError as e:
+            logger.warning(f"Cannot build {project_path} for minimisation: {e}")
+            return None
+
+        for key, tests_dir, args in suites:
+            label = os.path.basename(os.path.dirname(tests_dir))
+            tests = reference_oracle.read_test_files(tests_dir)
+            if config.TRIAGE_CONFIG["enabled"]:
+                selected = coverage_triage.selected_tests(tests_dir)
+                if selected is not None:
+                    tests = [test for test in tests if test[0] in selected]
+            with ThreadPoolExecutor(minimizer_config["workers"]) as executor:
+                runs = list(
+                    executor.map(
+                        lambda test: reference_oracle.run_sandboxed(
+                            student,
+                            test[1],
+                            args,
+                            config.STRESS_TEST_CONFIG["time_limit"],
+                        ),
+                        tests,
+                    )
+                )
+            for (name, input_text, expected), run in zip(tests, runs):
+                test = f"{label}/{name}"
+                outcome = _outcome(run, expected)
+                results[test] = outcome or "passed"
+                if outcome is None:
+                    continue
+                failures.append(
+                    {
+                        "test": test,
+                        "key": key,
+                        "args": args,
+                        "input": input_text,
+                        "outcome": outcome,
+                        "divergence": divergence(expected, run["output"])
+                        or {"line": None, "expected": "", "actual": f"<{outcome}>"},
+                        "reproducer": None,
+                        "lines_before": len(input_text.splitlines()),
+                        "lines_after": None,
+                        "executions": 0,
+                    }
+                )
+
+        # Shortest failing inputs first: they minimise fastest
+        failures.sort(key=lambda failure: failure["lines_before"])
+        references = {}
+        for failure in failures[: minimizer_config["max_failures"]]:
+            remaining = budget - executions
+            if remaining <= 2 or time.monotonic() > deadline:
+                break
+            key = failure["key"]
+            if key not in references:
+                references[key] = _compile_reference(key, assignment)
+            if not references[key]:
+                continue
+            minimized = minimize_failure(
+                student,
+                references[key],
+                failure["input"],
+                failure["args"],
+                budget=remaining - 2,
+                deadline=deadline,
+            )
+            if minimized:
+                failure.update(
+                    {
+                        "reproducer": minimized["input"],
+                        "divergence": minimized["divergence"],
+                        "lines_after": minimized["lines_after"],
+                        "executions": minimized["executions"],
+                    }
+                )
+                executions += minimized["executions"]
+
+    for failure in failures:
+        for key in ("key", "args", "input"):
+            failure.pop(key)
+    report = {
+        "failures": failures,
+        "results": results,
+        "executions": executions,
+        "seconds": round(time.monotonic() - started, 2),
+    }
+    report["summary"] = render_failures(report)
+    logger.info(
+        f"Minimised {sum(bool(f['reproducer']) for f in failures)}/{len(failures)} "
+        f"failing tests for {student_id or project_path} with {executions} runs "
+        f"in {report['seconds']}s"
+    )
+    return report
+
+
+def render_failures(report: dict, max_failures: Optional[int] = None) -> str:
+    """Failing tests with their first divergent line and reproducer, as text."""
+    max_failures = max_failures or config.MINIMIZER_CONFIG["max_failures"]
+    failures = report["failures"]
+    passed = sum(outcome == "passed" for outcome in report["results"].values())
+    lines = [f"Judge tests rerun: {passed}/{len(report['results'])} passed"]
+    for failure in failures[:max_failures]:
+        point = failure["divergence"]
+        where = f"output line {point['line']}" if point["line"] else "end of run"
+        lines.append("")
+        lines.append(f"❌ Test {failure['test']}: {failure['outcome']} at {where}")
+        lines.append(f"   Expected: {point['expected'][:200]}")
+        lines.append(f"   Got:      {point['actual'][:200]}")
+        if failure["reproducer"]:
+            lines.append(
+                f"   Minimal failing input ({failure['lines_after']} of "
+                f"{failure['lines_before']} lines):"
+            )
+            lines.extend(
+                f"      {line}" for line in failure["reproducer"].splitlines()[:40]
+            )
+    if len(failures) > max_failures:
+        others = ", ".join(failure["test"] for failure in failures[max_failures:])
+        lines.append("")
+        lines.append(f"Also failing: {others}")
+    return "\n".join(lines)
+
+
+def condense_judge_output(judge_output: str, report: dict) -> str:
+    """Judge summary lines (build, phases, pass counts) plus the failure report."""
+    kept = [
+        line
+        for line in judge_output.splitlines()
+        if re.search(r"Compiled|Build|Phase|Passed:|Failed:", line)
+    ]
+    return "\n".join(kept + ["", report["summary"]])
@@ -0,0 +1,319 @@
+"""
+Cohort-wide plagiarism detection.
+
+Each submission is tokenized with identifiers and literals normalized, its
+token stream is fingerprinted with winnowed k-gram hashes, and an inverted
+index over those hashes yields the candidate pairs worth comparing. Only
+pairs that share fingerprints are scored, so a cohort is processed in roughly
+linear time instead of comparing all N^2 pairs.
+"""
+
+import os
+import json
+import logging
+import zlib
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import config
+import fingerprints
+
+logger = logging.getLogger(__name__)
+
+
+_HASH_MOD = (1 << 61) - 1
+_HASH_BASE = 1_000_003
+
+
+def kgram_hashes(token_ids: List[int], k: int) -> List[int]:
+    """Return polynomial rolling hashes for every k-gram of token_ids."""
+    if len(token_ids) < k:
+        return []
+
+    power = pow(_HASH_BASE, k - 1, _HASH_MOD)
+    h = 0
+    for token_id in token_ids[:k]:
+        h = (h * _HASH_BASE + token_id) % _HASH_MOD
+
+    hashes = [h]
+    for i in range(k, len(token_ids)):
+        h = ((h - token_ids[i - k] * power) * _HASH_BASE + token_ids[i]) % _HASH_MOD
+        hashes.append(h)
+    return hashes
+
+
+def winnow(hashes: List[int], window: int) -> List[tuple]:
+    """Select (hash, position) fingerprints with robust winnowing.
+
+    The rightmost minimum of every window of `window` consecutive hashes is
+    kept, using a monotonic deque so the whole pass is O(n).
+    """
+    if not hashes:
+        return []
+    window = max(1, min(window, len(hashes)))
+
+    selected = []
+    candidates = deque()
+    last_selected = -1
+    for i, h in enumerate(hashes):
+        while candidates and hashes[candidates[-1]] >= h:
+            candidates.pop()
+        candidates.append(i)
+        if candidates[0] <= i - window:
+            candidates.popleft()
+
+        if i >= window - 1 and candidates[0] != last_selected:
+            last_selected = candidates[0]
+            selected.append((hashes[last_selected], last_selected))
+
+    return selected
+
+
+def _token_id(token: str) -> int:
+    """Stable integer ID for a token, identical across processes and runs."""
+    return zlib.crc32(token.encode("utf-8")) + 1
+
+
+def fingerprint_submission(
+    project_path: str, excluded_files: Optional[List[str]] = None
+) -> dict:
+    """Tokenize and fingerprint every source file of a submission.
+
+    Returns a dict with the winnowed hashes (hash -> first token position),
+    the (file, line) of every token for region reporting, and the token count.
+    """
+    plagiarism_config = config.PLAGIARISM_CONFIG
+    excluded = set(excluded_files or [])
+
+    token_ids = []
+    locations = []
+    for root, _, files in os.walk(project_path):
+        for file in sorted(files):
+            if not file.endswith(fingerprints.SOURCE_EXTENSIONS):
+                continue
+            file_path = os.path.join(root, file)
+            rel_path = os.path.relpath(file_path, project_path)
+            if rel_path in excluded:
+                continue
+
+            try:
+                with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+                    tokens = fingerprints.tokenize_source(f.read())
+            except OSError as e:
+                logger.warning(f"Could not read {file_path}: {e}")
+                continue
+
+            for token, line in tokens:
+                token_ids.append(_token_id(token))
+                locations.append((rel_path, line))
+
+    hashes = {}
+    selected = winnow(
+        kgram_hashes(token_ids, plagiarism_config["kgram"]),
+        plagiarism_config["window"],
+    )
+    for h, position in selected:
+        hashes.setdefault(h, position)
+
+    return {"hashes": hashes, "locations": locations, "tokens": len(token_ids)}
+
+
+def _matching_regions(fp_a: dict, fp_b: dict, shared: set, limit: int = 10) -> list:
+    """Group shared fingerprints into contiguous source regions for a pair."""
+    k = config.PLAGIARISM_CONFIG["kgram"]
+    gap = 2 * (config.PLAGIARISM_CONFIG["window"] + k)
+
+    positions = sorted((fp_a["hashes"][h], fp_b["hashes"][h]) for h in shared)
+    runs = []
+    for pos_a, pos_b in positions:
+        if runs and pos_a - runs[-1]["a_end"] <= gap:
+            run = runs[-1]
+            run["a_end"] = pos_a
+            run["b_start"] = min(run["b_start"], pos_b)
+            run["b_end"] = max(run["b_end"], pos_b)
+            run["fingerprints"] += 1
+        else:
+            runs.append(
+                {
+                    "a_start": pos_a,
+                    "a_end": pos_a,
+                    "b_start": pos_b,
+                    "b_end": pos_b,
+                    "fingerprints": 1,
+                }
+            )
+
+    def _span(locations, start, end):
+        end = min(end + k - 1, len(locations) - 1)
+        start_file, start_line = locations[start]
+        end_file, end_line = locations[end]
+        if start_file == end_file:
+            return f"{start_file}:{start_line}-{end_line}"
+        return f"{start_file}:{start_line}-{end_file}:{end_line}"
+
+    runs.sort(key=lambda r: r["a_end"] - r["a_start"], reverse=True)
+    return [
+        {
+            "a": _span(fp_a["locations"], run["a_start"], run["a_end"]),
+            "b": _span(fp_b["locations"], run["b_start"], run["b_end"]),
+            "tokens": run["a_end"] - run["a_start"] + k,
+            "fingerprints": run["fingerprints"],
+        }
+        for run in runs[:limit]
+    ]
+
+
+def compare_fingerprints(submission_fps: Dict[str, dict]) -> dict:
+    """Score every candidate pair of fingerprinted submissions.
+
+    Returns a report with ranked pairs and the per-student maximum similarity.
+    Similarity of a pair is the larger of the two containment ratios
+    (shared fingerprints / own fingerprints), as a percentage.
+    """
+    plagiarism_config = config.PLAGIARISM_CONFIG
+    student_ids = sorted(submission_fps)
+
+    inverted_index = defaultdict(list)
+    for student_id in student_ids:
+        for h in submission_fps[student_id]["hashes"]:
+            inverted_index[h].append(student_id)
+
+    max_postings = max(
+        10, int(plagiarism_config["max_document_frequency"] * len(student_ids))
+    )
+    common = set()
+    shared_counts = Counter()
+    for h, postings in inverted_index.items():
+        if len(postings) > max_postings:
+            common.add(h)
+            continue
+        for i in range(len(postings)):
+            for j in range(i + 1, len(postings)):
+                shared_counts[(postings[i], postings[j])] += 1
+
+    sizes = {
+        student_id: max(len(submission_fps[student_id]["hashes"].keys() - common), 1)
+        for student_id in student_ids
+    }
+
+    pairs = []
+    max_similarity = {
+        student_id: {"similarity": 0.0, "match": None} for student_id in student_ids
+    }
+    for (a, b), shared_count in shared_counts.items():
+        if shared_count < plagiarism_config["min_shared"]:
+            continue
+
+        fp_a, fp_b = submission_fps[a], submission_fps[b]
+        containment_a = shared_count / sizes[a]
+        containment_b = shared_count / sizes[b]
+        similarity = round(max(containment_a, containment_b) * 100, 1)
+
+        for student_id, other in ((a, b), (b, a)):
+            if similarity > max_similarity[student_id]["similarity"]:
+                max_similarity[student_id] = {"similarity": similarity, "match": other}
+
+        pair = {
+            "a": a,
+            "b": b,
+            "similarity": similarity,
+            "a_in_b": round(containment_a * 100, 1),
+            "b_in_a": round(containment_b * 100, 1),
+            "shared_fingerprints": shared_count,
+        }
+        if similarity >= plagiarism_config["report_threshold"]:
+            shared = (fp_a["hashes"].keys() & fp_b["hashes"].keys()) - common
+            pair["regions"] = _matching_regions(fp_a, fp_b, shared)
+        pairs.append(pair)
+
+    pairs.sort(key=lambda p: p["similarity"], reverse=True)
+
+    return {
+        "students": len(student_ids),
+        "candidate_pairs": len(shared_counts),
+        "ignored_common_fingerprints": len(common),
+        "pairs": pairs,
+        "max_similarity": max_similarity,
+    }
+
+
+def detect_plagiarism(submissions: Dict[str, str], assignment: str) -> dict:
+    """Run cohort-wide plagiarism detection.
+
+    Args:
+        submissions: Mapping of student ID to checked-out project path
+        assignment: Assignment key, used to exclude registered starter code
+
+    Returns:
+        Report dict (see compare_fingerprints) with timing information
+    """
+    start_time = datetime.now()
+    starter_index = fingerprints.load_starter_index(assignment)
+
+    student_ids = list(submissions)
+    paths = [submissions[student_id] for student_id in student_ids]
+    excluded = [
+        [
+            entry["path"]
+            for entry in fingerprints.find_starter_files(
+                path, assignment, starter_index
+            )
+        ]
+        for path in paths
+    ]
+
+    max_workers = config.PLAGIARISM_CONFIG["max_workers"]
+    if max_workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(fingerprint_submission, paths, excluded, chunksize=8)
+            )
+    else:
+        results = [fingerprint_submission(p, e) for p, e in zip(paths, excluded)]
+    submission_fps = dict(zip(student_ids, results))
+
+    fingerprint_time = (datetime.now() - start_time).total_seconds()
+    report = compare_fingerprints(submission_fps)
+    report["assignment"] = assignment
+    report["timestamp"] = datetime.now().isoformat()
+    report["fingerprint_seconds"] = round(fingerprint_time, 3)
+    report["total_seconds"] = round((datetime.now() - start_time).total_seconds(), 3)
+
+    logger.info(
+        f"Plagiarism check for {assignment}: {report['students']} students, "
+        f"{report['candidate_pairs']} candidate pairs in {report['total_seconds']}s"
+    )
+    return report
+
+
+def collect_submissions(submissions_dir: str) -> Dict[str, str]:
+    """Map student IDs to project paths for every subdirectory of submissions_dir.
+
+    Directories created by tools.clone_student_repo ("student_<id>") are
+    mapped back to the bare student ID.
+    """
+    submissions = {}
+    for name in sorted(os.listdir(submissions_dir)):
+        path = os.path.join(submissions_dir, name)
+        if os.path.isdir(path):
+            student_id = (
+                name[len("student_") :] if name.startswith("student_") else name
+            )
+            submissions[student_id] = path
+    return submissions
+
+
+def save_plagiarism_report(report: dict) -> str:
+    """Save a plagiarism report as JSON file with timestamp."""
+    reports_dir = os.path.join(os.getcwd(), config.PLAGIARISM_CONFIG["reports_dir"])
+    os.makedirs(reports_dir, exist_ok=True)
+
+    filename = f"plagiarism_{report['assignment']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    filepath = os.path.join(reports_dir, filename)
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    logger.info(f"Plagiarism report saved to: {filepath}")
+    return filepath
@@ -3,7 +3,9 @@ Centralized prompt management for the grading agent system.
 All LLM prompts are defined here for easy modification and maintenance.
 """
 
-from typing import Dict, Any, Callable, Optional
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from functools import lru_cache
+import hashlib
 import json
 import re
 import os
@@ -28,31 +30,268 @@ def _normalize_llm_output(text: str) -> str:
     return t.strip()
 
 
+_JSON_STRUCTURE_RE = re.compile(r'[{}\[\]",\\]')
+_TRAILING_COMMA_RE = re.compile(r'("(?:\\.|[^"\\])*")|,\s*([}\]])')
+_PROPERTIES_WRAPPER_RE = re.compile(r'\{\s*"properties"\s*:')
+
+
+def _scan_json_objects(text: str) -> Tuple[List[Tuple[int, int]], Optional[dict]]:
+    """Find top-level JSON object spans in one string-aware pass over text.
+
+    Only structural characters are visited (via _JSON_STRUCTURE_RE), braces
+    inside strings are ignored and text between objects is skipped, so the
+    scan is linear in the length of the reply.
+
+    Returns:
+        (spans, tail): (start, end) of every complete top-level object, and,
+        if the text ends inside an object, its start, open bracket stack,
+        whether it ended inside a string, and the comma positions (with the
+        bracket stack at each) where it can be cut back to a complete value.
+    """
+    spans = []
+    stack = []
+    start = None
+    commas = []
+    in_string = False
+    skip_to = 0
+
+    for match in _JSON_STRUCTURE_RE.finditer(text):
+        i = match.start()
+        if i < skip_to:
+            continue
+        c = match.group()
+
+        if not stack:
+            if c == "{":
+                stack.append(c)
+                start = i
+                commas = []
+            continue
+
+        if in_string:
+            if c == "\\":
+                skip_to = i + 2
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append(c)
+        elif c in "}]":
+            if stack[-1] != ("{" if c == "}" else "["):
+                # Mismatched bracket: not JSON, look for the next object
+                stack = []
+                continue
+            stack.pop()
+            if not stack:
+                spans.append((start, i + 1))
+        else:
+            commas.append((i, tuple(stack)))
+
+    tail = None
+    if stack:
+        tail = {
+            "start": start,
+            "stack": tuple(stack),
+            "in_string": in_string,
+            "dangling_escape": skip_to > len(text),
+            "commas": commas,
+        }
+    return spans, tail
+
+
+def _loads_object(candidate: str) -> Optional[dict]:
+    """json.loads a candidate object, retrying once without trailing commas."""
+    for attempt in (candidate, None):
+        if attempt is None:
+            attempt = _TRAILING_COMMA_RE.sub(
+                lambda m: m.group(1) or m.group(2), candidate
+            )
+            if attempt == candidate:
+                return None
+        try:
+            parsed = json.loads(attempt)
+        except ValueError:
+            continue
+        return parsed if isinstance(parsed, dict) else None
+    return None
+
+
+def _closers(stack) -> str:
+    return "".join("}" if b == "{" else "]" for b in reversed(stack))
+
+
+def _repair_truncated(text: str, tail: dict) -> Optional[dict]:
+    """Close a truncated object: finish the open string and brackets.
+
+    If the text cannot be closed as is (e.g. it stops after a key), it is
+    cut back to the last few commas, dropping the incomplete field.
+    """
+    body = text[tail["start"] :]
+    if tail["in_string"]:
+        if tail["dangling_escape"]:
+            body = body[:-1]
+        parsed = _loads_object(body + '"' + _closers(tail["stack"]))
+    else:
+        parsed = _loads_object(body.rstrip().rstrip(",") + _closers(tail["stack"]))
+    if parsed is not None:
+        return parsed
+
+    for position, stack in reversed(tail["commas"][-3:]):
+        parsed = _loads_object(text[tail["start"] : position] + _closers(stack))
+        if parsed is not None:
+            return parsed
+    return None
+
+
 def _attempt_json_fixup(text: str) -> Optional[dict]:
-    """Try some heuristics to recover JSON from common LLM formatting issues.
+    """Recover a JSON object from a reply with prose, several objects or truncation.
+
+    Picks the largest complete top-level object that parses (tolerating
+    trailing commas); failing that, repairs a truncated trailing object.
 
     Returns parsed dict on success or None on failure.
     """
+    spans, tail = _scan_json_objects(text)
+    for start, end in sorted(spans, key=lambda span: span[0] - span[1]):
+        parsed = _loads_object(text[start:end])
+        if parsed is not None:
+            return parsed
 
-    try:
-        return json.loads(text)
-    except Exception:
-        pass
+    if tail is not None:
+        return _repair_truncated(text, tail)
+    return None
+
+
+class ResponseValidationError(ValueError):
+    """Raised when an LLM response parsed as JSON but failed validation.
+
+    Keeps the parsed object and the original validator exception so callers
+    can repair individual fields instead of discarding the whole response.
+    """
+
+    def __init__(self, message: str, parsed: Any, cause: Exception):
+        super().__init__(message)
+        self.parsed = parsed
+        self.cause = cause
 
-    brace_matches = list(re.finditer(r"\{", text))
-    if not brace_matches:
-        return None
 
-    last_close = text.rfind("}")
-    first_open = brace_matches[0].start()
-    candidate = text[first_open : last_close + 1]
+class StreamingJSONFieldParser:
+    """Incrementally parse a streamed top-level JSON object, field by field.
 
-    candidate = re.sub(r",\s*(\}|\])", r"\1", candidate)
+    feed() returns the (name, value) pairs completed by each chunk. off_format
+    turns True as soon as the stream is not a bare object (prose before the
+    opening brace, or a malformed field); field-by-field parsing stops there,
+    but the reply may still be recoverable by parse_response_model once
+    complete. hopeless turns True when max_prose characters arrived without
+    any "{", so the caller can cancel a reply that holds no object at all.
+    """
 
+    def __init__(self, max_prose: int = 2000):
+        self.max_prose = max_prose
+        self._buf = ""
+        self._pos = 0
+        self._seg_start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.off_format = False
+        self.done = False
+
+    @property
+    def hopeless(self) -> bool:
+        return len(self._buf) > self.max_prose and "{" not in self._buf
+
+    def _complete(self, segment: str, fields: list):
+        if not segment.strip():
+            return
+        try:
+            fields.extend(json.loads("{" + segment + "}").items())
+        except ValueError:
+            self.off_format = True
+
+    def feed(self, chunk: str) -> list:
+        self._buf += chunk
+        if self.off_format or self.done:
+            return []
+
+        if self._seg_start is None:
+            head = self._buf.lstrip()
+            if "```".startswith(head):
+                return []
+            if head.startswith("```"):
+                newline = head.find("\n")
+                if newline == -1:
+                    return []
+                head = head[newline + 1 :].lstrip()
+            if not head:
+                return []
+            if head[0] != "{":
+                self.off_format = True
+                return []
+            self._pos = self._seg_start = len(self._buf) - len(head) + 1
+            self._depth = 1
+
+        fields = []
+        buf = self._buf
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete(buf[self._seg_start : i], fields)
+                    self.done = True
+                    break
+            elif c == "," and self._depth == 1:
+                self._complete(buf[self._seg_start : i], fields)
+                self._seg_start = i + 1
+                if self.off_format:
+                    break
+
+        self._pos = len(buf)
+        return fields
+
+
+def _save_raw_response(response_text: str, save_raw_to: Optional[str]):
+    if not save_raw_to:
+        return
     try:
-        return json.loads(candidate)
-    except Exception:
-        return None
+        os.makedirs(os.path.dirname(save_raw_to), exist_ok=True)
+        with open(save_raw_to, "w", encoding="utf-8") as f:
+            f.write(response_text)
+    except Exception as save_err:
+        logger.warning(f"Failed to save raw response to {save_raw_to}: {save_err}")
+
+
+def _unwrap_properties(parsed: Any, description: Optional[str]) -> Any:
+    """Unwrap grading fields that the model nested under a lone "properties" key."""
+    if isinstance(parsed, dict) and "properties" in parsed and len(parsed) == 1:
+
+        properties_data = parsed["properties"]
+        if isinstance(properties_data, dict):
+
+            grading_fields = [
+                k
+                for k in properties_data.keys()
+                if k.startswith(("p1_", "p2_", "p3_")) or k in ["generated_comment"]
+            ]
+            if grading_fields:
+                logger.info(
+                    f"Detected wrapped 'properties' structure, unwrapping for {description}"
+                )
+                return properties_data
+    return parsed
 
 
 def parse_and_validate_response(
@@ -74,17 +313,11 @@ def parse_and_validate_response(
         Parsed JSON as Python dict.
 
     Raises:
-        ValueError with helpful diagnostic information when parsing or validation fails.
+        ValueError with helpful diagnostic information when parsing fails, or
+        ResponseValidationError (a ValueError) when validation fails.
     """
     txt = _normalize_llm_output(response_text)
-
-    if save_raw_to:
-        try:
-            os.makedirs(os.path.dirname(save_raw_to), exist_ok=True)
-            with open(save_raw_to, "w", encoding="utf-8") as f:
-                f.write(response_text)
-        except Exception as save_err:
-            logger.warning(f"Failed to save raw response to {save_raw_to}: {save_err}")
+    _save_raw_response(response_text, save_raw_to)
 
     try:
         parsed = json.loads(txt)
@@ -97,34 +330,92 @@ def parse_and_validate_response(
                 f"Failed to parse JSON response{ctx}: {e1}\nRaw: {txt[:1000]}"
             )
 
-    if isinstance(parsed, dict) and "properties" in parsed and len(parsed) == 1:
-
-        properties_data = parsed["properties"]
-        if isinstance(properties_data, dict):
-
-            grading_fields = [
-                k
-                for k in properties_data.keys()
-                if k.startswith(("p1_", "p2_", "p3_")) or k in ["generated_comment"]
-            ]
-            if grading_fields:
-                logger.info(
-                    f"Detected wrapped 'properties' structure, unwrapping for {description}"
-                )
-                parsed = properties_data
+    parsed = _unwrap_properties(parsed, description)
 
     if validator:
         try:
             validator(parsed)
         except Exception as ve:
             ctx = f" for {description}" if description else ""
-            raise ValueError(
-                f"Validation failed{ctx}: {ve}\nParsed: {json.dumps(parsed)[:1000]}"
+            raise ResponseValidationError(
+                f"Validation failed{ctx}: {ve}\nParsed: {json.dumps(parsed)[:1000]}",
+                parsed,
+                ve,
             )
 
     return parsed
 
 
+def parse_response_model(
+    response_text: str,
+    model: Any,
+    description: Optional[str] = None,
+    save_raw_to: Optional[str] = None,
+) -> Tuple[Any, bool]:
+    """Parse and validate an LLM response into a Pydantic model in one pass.
+
+    After fences are stripped, the reply goes straight through
+    model.model_validate_json, so it is parsed and validated by pydantic-core
+    without building an intermediate dict. Replies with prose, several objects
+    or truncated output fall back to _attempt_json_fixup and model_validate.
+
+    Args:
+        response_text: Raw text from the LLM.
+        model: Pydantic model class to validate against.
+        description: Short description used in error messages for context.
+        save_raw_to: Optional file path to save the raw response for debugging.
+
+    Returns:
+        (validated model instance, whether the raw reply was strict JSON)
+
+    Raises:
+        ValueError when no JSON object can be recovered, or
+        ResponseValidationError (a ValueError) when validation fails.
+    """
+    from pydantic import ValidationError
+
+    _save_raw_response(response_text, save_raw_to)
+    ctx = f" for {description}" if description else ""
+    txt = _normalize_llm_output(response_text)
+    strict = txt == response_text.strip()
+
+    error = None
+    well_formed = True
+    if not _PROPERTIES_WRAPPER_RE.match(txt):
+        try:
+            return model.model_validate_json(txt), strict
+        except ValidationError as e:
+            if any(
+                item["type"] == "json_invalid" for item in e.errors(include_url=False)
+            ):
+                strict = well_formed = False
+            else:
+                error = e
+
+    parsed = (_loads_object(txt) if well_formed else None) or _attempt_json_fixup(
+        txt
+    )
+    if parsed is None:
+        raise ValueError(f"Failed to parse JSON response{ctx}\nRaw: {txt[:1000]}")
+
+    unwrapped = _unwrap_properties(parsed, description)
+    if error is not None and unwrapped is parsed:
+        raise ResponseValidationError(
+            f"Validation failed{ctx}: {error}\nParsed: {txt[:1000]}",
+            parsed,
+            error,
+        )
+
+    try:
+        return model.model_validate(unwrapped), strict
+    except ValidationError as ve:
+        raise ResponseValidationError(
+            f"Validation failed{ctx}: {ve}\nParsed: {json.dumps(unwrapped)[:1000]}",
+            unwrapped,
+            ve,
+        )
+
+
 def get_test_generation_prompt(description: str, reqs: dict, num_cases: int) -> str:
     """
     Generate the prompt for LLM-based test case generation.
@@ -183,27 +474,19 @@ IMPORTANT:
 - Do not include any text outside the JSON structure"""
 
 
-def get_base_grading_prompt(
-    practice_description: str, test_results: str, static_analysis: str, source_code: str
-) -> str:
+def get_grading_instructions() -> str:
     """
-    Get the base grading prompt that applies to all assignment types.
+    Get the static grading instructions shared by every submission.
 
-    Args:
-        practice_description: Description of the assignment
-        test_results: Test execution results
-        static_analysis: Static analysis results
-        source_code: Student source code
+    This text, followed by the assignment criteria and format instructions,
+    forms the stable prompt prefix (see get_grading_prompt_parts).
 
     Returns:
-        Base grading prompt string
+        Grading instructions string
     """
-    return f"""
+    return """
     You are an expert C++ Teaching Assistant with 10+ years of experience grading programming assignments.
 
-    **ASSIGNMENT CONTEXT:**
-    {practice_description}
-
     **GRADING TASK:**
     Analyze the student's C++ code submission comprehensively. You MUST read and analyze ALL provided code files, including:
     - Header files (.h, .hpp)
@@ -229,17 +512,6 @@ def get_base_grading_prompt(
     - **Build System**: Check Makefile completeness, compilation flags, targets
     - **Documentation**: Review README, code comments, inline documentation
 
-    **ANALYSIS INPUTS:**
-
-    **Test Results:**
-    {test_results}
-
-    **Static Analysis (cppcheck/valgrind):**
-    {static_analysis}
-
-    **Source Code (ALL FILES):**
-    {source_code}
-
     **GRADING METHODOLOGY:**
     1. **Systematic Review**: Go through each file systematically
     2. **Cross-Reference**: Check consistency between header and implementation files
@@ -269,6 +541,68 @@ def get_base_grading_prompt(
     """
 
 
+GRADING_INPUTS_TEMPLATE = """
+    **ASSIGNMENT CONTEXT:**
+    {practice_description}
+
+    **ANALYSIS INPUTS:**
+
+    **Test Results:**
+    {test_results}
+
+    **Static Analysis (cppcheck/valgrind):**
+    {static_analysis}
+
+    **Source Code (ALL FILES):**
+    {source_code}
+
+    Grade the submission above using the grading criteria, and respond only with the JSON object described in the response format instructions.
+    """
+
+
+def get_grading_inputs(
+    practice_description: str, test_results: str, static_analysis: str, source_code: str
+) -> str:
+    """
+    Get the per-submission part of the grading prompt.
+
+    Args:
+        practice_description: Description of the assignment
+        test_results: Test execution results
+        static_analysis: Static analysis results
+        source_code: Student source code
+
+    Returns:
+        Grading inputs string
+    """
+    return GRADING_INPUTS_TEMPLATE.format(
+        practice_description=practice_description,
+        test_results=test_results,
+        static_analysis=static_analysis,
+        source_code=source_code,
+    )
+
+
+def get_base_grading_prompt(
+    practice_description: str, test_results: str, static_analysis: str, source_code: str
+) -> str:
+    """
+    Get the base grading prompt that applies to all assignment types.
+
+    Args:
+        practice_description: Description of the assignment
+        test_results: Test execution results
+        static_analysis: Static analysis results
+        source_code: Student source code
+
+    Returns:
+        Base grading prompt string (static instructions first, inputs last)
+    """
+    return get_grading_instructions() + get_grading_inputs(
+        practice_description, test_results, static_analysis, source_code
+    )
+
+
 def get_a1_grading_criteria() -> str:
     """Get A1-specific grading criteria with detailed recommendations."""
     return """
@@ -1085,6 +1419,72 @@ def get_a6_grading_criteria() -> str:
     """
 
 
+A6_PHASE_HEADINGS = {
+    "phase1": ("**PHASE 1 - CORE FEATURES", "**PHASE 2 - ADVANCED FEATURES"),
+    "phase2": ("**PHASE 2 - ADVANCED FEATURES", "**PHASE 3 - WEB INTERFACE"),
+    "phase3": ("**PHASE 3 - WEB INTERFACE", "**COMPREHENSIVE ANALYSIS REQUIREMENTS"),
+}
+
+
+def get_a6_phase_grading_criteria(phase: str) -> str:
+    """
+    Get the A6 grading criteria restricted to a single phase.
+
+    The phase-specific rubric block is cut out of get_a6_grading_criteria() and
+    followed by the shared analysis and recommendation guidelines.
+
+    Args:
+        phase: One of "phase1", "phase2", "phase3"
+
+    Returns:
+        Phase-specific grading criteria string
+    """
+    criteria = get_grading_criteria("A6")
+    start_heading, end_heading = A6_PHASE_HEADINGS[phase]
+
+    header = criteria[: criteria.index("**PHASE 1 - CORE FEATURES")]
+    phase_block = criteria[
+        criteria.index(start_heading) : criteria.index(end_heading)
+    ]
+    shared = criteria[criteria.index("**COMPREHENSIVE ANALYSIS REQUIREMENTS") :]
+
+    return (
+        header
+        + phase_block
+        + f"**SCOPE:** Grade ONLY the {phase.replace('phase', 'Phase ')} criteria above.\n\n    "
+        + shared
+    )
+
+
+def get_a6_phase_grading_prompt(
+    phase: str,
+    practice_description: str,
+    test_results: str,
+    static_analysis: str,
+    source_code: str,
+) -> str:
+    """
+    Get the grading prompt for a single A6 phase.
+
+    Args:
+        phase: One of "phase1", "phase2", "phase3"
+        practice_description: Assignment description
+        test_results: Test execution results
+        static_analysis: Static analysis results
+        source_code: Student source code
+
+    Returns:
+        Phase-specific grading prompt string
+    """
+    return (
+        get_grading_instructions()
+        + get_grading_criteria("A6", phase)
+        + get_grading_inputs(
+            practice_description, test_results, static_analysis, source_code
+        )
+    )
+
+
 GRADING_CRITERIA = {
     "A1": get_a1_grading_criteria,
     "A2": get_a2_grading_criteria,
@@ -1113,22 +1513,251 @@ def get_grading_prompt(
         source_code: Student source code
 
     Returns:
-        Complete grading prompt string
+        Complete grading prompt string (static instructions and criteria
+        first, per-submission inputs last)
     """
-    base_prompt = get_base_grading_prompt(
-        practice_description, test_results, static_analysis, source_code
+    return (
+        get_grading_instructions()
+        + get_grading_criteria(assignment_type)
+        + get_grading_inputs(
+            practice_description, test_results, static_analysis, source_code
+        )
     )
 
+
+@lru_cache(maxsize=None)
+def get_grading_criteria(assignment_type: str, phase: Optional[str] = None) -> str:
+    """
+    Get the grading criteria of an assignment (or A6 phase), built once per process.
+
+    Args:
+        assignment_type: Type of assignment (A1, A2, A3, A4, A5, A6)
+        phase: A6 phase ("phase1".."phase3") for per-phase grading
+
+    Returns:
+        Grading criteria string ("" for an unknown assignment type)
+    """
+    if phase:
+        return get_a6_phase_grading_criteria(phase)
     criteria_func = GRADING_CRITERIA.get(assignment_type)
-    if criteria_func:
-        return base_prompt + criteria_func()
+    return criteria_func() if criteria_func else ""
+
+
+@lru_cache(maxsize=None)
+def get_grading_template(
+    assignment_type: str,
+    grading_model: Any,
+    phase: Optional[str] = None,
+    batch: bool = False,
+) -> Tuple[str, str]:
+    """
+    Get the compiled static prompt prefix of an assignment and its version.
+
+    The prefix (instructions, criteria and format instructions) is built once
+    per assignment, grading model and A6 phase (or batch format); per-student
+    rendering then only substitutes the inputs into GRADING_INPUTS_TEMPLATE
+    (or BATCH_SUBMISSION_TEMPLATE). The version is a content hash of the
+    prefix and the input template, so it changes whenever any prompt text
+    does and can key caches of LLM outputs.
+
+    Args:
+        assignment_type: Type of assignment (A1, A2, A3, A4, A5, A6)
+        grading_model: Pydantic model for grading output
+        phase: A6 phase ("phase1".."phase3") for per-phase grading
+        batch: Whether the prefix is for a multi-submission request
+
+    Returns:
+        (prefix, version) tuple
+    """
+    if batch:
+        format_instructions = get_batch_format_instructions(
+            assignment_type, grading_model
+        )
+        inputs_template = BATCH_SUBMISSION_TEMPLATE + BATCH_CLOSING_TEMPLATE
     else:
-        return base_prompt
+        label = f"A6 {phase}" if phase else assignment_type
+        format_instructions = get_format_instructions(label, grading_model)
+        inputs_template = GRADING_INPUTS_TEMPLATE
+
+    prefix = (
+        get_grading_instructions()
+        + get_grading_criteria(assignment_type, phase)
+        + format_instructions
+    )
+    version = hashlib.sha256((prefix + inputs_template).encode("utf-8")).hexdigest()
+    return prefix, version[:16]
+
+
+def get_grading_prompt_parts(
+    assignment_type: str,
+    grading_model: Any,
+    practice_description: str,
+    test_results: str,
+    static_analysis: str,
+    source_code: str,
+    phase: Optional[str] = None,
+) -> Tuple[str, str]:
+    """
+    Get the grading prompt split into a static prefix and a per-submission suffix.
+
+    The prefix (instructions, criteria and format instructions) is identical
+    for every submission of an assignment (or A6 phase), so it can be cached
+    once per batch; the suffix carries the student's inputs.
+
+    Args:
+        assignment_type: Type of assignment (A1, A2, A3, A4, A5, A6)
+        grading_model: Pydantic model for grading output
+        practice_description: Assignment description
+        test_results: Test execution results
+        static_analysis: Static analysis results
+        source_code: Student source code
+        phase: A6 phase ("phase1".."phase3") for per-phase grading
+
+    Returns:
+        (prefix, suffix) tuple; prefix + suffix is the full prompt
+    """
+    prefix, _ = get_grading_template(assignment_type, grading_model, phase)
+    suffix = get_grading_inputs(
+        practice_description, test_results, static_analysis, source_code
+    )
+    return prefix, suffix
+
+
+def get_diff_review_inputs(
+    twin_result: Dict[str, Any],
+    diff_text: str,
+    similarity: float,
+    test_results: str,
+    static_analysis: str,
+) -> str:
+    """
+    Get the per-submission part of a diff-only review prompt.
 
+    Used instead of get_grading_inputs for a near-duplicate of an already
+    graded submission: the model sees the twin's grades and the source diff,
+    not the full source tree.
+
+    Args:
+        twin_result: Validated grading output of the graded twin
+        diff_text: Unified diff from the twin's source to this submission
+        similarity: Fingerprint similarity to the twin, in percent
+        test_results: Test execution results (shared with the twin)
+        static_analysis: Static analysis results (shared with the twin)
+
+    Returns:
+        Diff review inputs string
+    """
+    return f"""
+    **DIFF-ONLY REVIEW:**
+    This submission is a near-duplicate ({similarity}% fingerprint similarity) of a
+    submission that has already been graded. Its test and static analysis results
+    are identical to the graded submission's. Start from the grades below and
+    change only the criteria affected by the source changes in the diff; keep
+    every other score as it is.
+
+    **Grades of the already-graded submission:**
+    {json.dumps(twin_result, indent=2, ensure_ascii=False)}
+
+    **Test Results:**
+    {test_results}
+
+    **Static Analysis (cppcheck/valgrind):**
+    {static_analysis}
+
+    **Source Diff (graded submission -> this submission):**
+    {diff_text or "(no textual changes)"}
+
+    Grade this submission using the grading criteria, and respond only with the full JSON object described in the response format instructions. The "generated_comment" must be written for this submission and mention what its changes improved or broke.
+    """
+
+
+@lru_cache(maxsize=None)
+def get_batch_format_instructions(assignment_type: str, grading_model: Any) -> str:
+    """
+    Get format instructions for a request grading several submissions at once.
+
+    Args:
+        assignment_type: Type of assignment
+        grading_model: Pydantic model for each submission's grading output
 
+    Returns:
+        Format instructions string
+    """
+    field_names = list(grading_model.model_fields.keys())
+
+    return f"""
+    CRITICAL: Respond ONLY with a valid JSON object. No markdown, no explanations, no additional text.
+
+    You will receive SEVERAL independent {assignment_type} submissions, each marked with a SUBMISSION ID.
+    Grade each submission on its own evidence only; never let one submission influence another's scores.
+
+    Required JSON format:
+    {{
+      "results": [
+        {{
+          "submission_id": "<SUBMISSION ID exactly as given>",
+{chr(10).join([f'          "{field}": <score>,' for field in field_names[:-1]])}
+          "{field_names[-1]}": "<constructive feedback comment>"
+        }}
+      ]
+    }}
+
+    **IMPORTANT:**
+    - Include exactly one entry in "results" per submission, in the order given
+    - All field names must match exactly: {", ".join(f'"{f}"' for f in field_names)}
+    - Use decimal scores (e.g., 3.5, 7.2) for partial credit
+    - Each "generated_comment" must give a summary, prioritized recommendations with
+      concrete code examples, and next steps for that submission alone
+    """
+
+
+BATCH_SUBMISSION_TEMPLATE = """
+    ==================== SUBMISSION ID: {submission_id} ====================
+
+    **ASSIGNMENT CONTEXT:**
+    {practice_description}
+
+    **Test Results:**
+    {test_results}
+
+    **Static Analysis (cppcheck/valgrind):**
+    {static_analysis}
+
+    **Source Code (ALL FILES):**
+    {source_code}
+    """
+
+BATCH_CLOSING_TEMPLATE = """
+    Grade each of the {count} submissions above independently using the grading criteria, and respond only with the JSON object described in the response format instructions.
+    """
+
+
+def get_batch_grading_prompt_parts(
+    assignment_type: str, grading_model: Any, submissions: List[Dict[str, str]]
+) -> Tuple[str, str]:
+    """
+    Get a multi-submission grading prompt as a static prefix and a suffix.
+
+    Args:
+        assignment_type: Type of assignment (A1, A2, A3, ...)
+        grading_model: Pydantic model for each submission's grading output
+        submissions: Dicts with submission_id, practice_description,
+            test_results, static_analysis and source_code
+
+    Returns:
+        (prefix, suffix) tuple; prefix + suffix is the full prompt
+    """
+    prefix, _ = get_grading_template(assignment_type, grading_model, batch=True)
+    suffix = "".join(
+        BATCH_SUBMISSION_TEMPLATE.format(**submission) for submission in submissions
+    ) + BATCH_CLOSING_TEMPLATE.format(count=len(submissions))
+    return prefix, suffix
+
+
+@lru_cache(maxsize=None)
 def get_format_instructions(assignment_type: str, grading_model: Any) -> str:
     """
-    Get format instructions for LLM responses.
+    Get format instructions for LLM responses (built once per model).
 
     Args:
         assignment_type: Type of assignment
@@ -1183,6 +1812,138 @@ def get_format_instructions(assignment_type: str, grading_model: Any) -> str:
     """
 
 
+def _describe_field_constraints(field: Any) -> str:
+    """Describe a Pydantic field's type and ge/le bounds for a repair prompt."""
+    bounds = {}
+    for constraint in field.metadata:
+        for name in ("ge", "le", "gt", "lt"):
+            if getattr(constraint, name, None) is not None:
+                bounds[name] = getattr(constraint, name)
+
+    if field.annotation is str:
+        return "string"
+    if "ge" in bounds and "le" in bounds:
+        return f"number between {bounds['ge']} and {bounds['le']} (inclusive)"
+    return "number"
+
+
+def get_response_schema(
+    grading_model: Any, fields: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Build a structured-output response schema from a grading model.
+
+    Scores become numbers and generated_comment a string. The schema format
+    has no minimum/maximum, so score bounds are stated in each description
+    and still enforced by the Pydantic model.
+
+    Args:
+        grading_model: Pydantic model for grading output
+        fields: Restrict the schema to these field names (used for repairs)
+
+    Returns:
+        Schema dict for GenerationConfig.response_schema
+    """
+    properties = {}
+    for name, field in grading_model.model_fields.items():
+        if fields is not None and name not in fields:
+            continue
+        properties[name] = {
+            "type": "string" if field.annotation is str else "number",
+            "description": f"{field.description} - {_describe_field_constraints(field)}",
+        }
+
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+
+def get_batch_response_schema(
+    grading_model: Any, submission_ids: List[str]
+) -> Dict[str, Any]:
+    """
+    Build the response schema for a batched request.
+
+    Args:
+        grading_model: Pydantic model for each submission's grading output
+        submission_ids: IDs of the submissions in the request, in order
+
+    Returns:
+        Schema dict with a "results" array of per-submission objects
+    """
+    item = get_response_schema(grading_model)
+    item["properties"] = {
+        "submission_id": {
+            "type": "string",
+            "format": "enum",
+            "enum": list(submission_ids),
+            "description": "SUBMISSION ID as given",
+        },
+        **item["properties"],
+    }
+    item["required"] = list(item["properties"])
+    return {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": item,
+                "min_items": len(submission_ids),
+                "max_items": len(submission_ids),
+            }
+        },
+        "required": ["results"],
+    }
+
+
+def get_repair_prompt(
+    assignment_type: str,
+    grading_model: Any,
+    accepted_fields: Dict[str, Any],
+    invalid_fields: Dict[str, str],
+    previous_values: Dict[str, Any],
+) -> str:
+    """
+    Get a short follow-up prompt that asks the model to fix only invalid fields.
+
+    Args:
+        assignment_type: Type of assignment
+        grading_model: Pydantic model for grading output
+        accepted_fields: Fields from the previous response that passed validation
+        invalid_fields: Mapping of field name to validation error message
+        previous_values: Values the model returned for the invalid fields
+
+    Returns:
+        Repair prompt string
+    """
+    field_lines = []
+    for name, error in invalid_fields.items():
+        field = grading_model.model_fields[name]
+        previous = (
+            f"previous value {json.dumps(previous_values[name])}"
+            if name in previous_values
+            else "missing"
+        )
+        field_lines.append(
+            f'- "{name}": {_describe_field_constraints(field)} - {field.description}. '
+            f"Problem: {previous} ({error})"
+        )
+
+    accepted_scores = {
+        k: v for k, v in accepted_fields.items() if k != "generated_comment"
+    }
+
+    return f"""
+    You previously graded a {assignment_type} submission, but some fields of your JSON response were invalid or missing.
+
+    Scores already accepted (do not repeat them):
+    {json.dumps(accepted_scores)}
+
+    Fix ONLY these fields:
+{chr(10).join('    ' + line for line in field_lines)}
+
+    CRITICAL: Respond ONLY with a valid JSON object containing exactly these keys: {", ".join(f'"{name}"' for name in invalid_fields)}. No markdown, no explanations.
+    """
+
+
 try:
     from config import MODEL_CONFIG
 
@@ -0,0 +1,418 @@
+"""
+Reference-solution oracle for generated test cases.
+
+Generated expected outputs (from the LLM or anywhere else) are not trusted:
+only the inputs are kept, and the expected output of each one is whatever
+the assignment's reference solution prints for it. The reference is compiled
+once per source hash into REFERENCE_ORACLE_CONFIG["build_dir"] and run on
+all candidates in parallel, each in its own scratch directory with CPU,
+memory and output limits. Inputs that crash the reference, time out, or
+repeat the behaviour of an existing test (same commands, same output) are
+discarded.
+"""
+
+import os
+import re
+import shlex
+import shutil
+import signal
+import hashlib
+import logging
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+_SOURCE_SUFFIXES = (".cpp", ".cc", ".h", ".hpp")
+_MAKEFILES = ("Makefile", "makefile")
+
+
+def reference_path(assignment: str, path: Optional[str] = None) -> str:
+    """Reference solution of an assignment: path, or <solutions_dir>/<assignment>."""
+    path = path or os.path.join(
+        config.REFERENCE_ORACLE_CONFIG["solutions_dir"], assignment
+    )
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No reference solution for {assignment} at {path}")
+    return path
+
+
+def _source_files(path: str) -> List[str]:
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(names):
+            if name.endswith(_SOURCE_SUFFIXES) or name in _MAKEFILES:
+                files.append(os.path.join(root, name))
+    return files
+
+
+def build_executable(
+    path: str,
+    build_root: str,
+    label: str,
+    practice_config: Optional[dict] = None,
+    compile_command: Optional[str] = None,
+    use_makefile: bool = True,
+) -> str:
+    """Build a C++ project once and return its executable.
+
+    A directory with a Makefile is built with practice_config's
+    build_command and executable_name (unless use_makefile is False);
+    otherwise its .cpp files (or a single .cpp file) are compiled with
+    compile_command (default REFERENCE_ORACLE_CONFIG["compile_command"]).
+    Builds are cached under build_root by a hash of the sources and the
+    build command.
+
+    Raises:
+        RuntimeError: The project does not build
+    """
+    practice_config = practice_config or {}
+    root = path if os.path.isdir(path) else os.path.dirname(path)
+    sources = _source_files(path)
+    use_make = use_makefile and any(
+        os.path.basename(source) in _MAKEFILES for source in sources
+    )
+    command = (
+        practice_config.get("build_command", "make")
+        if use_make
+        else compile_command or config.REFERENCE_ORACLE_CONFIG["compile_command"]
+    )
+
+    digest = hashlib.sha256(command.encode("utf-8"))
+    for source in sources:
+        digest.update(os.path.relpath(source, root).encode("utf-8") + b"\0")
+        with open(source, "rb") as f:
+            digest.update(f.read())
+    build_dir = os.path.join(build_root, f"{label}-{digest.hexdigest()[:16]}")
+    executable = os.path.abspath(os.path.join(build_dir, "program"))
+    if os.path.exists(executable):
+        return executable
+
+    os.makedirs(build_root, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=f"{label}-", dir=build_root)
+    try:
+        for source in sources:
+            target = os.path.join(work_dir, os.path.relpath(source, root))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+
+        if use_make:
+            argv = shlex.split(command)
+            built = os.path.join(
+                work_dir, practice_config.get("executable_name", "student_program")
+            )
+        else:
+            cpp_files = [
+                os.path.relpath(source, root)
+                for source in sources
+                if source.endswith((".cpp", ".cc"))
+            ]
+            argv = shlex.split(command) + cpp_files + ["-o", "program"]
+            built = os.path.join(work_dir, "program")
+
+        process = subprocess.run(
+            argv, cwd=work_dir, capture_output=True, text=True, timeout=300
+        )
+        if process.returncode != 0 or not os.path.exists(built):
+            raise RuntimeError(
+                f"{label} failed to build with '{' '.join(argv)}':\n"
+                f"{(process.stderr or process.stdout)[-2000:]}"
+            )
+        if built != os.path.join(work_dir, "program"):
+            os.replace(built, os.path.join(work_dir, "program"))
+
+        try:
+            os.rename(work_dir, build_dir)
+        except OSError:
+            # Another process finished the same build first
+            shutil.rmtree(work_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    return executable
+
+
+def compile_reference(assignment: str, path: Optional[str] = None) -> str:
+    """Compile an assignment's reference solution once and return its executable.
+
+    Makefile projects use the assignment's PRACTICE_CONFIGS entry; builds
+    are cached in REFERENCE_ORACLE_CONFIG["build_dir"] (see build_executable).
+
+    Raises:
+        FileNotFoundError: No reference solution at the path
+        RuntimeError: The reference does not compile
+    """
+    path = reference_path(assignment, path)
+    executable = build_executable(
+        path,
+        config.REFERENCE_ORACLE_CONFIG["build_dir"],
+        assignment,
+        config.PRACTICE_CONFIGS.get(assignment.split(".")[0], {}),
+    )
+    logger.info(f"Reference solution for {assignment}: {executable}")
+    return executable
+
+
+def _limited_command(argv: List[str], timeout: float, max_output_bytes: int):
+    """argv wrapped to run under CPU, memory, output-size and core limits.
+
+    The limits are set by prlimit, or by the shell's ulimit where prlimit is
+    missing (macOS), both of which exec the program; a preexec_fn is not safe
+    in the worker threads that run candidates in parallel.
+    """
+    cpu = int(timeout) + 1
+    memory = config.REFERENCE_ORACLE_CONFIG["memory_mb"] << 20
+    prlimit = shutil.which("prlimit")
+    if prlimit:
+        return [
+            prlimit,
+            f"--cpu={cpu}",
+            f"--as={memory}",
+            f"--fsize={max_output_bytes}",
+            "--core=0",
+            "--",
+            *argv,
+        ]
+    if os.name != "posix":  # Windows: no rlimits, timeouts still apply
+        return argv
+    # ulimit -f counts 512-byte blocks (1 KiB in bash); the output size is
+    # checked again after the run. macOS rejects ulimit -v
+    script = (
+        f"ulimit -t {cpu}; ulimit -v {memory >> 10} 2>/dev/null; "
+        f'ulimit -f {-(-max_output_bytes // 512)}; ulimit -c 0; exec "$@"'
+    )
+    return ["/bin/sh", "-c", script, "sh", *argv]
+
+
+def run_sandboxed(
+    executable: str,
+    input_text: str,
+    args: Iterable[str] = (),
+    timeout: Optional[float] = None,
+    max_output_bytes: Optional[int] = None,
+    env: Optional[dict] = None,
+) -> dict:
+    """Run a program on one input in a scratch directory with resource limits.
+
+    Args:
+        executable: Program to run (reference or student build)
+        input_text: Standard input
+        args: Command-line arguments; file arguments must be absolute
+        timeout: Wall-clock limit (default REFERENCE_ORACLE_CONFIG["timeout"])
+        max_output_bytes: Output limit (default from REFERENCE_ORACLE_CONFIG)
+        env: Extra environment variables
+
+    Returns:
+        {"status": "ok" | "crash" | "timeout" | "output_limit", "output",
+        "returncode", "seconds"}
+    """
+    oracle_config = config.REFERENCE_ORACLE_CONFIG
+    timeout = timeout or oracle_config["timeout"]
+    max_output_bytes = max_output_bytes or oracle_config["max_output_bytes"]
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="oracle-") as sandbox:
+        # Files rather than pipes, so RLIMIT_FSIZE caps the output
+        stdin_path = os.path.join(sandbox, ".stdin")
+        stdout_path = os.path.join(sandbox, ".stdout")
+        with open(stdin_path, "wb") as f:
+            f.write(input_text.encode("utf-8"))
+        with open(stdin_path, "rb") as stdin, open(stdout_path, "wb") as stdout:
+            process = subprocess.Popen(
+                _limited_command([executable, *args], timeout, max_output_bytes),
+                cwd=sandbox,
+                stdin=stdin,
+                stdout=stdout,
+                stderr=subprocess.DEVNULL,
+                env={"PATH": "/usr/bin:/bin", "LC_ALL": "C", **(env or {})},
+                start_new_session=True,
+            )
+            timed_out = False
+            try:
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+                timed_out = True
+        seconds = round(time.perf_counter() - started, 4)
+        with open(stdout_path, "rb") as f:
+            output = f.read(max_output_bytes + 1)
+
+    if timed_out or process.returncode == -signal.SIGXCPU:
+        status = "timeout"
+    elif process.returncode == -signal.SIGXFSZ or len(output) > max_output_bytes:
+        status = "output_limit"
+    elif process.returncode != 0:
+        status = "crash"
+    else:
+        status = "ok"
+    return {
+        "status": status,
+        "output": output.decode("utf-8", errors="replace"),
+        "returncode": process.returncode,
+        "seconds": seconds,
+    }
+
+
+def normalize_input(input_text: str) -> str:
+    """Candidate input with Unix line endings and a final newline."""
+    input_text = input_text.replace("\r\n", "\n")
+    return input_text if input_text.endswith("\n") else input_text + "\n"
+
+
+def normalize_output(output: str) -> str:
+    """Output compared whitespace-insensitively, like the judges' diff -bB."""
+    return "\n".join(
+        " ".join(line.split()) for line in output.splitlines() if line.strip()
+    )
+
+
+def behaviour_signature(input_text: str, output: str) -> str:
+    """Commands issued (first word of each input line) plus the normalized output.
+
+    Two inputs with the same signature exercise the same behaviour, e.g.
+    the same commands on different names that all answer "OK".
+    """
+    heads = [line.split()[0] for line in input_text.splitlines() if line.split()]
+    payload = "\x1f".join(heads) + "\x1e" + normalize_output(output)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def judge_tests_dirs(assignment: str) -> List[str]:
+    """Existing judge test directories of an assignment (P<k>/tests for phases)."""
+    match = re.match(r"A?(\d+)(?:\.(\d+))?$", assignment, re.IGNORECASE)
+    if not match:
+        return []
+    judge_dir = os.path.join(
+        config.TEST_CASES_DIR, f"practice{match.group(1)}", "judge"
+    )
+    if not os.path.isdir(judge_dir):
+        return []
+    if match.group(2):
+        candidates = [os.path.join(judge_dir, f"P{match.group(2)}", "tests")]
+    else:
+        candidates = [os.path.join(judge_dir, "tests")] + [
+            os.path.join(judge_dir, name, "tests")
+            for name in sorted(os.listdir(judge_dir))
+            if re.fullmatch(r"P\d+", name)
+        ]
+    return [path for path in candidates if os.path.isdir(path)]
+
+
+def read_test_files(tests_dir: str) -> List[tuple]:
+    """(name, input, expected output) of a tests directory, flat or NN/NN.in."""
+    tests = []
+    for root, dirs, names in os.walk(tests_dir):
+        dirs.sort()
+        for name in sorted(names):
+            if not name.endswith(".in"):
+                continue
+            expected = os.path.join(root, name[:-3] + ".out")
+            if not os.path.exists(expected):
+                continue
+            with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                input_text = f.read()
+            with open(expected, "r", encoding="utf-8") as f:
+                tests.append((name[:-3], input_text, f.read()))
+    return tests
+
+
+def read_tests(tests_dir: str) -> List[tuple]:
+    """(input, expected output) pairs of a tests directory, flat or NN/NN.in."""
+    return [
+        (input_text, output) for _, input_text, output in read_test_files(tests_dir)
+    ]
+
+
+def verify_inputs(
+    assignment: str,
+    inputs: Iterable[str],
+    reference: Optional[str] = None,
+    args: Iterable[str] = (),
+    existing: Iterable[tuple] = (),
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    max_output_bytes: Optional[int] = None,
+) -> dict:
+    """Compute expected outputs for candidate inputs with the reference solution.
+
+    Args:
+        assignment: Assignment key (A1..A6, or A6.2 for a phase)
+        inputs: Candidate inputs; any expected outputs they came with are ignored
+        reference: Reference solution path (default <solutions_dir>/<assignment>)
+        args: Command-line arguments for the reference (e.g. CSV paths)
+        existing: (input, output) pairs of tests already kept; candidates with
+            the same behaviour are discarded
+        workers: Parallel runs (default REFERENCE_ORACLE_CONFIG["workers"])
+        timeout, max_output_bytes: Per-run limits (see run_sandboxed)
+
+    Returns:
+        {"executable", "candidates", "accepted": [{"input", "output",
+        "seconds"}], "rejected": {reason: count}, "seconds"}; reasons are
+        "crash", "timeout", "output_limit", "duplicate_input" and
+        "duplicate_behaviour"
+    """
+    started = time.perf_counter()
+    executable = compile_reference(assignment, reference)
+    args = [os.path.abspath(arg) if os.path.exists(arg) else arg for arg in args]
+
+    rejected = Counter()
+    candidates = []
+    seen_inputs = set()
+    for input_text in inputs:
+        input_text = normalize_input(input_text)
+        if input_text in seen_inputs:
+            rejected["duplicate_input"] += 1
+            continue
+        seen_inputs.add(input_text)
+        candidates.append(input_text)
+
+    seen_behaviour = {
+        behaviour_signature(input_text, output) for input_text, output in existing
+    }
+    workers = workers or config.REFERENCE_ORACLE_CONFIG["workers"]
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        runs = list(
+            executor.map(
+                lambda input_text: run_sandboxed(
+                    executable, input_text, args, timeout, max_output_bytes
+                ),
+                candidates,
+            )
+        )
+
+    accepted = []
+    for input_text, run in zip(candidates, runs):
+        if run["status"] != "ok":
+            rejected[run["status"]] += 1
+            continue
+        signature = behaviour_signature(input_text, run["output"])
+        if signature in seen_behaviour:
+            rejected["duplicate_behaviour"] += 1
+            continue
+        seen_behaviour.add(signature)
+        accepted.append(
+            {"input": input_text, "output": run["output"], "seconds": run["seconds"]}
+        )
+
+    result = {
+        "executable": executable,
+        "candidates": len(seen_inputs) + rejected["duplicate_input"],
+        "accepted": accepted,
+        "rejected": dict(rejected),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    logger.info(
+        f"Reference oracle for {assignment}: {len(accepted)}/{result['candidates']} "
+        f"inputs kept, rejected {result['rejected']} in {result['seconds']}s"
+    )
+    return result
@@ -0,0 +1,309 @@
+"""
+Sample I/O extraction from assignment descriptions.
+
+The description PDFs show worked examples as an "example input" label
+(نمونه ورودی / مثال ورودی / Sample Input) followed by code blocks, then a
+matching "example output" label and its code blocks. extract_samples()
+pairs them from the layout blocks cached by the description store, without
+an LLM, and write_samples() saves them as .in/.out pairs in the judge layout
+(tests/NN/NN.in, or P<phase>/tests/NN/NN.in for multi-phase assignments)
+together with samples.json recording where each pair came from.
+"""
+
+import os
+import re
+import json
+import shutil
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import config
+import spec_index
+from description_store import get_store
+
+logger = logging.getLogger(__name__)
+
+
+# "<example> <input|output> <qualifier>"; format labels (قالب ورودی, "Input
+# format") describe syntax rather than an example and do not match
+_EXAMPLE_LABEL_RE = re.compile(
+    r"^(?:(?:نمونه|مثال)\s+)?(ورودی|خروجی)(?:\s+(.*))?$"
+    r"|^(?:sample|example)?\s*(input|output)\s*(\d*)\s*:?$",
+    re.IGNORECASE,
+)
+
+_PERSIAN_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹", "0123456789")
+_ORDINALS = {"اول": "1", "دوم": "2", "سوم": "3", "چهارم": "4", "پنجم": "5"}
+# Typographic quotes become ASCII; zero-width spaces are dropped
+_NORMALIZE = str.maketrans(
+    {"“": '"', "”": '"', "„": '"', "‘": "'", "’": "'", "\u200b": None, "\ufeff": None}
+)
+
+
+def _label(text: str):
+    """("input" | "output", qualifier) for an example label, else None."""
+    match = _EXAMPLE_LABEL_RE.match(" ".join(text.split()))
+    if not match:
+        return None
+    word = (match.group(1) or match.group(3)).lower()
+    kind = "input" if word in ("ورودی", "input") else "output"
+    qualifier = (match.group(2) or match.group(4) or "").translate(_PERSIAN_DIGITS)
+    words = [_ORDINALS.get(word, word) for word in qualifier.split()]
+    return kind, " ".join(words)
+
+
+def _wrapped(text: str, extent: List[float], following: str, column: float) -> bool:
+    """Whether the PDF wrapped a code line before the following one.
+
+    Code is monospace, so the line's own bbox gives its character width. The
+    code box ends about a character inside the page's text column. A wrapped
+    line is full: it ends within a few characters of the box, and the
+    following line's first word would not have fitted after it.
+    """
+    x0, x1 = extent
+    char_width = (x1 - x0) / len(text)
+    visible_end = x1 - char_width * (len(text) - len(text.rstrip()))
+    room = (column - char_width - visible_end) / char_width
+    return room < 8 and room < len(following.split()[0]) + 1
+
+
+def _code_body(blocks: List[tuple], start: int, columns: Dict[int, float]):
+    """Code lines starting at blocks[start] and the index after them.
+
+    The body ends at the first non-code block or at a block in another font
+    (footnotes). Lines the PDF wrapped at the right margin are rejoined, only
+    within one layout block and only when the line bboxes show the wrap
+    (see _wrapped); columns maps each page to its text column's right edge.
+    """
+    lines = []
+    end = start
+    if start >= len(blocks):
+        return lines, end
+    first = blocks[start][1]
+    while end < len(blocks) and blocks[end][2] == "code":
+        page, block = blocks[end][0], blocks[end][1]
+        if block[8] != first[8] or block[7] < first[7] - 0.5:
+            break
+        block_lines = [
+            (text, extent)
+            for text, extent in zip(block[4].split("\n"), block[9])
+            if text.strip()
+        ]
+        for index, (text, extent) in enumerate(block_lines):
+            if index and _wrapped(*block_lines[index - 1], text, columns[page]):
+                lines[-1] = f"{lines[-1]} {text.strip()}"
+            else:
+                lines.append(text.rstrip())
+        end += 1
+    return lines, end
+
+
+def _phase(pdf_path: str) -> Optional[int]:
+    store = get_store()
+    entry = store.index().get(os.path.relpath(pdf_path, store.practices_dir), {})
+    for key in entry.get("keys", []):
+        match = re.fullmatch(r"A\d+\.(\d+)", key)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def extract_pdf_samples(pdf_path: str) -> List[dict]:
+    """Paired examples of one description PDF, in document order.
+
+    Each example output is paired with the latest pending input of the same
+    qualifier ("1", "2", "valid"), or with an unqualified one, within the
+    section (headings that only say "Input"/"Output" do not start one).
+    Outputs without an input (lists of possible messages) are dropped.
+    """
+    document = get_store().document(pdf_path)
+    blocks = spec_index.classify_blocks(document)
+    columns = {}
+    for page, block, _ in blocks:
+        columns[page] = max(columns.get(page, 0), block[2])
+
+    samples = []
+    pending = []
+    heading = ""
+    i = 0
+    while i < len(blocks):
+        page, block, kind = blocks[i]
+        if kind == "heading" and not _label(block[4]):
+            heading = " ".join(block[4].split())
+            pending = []
+            i += 1
+            continue
+
+        label = _label(block[4]) if kind != "code" else None
+        if not label:
+            i += 1
+            continue
+
+        lines, end = _code_body(blocks, i + 1, columns)
+        if not lines:
+            i += 1
+            continue
+        kind_label, qualifier = label
+        entry = {
+            "label": " ".join(block[4].split()),
+            "qualifier": qualifier,
+            "page": page,
+            "lines": lines,
+        }
+        last = samples[-1] if samples else None
+
+        if (
+            kind_label == "input"
+            and last is not None
+            and last["section"] == heading
+            and last["output_qualifier"] == qualifier
+            and last["output_end_page"] == page - 1
+            and blocks[i - 1][0] != page
+        ):
+            # Label repeated at the top of a page: the output continues
+            last["output_lines"].extend(lines)
+            last["output_end_page"] = blocks[end - 1][0]
+        elif kind_label == "input":
+            pending.append(entry)
+        else:
+            match = next(
+                (item for item in reversed(pending) if item["qualifier"] == qualifier),
+                None,
+            ) or next(
+                (
+                    item
+                    for item in reversed(pending)
+                    if not item["qualifier"] or not qualifier
+                ),
+                None,
+            )
+            if match is None:
+                logger.debug(
+                    f"Unpaired example output '{entry['label']}' on page {page}"
+                )
+            else:
+                pending.remove(match)
+                samples.append(
+                    {
+                        "section": heading,
+                        "input": match,
+                        "output": entry,
+                        "output_lines": list(lines),
+                        "output_qualifier": qualifier,
+                        "output_end_page": blocks[end - 1][0],
+                    }
+                )
+        i = end
+
+    return [_sample(pdf_path, pair) for pair in samples]
+
+
+def _sample(pdf_path: str, pair: dict) -> dict:
+    source = pair["input"]
+    input_text = "\n".join(source["lines"]) + "\n"
+    output_text = "\n".join(pair["output_lines"]) + "\n"
+    normalized_input = input_text.translate(_NORMALIZE)
+    normalized_output = output_text.translate(_NORMALIZE)
+    return {
+        "input": normalized_input,
+        "output": normalized_output,
+        "source": {
+            "pdf": os.path.basename(pdf_path),
+            "phase": _phase(pdf_path),
+            "section": pair["section"],
+            "input_label": source["label"],
+            "output_label": pair["output"]["label"],
+            "input_page": source["page"],
+            "output_pages": sorted({pair["output"]["page"], pair["output_end_page"]}),
+            "normalized": normalized_input != input_text
+            or normalized_output != output_text,
+        },
+    }
+
+
+def extract_samples(assignment: str) -> List[dict]:
+    """Paired examples from all description PDFs of an assignment.
+
+    Args:
+        assignment: Assignment key ("A1", "A6", "A6.2", ...)
+
+    Returns:
+        Dicts with "input" and "output" text and "source" provenance
+        (PDF, phase, section heading, labels, pages and the normalizations
+        applied). Duplicate inputs keep their first occurrence.
+    """
+    samples = []
+    seen = set()
+    for pdf_path in get_store().files(assignment):
+        for sample in extract_pdf_samples(pdf_path):
+            key = (sample["source"]["phase"], sample["input"])
+            if key not in seen:
+                seen.add(key)
+                samples.append(sample)
+    return samples
+
+
+def default_samples_dir(assignment: str) -> str:
+    """test_cases/practice<N>/samples, next to the assignment's judge directory."""
+    number = re.match(r"A?(\d+)", assignment, re.IGNORECASE).group(1)
+    return os.path.join(config.TEST_CASES_DIR, f"practice{number}", "samples")
+
+
+def write_samples(
+    assignment: str,
+    samples: List[dict],
+    dest: Optional[str] = None,
+    manifest_name: str = "samples.json",
+) -> dict:
+    """Write samples as judge test directories plus a manifest (samples.json).
+
+    Samples with a phase go to P<phase>/tests/, others to tests/. A
+    destination previously written by this function is replaced.
+
+    Returns:
+        The manifest content: assignment, timestamp, destination and one
+        entry per test with its relative .in/.out paths and source
+    """
+    dest = dest or default_samples_dir(assignment)
+    manifest_path = os.path.join(dest, manifest_name)
+    if os.path.exists(manifest_path):
+        shutil.rmtree(dest)
+    os.makedirs(dest, exist_ok=True)
+
+    counters = {}
+    tests = []
+    for sample in samples:
+        phase = sample["source"]["phase"]
+        tests_dir = os.path.join(f"P{phase}" if phase else "", "tests")
+        counters[tests_dir] = counters.get(tests_dir, 0) + 1
+        name = f"{counters[tests_dir]:02d}"
+        case_dir = os.path.join(dest, tests_dir, name)
+        os.makedirs(case_dir, exist_ok=True)
+        with open(os.path.join(case_dir, f"{name}.in"), "w", encoding="utf-8") as f:
+            f.write(sample["input"])
+        with open(os.path.join(case_dir, f"{name}.out"), "w", encoding="utf-8") as f:
+            f.write(sample["output"])
+        tests.append(
+            {
+                "input": os.path.join(tests_dir, name, f"{name}.in"),
+                "output": os.path.join(tests_dir, name, f"{name}.out"),
+                **sample["source"],
+            }
+        )
+
+    manifest = {
+        "assignment": assignment,
+        "generated": datetime.now().isoformat(),
+        "directory": dest,
+        "tests": tests,
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    logger.info(f"Wrote {len(tests)} sample tests for {assignment} to {dest}")
+    return manifest
+
+
+def extract_sample_tests(assignment: str, dest: Optional[str] = None) -> dict:
+    """Extract an assignment's PDF examples and write them as judge tests."""
+    return write_samples(assignment, extract_samples(assignment), dest)
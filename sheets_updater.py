@@ -290,3 +290,22 @@ def update_multi_phase_grades(student_id, phase_grades, assignment_type="A6"):
     """Updates grades for multi-phase assignments like A6."""
     for phase, grade_data in phase_grades.items():
         update_student_grade(student_id, grade_data, assignment_type, phase)
+
+
+def update_plagiarism_scores(max_similarity, assignment_type, phase=None):
+    """Writes each student's maximum similarity into the assignment's plagiarism column."""
+    if assignment_type == "A6" and phase is None:
+        phase = "phase3"
+
+    update_map = get_column_mapping(assignment_type, phase)
+    column_key = next((key for key in update_map if key.endswith("plagiarism")), None)
+    if column_key is None:
+        print(
+            f"Error: No plagiarism column for {assignment_type}{f' - {phase}' if phase else ''}"
+        )
+        return
+
+    for student_id, result in max_similarity.items():
+        update_student_grade(
+            student_id, {column_key: result["similarity"]}, assignment_type, phase
+        )
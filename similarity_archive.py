@@ -0,0 +1,356 @@
+"""
+Persistent cross-semester similarity archive.
+
+Every graded submission is reduced to a MinHash signature over its winnowed
+fingerprints (see plagiarism.fingerprint_submission) and stored in an SQLite
+database together with its LSH band buckets. A new submission is only
+compared against entries sharing at least one bucket, so query time stays
+roughly constant as the archive grows across semesters.
+"""
+
+import os
+import json
+import random
+import sqlite3
+import hashlib
+import logging
+import subprocess
+import threading
+from array import array
+from datetime import datetime
+from typing import List, Optional
+
+import config
+import fingerprints
+import plagiarism
+
+logger = logging.getLogger(__name__)
+
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 64) - 1
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id TEXT,
+    assignment TEXT,
+    semester TEXT,
+    repo_url TEXT,
+    commit_sha TEXT,
+    fingerprints INTEGER,
+    signature BLOB NOT NULL,
+    added TEXT,
+    superseded INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    entry_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_buckets ON buckets (band, bucket);
+CREATE INDEX IF NOT EXISTS idx_entries_repo ON entries (repo_url, commit_sha);
+"""
+
+
+class SimilarityArchive:
+    """MinHash/LSH fingerprint archive stored in a single SQLite file."""
+
+    def __init__(self, path: Optional[str] = None):
+        archive_config = config.SIMILARITY_ARCHIVE_CONFIG
+        self.path = path or archive_config["path"]
+        self.num_perm = archive_config["num_perm"]
+        self.bands = archive_config["bands"]
+        self.rows = self.num_perm // self.bands
+
+        rng = random.Random(archive_config["seed"])
+        self._perms = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+            for _ in range(self.num_perm)
+        ]
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def signature(self, hashes) -> List[int]:
+        """Compute the MinHash signature of a set of fingerprint hashes."""
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        return [min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms]
+
+    def _band_keys(self, signature: List[int]) -> List[int]:
+        keys = []
+        for band in range(self.bands):
+            chunk = array("Q", signature[band * self.rows : (band + 1) * self.rows])
+            digest = hashlib.blake2b(chunk.tobytes(), digest_size=8).digest()
+            keys.append(int.from_bytes(digest, "big", signed=True))
+        return keys
+
+    def contains(self, repo_url: str, commit_sha: str) -> bool:
+        """Return True if this exact repository commit is already archived."""
+        row = self._conn.execute(
+            "SELECT 1 FROM entries WHERE repo_url = ? AND commit_sha = ? AND superseded = 0",
+            (repo_url, commit_sha),
+        ).fetchone()
+        return row is not None
+
+    def insert(
+        self,
+        hashes,
+        student_id: str,
+        assignment: str,
+        semester: str = None,
+        repo_url: str = None,
+        commit_sha: str = None,
+    ) -> int:
+        """Add a submission's fingerprints to the archive and return its entry ID.
+
+        Re-inserting the same repository commit supersedes the previous entry,
+        as does re-inserting a student's assignment without a repository URL
+        (whatever its commit) in the same semester; superseded rows are
+        dropped by compact().
+        """
+        signature = self.signature(hashes)
+        band_keys = self._band_keys(signature)
+
+        with self._lock, self._conn:
+            if repo_url and commit_sha:
+                self._conn.execute(
+                    "UPDATE entries SET superseded = 1 WHERE repo_url = ? AND commit_sha = ?",
+                    (repo_url, commit_sha),
+                )
+            elif not repo_url and student_id:
+                self._conn.execute(
+                    "UPDATE entries SET superseded = 1 WHERE student_id = ? "
+                    "AND assignment IS ? AND semester IS ? AND repo_url IS NULL",
+                    (student_id, assignment, semester),
+                )
+            cursor = self._conn.execute(
+                "INSERT INTO entries (student_id, assignment, semester, repo_url, "
+                "commit_sha, fingerprints, signature, added) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    student_id,
+                    assignment,
+                    semester,
+                    repo_url,
+                    commit_sha,
+                    len(hashes),
+                    array("Q", signature).tobytes(),
+                    datetime.now().isoformat(),
+                ),
+            )
+            entry_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO buckets (band, bucket, entry_id) VALUES (?, ?, ?)",
+                [(band, key, entry_id) for band, key in enumerate(band_keys)],
+            )
+        return entry_id
+
+    def query(
+        self,
+        hashes,
+        assignment: str = None,
+        exclude_repo: str = None,
+        threshold: float = None,
+        limit: int = 10,
+        exclude_semester=False,
+    ) -> List[dict]:
+        """Return archived submissions whose estimated Jaccard similarity exceeds threshold.
+
+        exclude_semester skips entries of that semester (the current cohort,
+        which the plagiarism engine covers); None matches unlabelled entries.
+        """
+        if threshold is None:
+            threshold = config.SIMILARITY_ARCHIVE_CONFIG["threshold"]
+
+        signature = self.signature(hashes)
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            rows = self._conn.execute(
+                "SELECT entry_id FROM buckets WHERE band = ? AND bucket = ?",
+                (band, key),
+            )
+            candidates.update(row[0] for row in rows)
+
+        if not candidates:
+            return []
+
+        candidates = sorted(candidates)
+        rows = []
+        for start in range(0, len(candidates), 500):
+            chunk = candidates[start : start + 500]
+            rows.extend(
+                self._conn.execute(
+                    "SELECT id, student_id, assignment, semester, repo_url, commit_sha, signature "
+                    f"FROM entries WHERE superseded = 0 AND id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+            )
+
+        matches = []
+        for entry_id, student, entry_assignment, semester, repo, sha, blob in rows:
+            if assignment and entry_assignment != assignment:
+                continue
+            if exclude_repo and repo == exclude_repo:
+                continue
+            if exclude_semester is not False and semester == exclude_semester:
+                continue
+            other = array("Q")
+            other.frombytes(blob)
+            similarity = sum(1 for x, y in zip(signature, other) if x == y) / len(
+                signature
+            )
+            if similarity >= threshold:
+                matches.append(
+                    {
+                        "entry_id": entry_id,
+                        "student_id": student,
+                        "assignment": entry_assignment,
+                        "semester": semester,
+                        "repo_url": repo,
+                        "commit_sha": sha,
+                        "similarity": round(similarity * 100, 1),
+                    }
+                )
+
+        matches.sort(key=lambda m: m["similarity"], reverse=True)
+        return matches[:limit]
+
+    def compact(self) -> dict:
+        """Drop superseded entries and their buckets, then rebuild the database file."""
+        with self._lock:
+            with self._conn:
+                removed = self._conn.execute(
+                    "SELECT COUNT(*) FROM entries WHERE superseded = 1"
+                ).fetchone()[0]
+                self._conn.execute(
+                    "DELETE FROM buckets WHERE entry_id IN "
+                    "(SELECT id FROM entries WHERE superseded = 1)"
+                )
+                self._conn.execute("DELETE FROM entries WHERE superseded = 1")
+            self._conn.execute("VACUUM")
+            self._conn.execute("ANALYZE")
+
+        stats = self.stats()
+        stats["removed"] = removed
+        logger.info(f"Compacted similarity archive {self.path}: {stats}")
+        return stats
+
+    def stats(self) -> dict:
+        entries = self._conn.execute(
+            "SELECT COUNT(*) FROM entries WHERE superseded = 0"
+        ).fetchone()[0]
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {"entries": entries, "size_bytes": size}
+
+
+def _head_commit(project_path: str) -> Optional[str]:
+    process = subprocess.run(
+        ["git", "rev-parse", "HEAD"],
+        cwd=project_path,
+        capture_output=True,
+        text=True,
+    )
+    return process.stdout.strip() if process.returncode == 0 else None
+
+
+def check_and_archive(
+    archive: SimilarityArchive,
+    project_path: str,
+    student_id: str,
+    assignment: str,
+    repo_url: str = None,
+    commit_sha: str = None,
+    semester: str = None,
+    excluded_files: Optional[List[str]] = None,
+) -> List[dict]:
+    """Query the archive for a submission, then add the submission to it.
+
+    Returns the historic matches: other repositories from other semesters.
+    Entries of the current semester are only skipped when one is configured;
+    without a label every archived entry is compared.
+    """
+    commit_sha = commit_sha or _head_commit(project_path)
+    semester = semester or config.SIMILARITY_ARCHIVE_CONFIG["semester"]
+    hashes = plagiarism.fingerprint_submission(project_path, excluded_files)["hashes"]
+
+    matches = archive.query(
+        hashes,
+        assignment=assignment,
+        exclude_repo=repo_url,
+        exclude_semester=semester if semester else False,
+    )
+    if not (repo_url and commit_sha and archive.contains(repo_url, commit_sha)):
+        archive.insert(
+            list(hashes),
+            student_id,
+            assignment,
+            semester=semester,
+            repo_url=repo_url,
+            commit_sha=commit_sha,
+        )
+    return matches
+
+
+def ingest_repos_file(
+    archive: SimilarityArchive, repos_json: str, assignment: str, semester: str = None
+) -> int:
+    """Clone every team in a judge repos.json file and add it to the archive.
+
+    Entries whose repo_url and commit_sha are already archived are skipped.
+    Clones are removed once fingerprinted.
+    Returns the number of newly archived submissions.
+    """
+    import shutil
+    import tools
+
+    with open(repos_json, "r", encoding="utf-8") as f:
+        teams = json.load(f)
+
+    starter_index = fingerprints.load_starter_index(assignment)
+    added = 0
+    for team in teams:
+        repo_url = team.get("repo_url")
+        commit_sha = team.get("commit_sha")
+        student_id = "-".join(team.get("students", [])) or None
+        if not repo_url or archive.contains(repo_url, commit_sha):
+            continue
+
+        try:
+            project_path = tools.clone_student_repo(repo_url, commit_sha, student_id)
+        except Exception as e:
+            logger.warning(f"Skipping {repo_url}: {e}")
+            continue
+
+        try:
+            excluded = [
+                entry["path"]
+                for entry in fingerprints.find_starter_files(
+                    project_path, assignment, starter_index
+                )
+            ]
+            hashes = plagiarism.fingerprint_submission(project_path, excluded)[
+                "hashes"
+            ]
+        finally:
+            shutil.rmtree(project_path, ignore_errors=True)
+        archive.insert(
+            list(hashes),
+            student_id,
+            assignment,
+            semester=semester,
+            repo_url=repo_url,
+            commit_sha=commit_sha,
+        )
+        added += 1
+
+    logger.info(f"Archived {added} submissions from {repos_json}")
+    return added
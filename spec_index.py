@@ -0,0 +1,334 @@
+"""
+Section-aware index of assignment specifications.
+
+Description PDFs are split into sections at their headings, using the font
+size and weight of the layout blocks cached by the description store. Code
+samples (monospace, or Latin and digits only) and list items keep their shape.
+A small BM25 index over the sections lets each grading prompt carry only the
+parts of the spec that match the student's code and test output, within
+SPEC_RETRIEVAL_CONFIG["token_budget"].
+"""
+
+import math
+import os
+import re
+import logging
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import config
+from description_store import get_store
+
+logger = logging.getLogger(__name__)
+
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+# Bullets (●, ○, •, ▪, ■, ◦, *, -) or "1." / "1)" at the start of a block
+_LIST_RE = re.compile(
+    r"^\s*(?:[\u25cf\u25cb\u2022\u25aa\u25a0\u25e6*-]|\d{1,2}[.)])[\s\u200b]*"
+)
+_PERSIAN_RE = re.compile(r"[\u0600-\u06ff]")
+
+# PyMuPDF span flags
+_FLAG_MONOSPACE = 8
+_FLAG_BOLD = 16
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens; snake_case identifiers also yield their parts."""
+    tokens = []
+    for word in _WORD_RE.findall(text.lower()):
+        tokens.append(word)
+        if "_" in word.strip("_"):
+            tokens.extend(part for part in word.split("_") if part)
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // config.SPEC_RETRIEVAL_CONFIG["chars_per_token"] + 1
+
+
+def _block_kind(text: str, size: float, flags: int, body_size: float) -> str:
+    if flags & _FLAG_BOLD and size >= body_size + 1.5:
+        return "heading"
+    if _LIST_RE.match(text):
+        return "item"
+    if flags & _FLAG_MONOSPACE or (
+        not _PERSIAN_RE.search(text) and re.search(r"[A-Za-z0-9]", text)
+    ):
+        return "code"
+    return "text"
+
+
+def classify_blocks(document: dict) -> List[tuple]:
+    """Text blocks of an extracted PDF as (page, block, kind) in document order.
+
+    kind is "heading" (bold and larger than body text), "item" (starts with
+    a bullet or number), "code" (monospace, or Latin and digits only) or
+    "text".
+    """
+    blocks = [
+        (page_number, block)
+        for page_number, page in enumerate(document["pages"], 1)
+        for block in page["blocks"]
+        if block[4].strip() and block[6] == 0
+    ]
+    if not blocks:
+        return []
+
+    # Body text size is the one covering the most characters
+    sizes = Counter()
+    for _, block in blocks:
+        sizes[block[7]] += len(block[4].strip())
+    body_size = sizes.most_common(1)[0][0]
+    return [
+        (page_number, block, _block_kind(block[4], block[7], block[8], body_size))
+        for page_number, block in blocks
+    ]
+
+
+def parse_sections(document: dict) -> List[dict]:
+    """Split one extracted description PDF into sections.
+
+    Args:
+        document: DescriptionStore.document() result
+
+    Returns:
+        Sections in document order, each {"pdf", "page", "heading", "path",
+        "text"}; "path" is the heading chain, e.g. "New commands > Join event"
+    """
+    blocks = classify_blocks(document)
+    heading_sizes = sorted(
+        {block[7] for _, block, kind in blocks if kind == "heading"}, reverse=True
+    )
+
+    sections = []
+    stack = []
+    current = None
+    lines = []
+
+    def close():
+        text = "\n".join(lines).strip()
+        if current is not None and text:
+            sections.append({**current, "text": text})
+
+    for page_number, block, kind in blocks:
+        text = block[4].strip()
+
+        if kind == "heading":
+            close()
+            heading = " ".join(text.split())
+            level = heading_sizes.index(block[7])
+            stack = [entry for entry in stack if entry[0] < level]
+            stack.append((level, heading))
+            current = {
+                "pdf": document["pdf"],
+                "page": page_number,
+                "heading": heading,
+                "path": " > ".join(entry[1] for entry in stack),
+            }
+            lines = []
+            continue
+
+        if current is None:
+            current = {
+                "pdf": document["pdf"],
+                "page": page_number,
+                "heading": "",
+                "path": "",
+            }
+
+        if kind == "code":
+            code = "\n".join(line.rstrip() for line in text.splitlines())
+            if lines and lines[-1] == "```":
+                lines.insert(len(lines) - 1, code)
+            else:
+                lines.extend(["```", code, "```"])
+        elif kind == "item":
+            lines.append("- " + " ".join(_LIST_RE.sub("", text).split()))
+        else:
+            lines.append(" ".join(text.split()))
+
+    close()
+    return sections
+
+
+def _split_section(section: dict, max_tokens: int) -> List[dict]:
+    """Split an oversized section at line boundaries, keeping code fences whole."""
+    if estimate_tokens(section["text"]) <= max_tokens:
+        return [section]
+
+    parts = []
+    chunk = []
+    in_code = False
+    for line in section["text"].split("\n"):
+        if line == "```":
+            in_code = not in_code
+        chunk.append(line)
+        if not in_code and estimate_tokens("\n".join(chunk)) >= max_tokens:
+            parts.append("\n".join(chunk))
+            chunk = []
+    if chunk:
+        parts.append("\n".join(chunk))
+
+    return [
+        {**section, "text": text, "part": number}
+        for number, text in enumerate(parts, 1)
+    ]
+
+
+class SpecIndex:
+    """BM25 index over the sections of an assignment's description PDFs."""
+
+    def __init__(self, sections: List[dict], k1: float = None, b: float = None):
+        retrieval_config = config.SPEC_RETRIEVAL_CONFIG
+        self.k1 = retrieval_config["k1"] if k1 is None else k1
+        self.b = retrieval_config["b"] if b is None else b
+        self.sections = sections
+        self.term_counts = []
+        document_frequency = Counter()
+        for section in sections:
+            counts = Counter(tokenize(section["path"] + "\n" + section["text"]))
+            self.term_counts.append(counts)
+            document_frequency.update(counts.keys())
+            section["tokens"] = estimate_tokens(section["text"])
+
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / max(len(self.lengths), 1)
+        total = len(sections)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(section["tokens"] for section in self.sections)
+
+    def scores(self, query: str) -> List[float]:
+        """BM25 score of every section for a free-text query.
+
+        Repeated query terms count logarithmically, so a long source file
+        does not drown out the terms of a short test report.
+        """
+        query_terms = {
+            term: 1 + math.log(count)
+            for term, count in Counter(tokenize(query)).items()
+            if term in self.idf
+        }
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.average_length)
+            score = 0.0
+            for term, weight in query_terms.items():
+                frequency = counts.get(term)
+                if frequency:
+                    score += (
+                        weight
+                        * self.idf[term]
+                        * frequency
+                        * (self.k1 + 1)
+                        / (frequency + norm)
+                    )
+            scores.append(score)
+        return scores
+
+    def select(self, query: str, token_budget: int) -> List[dict]:
+        """Highest-scoring sections that fit in token_budget, in document order.
+
+        Without any matching section the spec is taken from the beginning.
+        """
+        scores = self.scores(query)
+        ranked = sorted(
+            (i for i, score in enumerate(scores) if score > 0),
+            key=lambda i: -scores[i],
+        ) or list(range(len(self.sections)))
+
+        chosen = []
+        used = 0
+        for i in ranked:
+            tokens = self.sections[i]["tokens"]
+            if used + tokens <= token_budget:
+                chosen.append(i)
+                used += tokens
+        return [
+            {**self.sections[i], "score": round(scores[i], 3)} for i in sorted(chosen)
+        ]
+
+
+@lru_cache(maxsize=None)
+def _index_for(assignment: str, stamps: tuple) -> Optional[SpecIndex]:
+    store = get_store()
+    max_tokens = config.SPEC_RETRIEVAL_CONFIG["max_section_tokens"]
+    sections = []
+    for path in store.files(assignment):
+        for section in parse_sections(store.document(path)):
+            sections.extend(_split_section(section, max_tokens))
+    return SpecIndex(sections) if sections else None
+
+
+def get_spec_index(assignment: str) -> Optional[SpecIndex]:
+    """Spec index of an assignment, rebuilt only when its PDFs change."""
+    store = get_store()
+    index = store.index()
+    stamps = tuple(
+        (path, index[os.path.relpath(path, store.practices_dir)]["mtime_ns"])
+        for path in store.files(assignment)
+    )
+    return _index_for(assignment, stamps)
+
+
+def render_sections(sections: List[dict]) -> str:
+    """Sections as prompt text, each under its heading path and page."""
+    rendered = []
+    for section in sections:
+        title = section["path"] or section["pdf"]
+        if section.get("part"):
+            title += f" (part {section['part']})"
+        rendered.append(f"### {title} [{section['pdf']}, p. {section['page']}]")
+        rendered.append(section["text"])
+    return "\n\n".join(rendered)
+
+
+def relevant_spec(
+    assignment: str, query: str, token_budget: Optional[int] = None
+) -> Dict[str, object]:
+    """Spec context for one grading prompt.
+
+    Args:
+        assignment: Assignment key (A1..A6)
+        query: Text the sections are ranked against (source code, test output)
+        token_budget: Estimated prompt tokens for the sections
+            (defaults to SPEC_RETRIEVAL_CONFIG["token_budget"])
+
+    Returns:
+        {"text", "sections", "tokens", "total_tokens"}; "text" is empty when
+        retrieval is disabled or the assignment has no description PDF
+    """
+    retrieval_config = config.SPEC_RETRIEVAL_CONFIG
+    empty = {"text": "", "sections": [], "tokens": 0, "total_tokens": 0}
+    if not retrieval_config["enabled"]:
+        return empty
+
+    try:
+        index = get_spec_index(assignment)
+    except Exception as e:
+        logger.warning(f"Spec index unavailable for {assignment}: {e}")
+        return empty
+    if index is None:
+        return empty
+
+    sections = index.select(query, token_budget or retrieval_config["token_budget"])
+    return {
+        "text": render_sections(sections),
+        "sections": [
+            {
+                key: section.get(key)
+                for key in ("pdf", "page", "path", "part", "tokens", "score")
+            }
+            for section in sections
+        ],
+        "tokens": sum(section["tokens"] for section in sections),
+        "total_tokens": index.total_tokens,
+    }
@@ -0,0 +1,705 @@
+"""
+Randomized stress tests from small per-assignment input grammars.
+
+Each grammar in GRAMMARS describes the CSV fixtures an assignment reads
+(passed as command-line arguments, in order) and the command lines of its
+input script. generate_suite() synthesizes one fixture set and many scripts
+from it, gets their expected outputs from the reference solution through
+reference_oracle, and writes a judge-style suite (tests/NN/NN.in plus the
+fixtures where the assignment's judge.sh looks for them). "large" suites
+check that submissions finish within the judge's time limit;
+measure_performance() runs a submission on them during grading and records
+its runtime.
+
+Grammar rules are lists of alternatives, plain or (weight, text), or
+functions of the Expander for values that depend on earlier ones (a login
+with a signed-up user's password). References inside a text:
+
+    <rule>          expand a rule
+    <int:a:b>       random integer; a and b may name a size, e.g. students+5
+    <id:size>       random integer in 1..sizes[size]
+    <#>             1-based row number inside a fixture
+    <new:rule>      expand rule to a value not seen before and remember it
+    <any:rule>      one of the remembered values of rule
+    <row:rule>      the remembered value of rule at the current row
+"""
+
+import os
+import re
+import json
+import random
+import shutil
+import logging
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import config
+import reference_oracle
+import sample_tests
+
+logger = logging.getLogger(__name__)
+
+
+_REFERENCE_RE = re.compile(r"<([^<>]+)>")
+_BOUND_RE = re.compile(r"^(-?\d+)$|^(\w+)([+-]\d+)?$")
+
+
+class Expander:
+    """Expands the rules of one grammar for one fixture set and its scripts."""
+
+    def __init__(self, grammar: dict, sizes: Dict[str, int], rng: random.Random):
+        self.rules = grammar["rules"]
+        self.sizes = sizes
+        self.rng = rng
+        self.row = 0
+        self.pools: Dict[str, List[str]] = {}
+        self._seen: Dict[str, set] = {}
+        # Scratch space for rule functions (users, menus, reservations)
+        self.state: Dict[str, object] = {}
+
+    def expand(self, text: str) -> str:
+        return _REFERENCE_RE.sub(lambda match: self._reference(match.group(1)), text)
+
+    def rule(self, name: str) -> str:
+        rule = self.rules[name]
+        if callable(rule):
+            return rule(self)
+        weights = [item[0] if isinstance(item, tuple) else 1 for item in rule]
+        choice = self.rng.choices(rule, weights)[0]
+        return self.expand(choice[1] if isinstance(choice, tuple) else choice)
+
+    def new(self, name: str) -> str:
+        """A value of rule name not produced by new() before; remembered in its pool."""
+        seen = self._seen.setdefault(name, set())
+        for _ in range(50):
+            value = self.rule(name)
+            if value not in seen:
+                break
+        else:
+            value = f"{value}{len(seen)}"
+        seen.add(value)
+        self.pools.setdefault(name, []).append(value)
+        return value
+
+    def any(self, name: str) -> str:
+        pool = self.pools.get(name)
+        return self.rng.choice(pool) if pool else self.rule(name)
+
+    def bound(self, text: str) -> int:
+        match = _BOUND_RE.match(text)
+        if match.group(1):
+            return int(match.group(1))
+        return self.sizes[match.group(2)] + int(match.group(3) or 0)
+
+    def _reference(self, reference: str) -> str:
+        kind, _, argument = reference.partition(":")
+        if kind == "#":
+            return str(self.row)
+        if kind == "int":
+            low, high = argument.split(":")
+            return str(self.rng.randint(self.bound(low), self.bound(high)))
+        if kind == "id":
+            return str(self.rng.randint(1, self.sizes[argument]))
+        if kind == "new":
+            return self.new(argument)
+        if kind == "any":
+            return self.any(argument)
+        if kind == "row":
+            return self.pools[argument][self.row - 1]
+        return self.rule(reference)
+
+
+def _capitalized(rule: str) -> Callable[[Expander], str]:
+    return lambda g: g.expand(rule).capitalize()
+
+
+_SYLLABLES = ["ba", "ra", "mi", "so", "ka", "li", "na", "to", "re", "za", "ha"]
+_SYLLABLES += ["di", "mo", "sa", "pa", "ri", "ne", "ju", "fa", "go", "vi", "el"]
+
+# practice2: tables and students CSVs, seating commands on stdin
+_A2_GRAMMAR = {
+    "fixtures_dir": "csvs",
+    "fixtures": [
+        (
+            "tables.csv",
+            "Id,x,y,capacity,type",
+            "tables",
+            "<#>,<int:1:20>,<int:1:20>,<int:1:6>,<table_type>",
+        ),
+        (
+            "students.csv",
+            "id,name,friend_id,enemy_id",
+            "students",
+            "<#>,<new:student_name>,<id:students>,<id:students>",
+        ),
+    ],
+    "sizes": {
+        "small": {"tables": 6, "students": 50, "commands": (5, 60)},
+        "large": {"tables": 1000, "students": 20000, "commands": (200000, 200000)},
+    },
+    "rules": {
+        "command": [
+            (6, "reserve_table <student> <table>"),
+            (4, "reserve_table <student>"),
+            (2, "enter <student>"),
+            (3, "exit <student>"),
+            (1, "switch <student>"),
+            (3, "show_table_info <table>"),
+        ],
+        "student": [(19, "<id:students>"), (1, "<int:0:students+5>")],
+        "table": [(19, "<id:tables>"), (1, "<int:0:tables+3>")],
+        "table_type": ["window", "middle", "door"],
+        "student_name": [(3, "<name_part>"), (1, "<name_part> <name_part>")],
+        "name_part": _capitalized("<syllable><syllable><syllable>"),
+        "syllable": _SYLLABLES,
+    },
+}
+
+
+def _quoted(name: str, value) -> str:
+    return f'{name} "{value}"'
+
+
+def _district_row(g: Expander) -> str:
+    # Symmetric neighbour lists: a ring plus random chords
+    if "neighbors" not in g.state:
+        names = g.pools["district"]
+        neighbors = {name: set() for name in names}
+        for i, name in enumerate(names):
+            if len(names) > 1:
+                other = names[(i + 1) % len(names)]
+                if other != name:
+                    neighbors[name].add(other)
+                    neighbors[other].add(name)
+            if len(names) > 3 and g.rng.random() < 0.5:
+                other = g.rng.choice(names)
+                if other != name:
+                    neighbors[name].add(other)
+                    neighbors[other].add(name)
+        g.state["neighbors"] = neighbors
+    name = g.pools["district"][g.row - 1]
+    ordered = sorted(g.state["neighbors"][name], key=lambda _: g.rng.random())
+    return f"{name},{';'.join(ordered)}"
+
+
+def _restaurant_row(g: Expander) -> str:
+    name = g.new("restaurant_name")
+    menu_size = min(len(g.pools["food"]), g.rng.randint(2, 5))
+    foods = g.rng.sample(g.pools["food"], menu_size)
+    opening = g.rng.randint(0, 14)
+    closing = g.rng.randint(opening + 2, 24)
+    tables = g.rng.randint(1, 8)
+    g.state.setdefault("restaurants", {})[name] = {
+        "foods": foods,
+        "tables": tables,
+        "hours": (opening, closing),
+    }
+    menu = ";".join(f"{food}:{g.rng.randint(5, 60) * 10}" for food in foods)
+    return f"{name},{g.any('district')},{menu},{opening},{closing},{tables}"
+
+
+def _discount_row(g: Expander) -> str:
+    name = g.pools["restaurant_name"][g.row - 1]
+    foods = g.state["restaurants"][name]["foods"]
+    total = g.rng.choice(
+        [
+            "none",
+            f"percent;{g.rng.randint(1, 10) * 100};{g.rng.randint(5, 50)}",
+            f"amount;{g.rng.randint(1, 10) * 100};{g.rng.randint(5, 30) * 10}",
+        ]
+    )
+    first = g.rng.choice(
+        [
+            "none",
+            f"percent;{g.rng.randint(5, 30)}",
+            f"amount;{g.rng.randint(5, 30) * 5}",
+        ]
+    )
+    items = [
+        g.rng.choice(
+            [
+                f"percent;{food}:{g.rng.randint(5, 60)}",
+                f"amount;{food}:{g.rng.randint(1, 10) * 10}",
+            ]
+        )
+        for food in g.rng.sample(foods, g.rng.randint(0, len(foods)))
+    ]
+    return f"{name},{total},{first},{'|'.join(items) or 'none'}"
+
+
+def _user(g: Expander, known: bool) -> tuple:
+    users = g.state.setdefault("users", {})
+    if known and users:
+        username = g.rng.choice(list(users))
+        return username, users[username]
+    return g.new("username"), g.rule("password")
+
+
+def _signup(g: Expander) -> str:
+    username, password = _user(g, g.rng.random() < 0.15)
+    g.state["users"].setdefault(username, password)
+    credentials = f"{_quoted('username', username)} {_quoted('password', password)}"
+    return f"POST signup ? {credentials}"
+
+
+def _login(g: Expander) -> str:
+    username, password = _user(g, g.rng.random() < 0.85)
+    if g.rng.random() < 0.1:
+        password = g.rule("password")
+    credentials = f"{_quoted('username', username)} {_quoted('password', password)}"
+    return f"POST login ? {credentials}"
+
+
+def _restaurant(g: Expander) -> tuple:
+    restaurants = g.state["restaurants"]
+    if g.rng.random() < 0.05:
+        return g.rule("restaurant_name"), None
+    name = g.rng.choice(list(restaurants))
+    return name, restaurants[name]
+
+
+def _reserve(g: Expander) -> str:
+    name, restaurant = _restaurant(g)
+    tables = restaurant["tables"] if restaurant else 3
+    opening, closing = restaurant["hours"] if restaurant else (8, 22)
+    start = g.rng.randint(max(opening - 1, 0), closing)
+    parts = [
+        _quoted("restaurant_name", name),
+        _quoted("table_id", g.rng.randint(1, tables + 1)),
+        _quoted("start_time", start),
+        _quoted("end_time", min(start + g.rng.choice([1, 1, 2, 3, 0]), 25)),
+    ]
+    if restaurant and g.rng.random() < 0.7:
+        foods = [g.rng.choice(restaurant["foods"]) for _ in range(g.rng.randint(1, 4))]
+        parts.append(_quoted("foods", ",".join(foods)))
+    return f"POST reserve ? {' '.join(parts)}"
+
+
+def _reserves(g: Expander) -> str:
+    if g.rng.random() < 0.4:
+        return "GET reserves ?"
+    name, _ = _restaurant(g)
+    command = f"GET reserves ? {_quoted('restaurant_name', name)}"
+    if g.rng.random() < 0.5:
+        command += f" {_quoted('reserve_id', g.rng.randint(1, 4))}"
+    return command
+
+
+def _cancel(g: Expander) -> str:
+    name, _ = _restaurant(g)
+    return (
+        f"DELETE reserve ? {_quoted('restaurant_name', name)} "
+        f"{_quoted('reserve_id', g.rng.randint(1, 4))}"
+    )
+
+
+def _restaurant_detail(g: Expander) -> str:
+    name, _ = _restaurant(g)
+    return f"GET restaurant_detail ? {_quoted('restaurant_name', name)}"
+
+
+_FOODS = ["berenj", "joojeh", "kabab", "burger", "pitza", "mahi", "meigo", "salad"]
+_FOODS += ["ghormeh", "gheymeh", "pasta", "hotdog", "soup", "ash", "shishlik"]
+
+# practice6 phase 1: restaurants and districts CSVs, request-style commands
+_A6_1_GRAMMAR = {
+    "fixtures_dir": os.path.join("tests", "csv"),
+    "pools": ["food", "district"],
+    "fixtures": [
+        (
+            "restaurants.csv",
+            "name,district,foods:prices,opening_time,closing_time,number_of_tables",
+            "restaurants",
+            "<restaurant_row>",
+        ),
+        ("districts.csv", "district,neighbors", "district", "<district_row>"),
+    ],
+    "sizes": {
+        "small": {"food": 15, "district": 10, "restaurants": 20, "commands": (5, 40)},
+        "large": {
+            "food": 200,
+            "district": 300,
+            "restaurants": 3000,
+            "commands": (50000, 50000),
+        },
+    },
+    "rules": {
+        "command": [
+            (4, "<signup>"),
+            (5, "<login>"),
+            (3, "POST logout ?"),
+            (1, "GET districts ?"),
+            (2, 'GET districts ? district "<any:district>"'),
+            (2, 'PUT my_district ? district "<district_arg>"'),
+            (1, "GET restaurants ?"),
+            (2, 'GET restaurants ? food_name "<any:food>"'),
+            (2, "<restaurant_detail>"),
+            (5, "<reserve>"),
+            (3, "<reserves>"),
+            (2, "<cancel>"),
+            (1, "<malformed>"),
+        ],
+        "malformed": [
+            "<method_typo> login ? username \"<any:username>\" password \"<password>\"",
+            "GET <command_typo> ?",
+            "POST signup ? \"<username>\" password \"<password>\"",
+            "PUT my_district ?",
+        ],
+        "method_typo": ["post", "PoST", "GeT", "PUt", "SHOW"],
+        "command_typo": ["resturant_detail", "log_out", "sign_up", "mydistrict"],
+        "district_arg": [(9, "<any:district>"), (1, "<district>")],
+        "signup": _signup,
+        "login": _login,
+        "reserve": _reserve,
+        "reserves": _reserves,
+        "cancel": _cancel,
+        "restaurant_detail": _restaurant_detail,
+        "restaurant_row": _restaurant_row,
+        "district_row": _district_row,
+        "restaurant_name": [(3, "<word>"), (1, "<word> <word>")],
+        "district": _capitalized("<syllable><syllable><syllable>"),
+        "food": [(1, "<food_base>"), (3, "<food_base> <syllable><syllable>")],
+        "food_base": _FOODS,
+        "username": [(3, "<word>"), (1, "<word>_<word>"), (1, "<word><int:1:99>")],
+        "password": ["<word><int:0:999>", "<syllable><int:10:99><syllable>"],
+        "word": [(2, "<syllable><syllable>"), (1, "<syllable><syllable><syllable>")],
+        "syllable": _SYLLABLES,
+    },
+}
+
+# practice6 phase 2: adds discounts.csv and the budget commands
+_A6_2_GRAMMAR = {
+    **_A6_1_GRAMMAR,
+    "fixtures": _A6_1_GRAMMAR["fixtures"]
+    + [
+        (
+            "discounts.csv",
+            "restaurant_name,total_price_discount,first_order_discount,food_discount",
+            "restaurants",
+            "<discount_row>",
+        )
+    ],
+    "rules": {
+        **_A6_1_GRAMMAR["rules"],
+        "command": _A6_1_GRAMMAR["rules"]["command"]
+        + [
+            (3, "POST increase_budget ? amount <budget_amount>"),
+            (2, "GET show_budget ?"),
+        ],
+        "budget_amount": [(8, "<int:1:2000>0"), (1, "-<int:1:500>0"), (1, "0")],
+        "discount_row": _discount_row,
+    },
+}
+
+GRAMMARS = {
+    "A2": _A2_GRAMMAR,
+    "A6.1": _A6_1_GRAMMAR,
+    "A6.2": _A6_2_GRAMMAR,
+}
+
+
+def grammar_for(assignment: str) -> dict:
+    """Grammar of an assignment key (A2, A6.1, A6.2)."""
+    if assignment not in GRAMMARS:
+        raise KeyError(
+            f"No stress-test grammar for {assignment}; "
+            f"available: {', '.join(sorted(GRAMMARS))}"
+        )
+    return GRAMMARS[assignment]
+
+
+def synthesize(
+    assignment: str, size: str = "small", count: int = 20, seed: int = 0
+) -> dict:
+    """One fixture set and count input scripts drawn from the grammar.
+
+    Returns:
+        {"fixtures": {file name: CSV text} in argument order, "scripts": [text]}
+    """
+    grammar = grammar_for(assignment)
+    sizes = grammar["sizes"][size]
+    g = Expander(grammar, sizes, random.Random(seed))
+
+    for pool in grammar.get("pools", []):
+        for _ in range(sizes[pool]):
+            g.new(pool)
+
+    fixtures = {}
+    for file_name, header, count_key, row in grammar["fixtures"]:
+        lines = [header]
+        for g.row in range(1, sizes[count_key] + 1):
+            lines.append(g.expand(row))
+        fixtures[file_name] = "\n".join(lines) + "\n"
+
+    scripts = []
+    low, high = sizes["commands"]
+    for _ in range(count):
+        # Each script starts from the fixtures only
+        g.state.pop("users", None)
+        lines = [g.rule("command") for _ in range(g.rng.randint(low, high))]
+        scripts.append("\n".join(lines) + "\n")
+    return {"fixtures": fixtures, "scripts": scripts}
+
+
+def fixture_args(assignment: str, suite_dir: str) -> List[str]:
+    """CSV arguments of a judge-layout suite (judge dir or stress suite), in order.
+
+    Empty for assignments without a grammar, which read stdin only.
+    """
+    grammar = GRAMMARS.get(assignment)
+    if not grammar:
+        return []
+    return [
+        os.path.abspath(os.path.join(suite_dir, grammar["fixtures_dir"], fixture[0]))
+        for fixture in grammar["fixtures"]
+    ]
+
+
+def judge_suites(assignment: str) -> List[tuple]:
+    """(grammar key, tests dir, CSV arguments) of each judge tests directory."""
+    suites = []
+    for tests_dir in reference_oracle.judge_tests_dirs(assignment):
+        suite_dir = os.path.dirname(tests_dir)
+        phase = re.fullmatch(r"P(\d+)", os.path.basename(suite_dir))
+        if phase:
+            key = f"{assignment.split('.')[0]}.{phase.group(1)}"
+        else:
+            # Single-phase judges keep their CSVs next to tests/
+            key = assignment
+        suites.append((key, tests_dir, fixture_args(key, suite_dir)))
+    return suites
+
+
+def _practice_dir(assignment: str) -> str:
+    return os.path.dirname(sample_tests.default_samples_dir(assignment))
+
+
+def default_suite_dir(assignment: str, size: str) -> str:
+    """test_cases/practice<N>/stress[/P<phase>]/<size>."""
+    phase = assignment.partition(".")[2]
+    return os.path.join(
+        _practice_dir(assignment),
+        config.STRESS_TEST_CONFIG["dir"],
+        f"P{phase}" if phase else "",
+        size,
+    )
+
+
+def generate_suite(
+    assignment: str,
+    size: str = "small",
+    count: Optional[int] = None,
+    seed: Optional[int] = None,
+    reference: Optional[str] = None,
+    dest: Optional[str] = None,
+) -> dict:
+    """Synthesize a stress suite and take its expected outputs from the reference.
+
+    Args:
+        assignment: Grammar key (A2, A6.1, A6.2)
+        size: "small" (many short scripts) or "large" (time-limit tests)
+        count: Number of scripts (default STRESS_TEST_CONFIG["<size>_count"])
+        seed: Random seed (default: time-based), recorded in the manifest
+        reference: Reference solution path (default REFERENCE_SOLUTIONS_DIR/<key>)
+        dest: Suite directory (default test_cases/practice<N>/stress[/P<k>]/<size>)
+
+    Returns:
+        The stress.json manifest: tests with the reference's runtime, the
+        fixtures and their argument order, seed and oracle rejections
+    """
+    stress_config = config.STRESS_TEST_CONFIG
+    grammar = grammar_for(assignment)
+    count = count or stress_config[f"{size}_count"]
+    seed = int(datetime.now().timestamp()) if seed is None else seed
+    synthesized = synthesize(assignment, size, count, seed)
+
+    large = size == "large"
+    # A large test the reference only just passes would be unfair to students
+    timeout = (
+        stress_config["time_limit"] * stress_config["reference_share"]
+        if large
+        else None
+    )
+    max_output_bytes = stress_config["large_output_mb"] << 20 if large else None
+
+    with tempfile.TemporaryDirectory(prefix="stress-") as fixtures_dir:
+        args = []
+        for file_name, text in synthesized["fixtures"].items():
+            path = os.path.join(fixtures_dir, file_name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            args.append(path)
+        oracle = reference_oracle.verify_inputs(
+            assignment,
+            synthesized["scripts"],
+            reference=reference,
+            args=args,
+            timeout=timeout,
+            max_output_bytes=max_output_bytes,
+        )
+
+        tests = [
+            {
+                "input": case["input"],
+                "output": case["output"],
+                "source": {
+                    "phase": None,
+                    "commands": case["input"].count("\n"),
+                    "reference_seconds": case["seconds"],
+                },
+            }
+            for case in oracle["accepted"]
+        ]
+        dest = dest or default_suite_dir(assignment, size)
+        manifest = sample_tests.write_samples(
+            assignment, tests, dest, manifest_name="stress.json"
+        )
+        target = os.path.join(dest, grammar["fixtures_dir"])
+        os.makedirs(target, exist_ok=True)
+        for path in args:
+            shutil.copy2(path, target)
+
+    manifest.update(
+        {
+            "size": size,
+            "seed": seed,
+            "fixtures": [
+                os.path.join(grammar["fixtures_dir"], file_name)
+                for file_name in synthesized["fixtures"]
+            ],
+            "time_limit": stress_config["time_limit"],
+            "candidates": oracle["candidates"],
+            "rejected": oracle["rejected"],
+            "seconds": oracle["seconds"],
+        }
+    )
+    with open(os.path.join(dest, "stress.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    logger.info(
+        f"Stress suite for {assignment} ({size}, seed {seed}): "
+        f"{len(tests)}/{count} scripts kept in {dest}"
+    )
+    return manifest
+
+
+def _large_suites(assignment: str) -> List[str]:
+    root = os.path.join(_practice_dir(assignment), config.STRESS_TEST_CONFIG["dir"])
+    phase = assignment.partition(".")[2]
+    if phase:
+        root = os.path.join(root, f"P{phase}")
+    suites = []
+    for directory, dirs, names in os.walk(root):
+        dirs.sort()
+        if "stress.json" in names:
+            with open(os.path.join(directory, "stress.json"), encoding="utf-8") as f:
+                if json.load(f).get("size") == "large":
+                    suites.append(directory)
+    return suites
+
+
+def measure_performance(
+    project_path: str, assignment: str, student_id: Optional[str] = None
+) -> Optional[dict]:
+    """Run a submission on the assignment's large stress suites and time it.
+
+    The submission is built like the judge builds it (Makefile, or all .cpp
+    files with STRESS_TEST_CONFIG["compile_command"]) and each test runs
+    under the judge's time limit. Runtimes are appended to
+    STRESS_TEST_CONFIG["performance_log"].
+
+    Returns:
+        None without large suites, else {"tests": [{"suite", "test",
+        "status", "seconds", "reference_seconds"}], "passed", "total",
+        "summary"}; status is "passed", "wrong_answer", "timeout", "crash",
+        "output_limit" or "build_failed"
+    """
+    stress_config = config.STRESS_TEST_CONFIG
+    suites = _large_suites(assignment)
+    if not suites:
+        return None
+
+    time_limit = stress_config["time_limit"]
+    tests = []
+    with tempfile.TemporaryDirectory(prefix="stress-build-") as build_root:
+        try:
+            executable = reference_oracle.build_executable(
+                project_path,
+                build_root,
+                "submission",
+                config.PRACTICE_CONFIGS.get(assignment.split(".")[0], {}),
+                compile_command=stress_config["compile_command"],
+            )
+        except RuntimeError as e:
+            executable = None
+            logger.warning(f"Performance build failed for {project_path}: {e}")
+
+        for suite in suites:
+            with open(os.path.join(suite, "stress.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+            args = [
+                os.path.abspath(os.path.join(suite, path))
+                for path in manifest["fixtures"]
+            ]
+            label = os.path.relpath(suite, os.path.dirname(os.path.dirname(suite)))
+            for test in manifest["tests"]:
+                entry = {
+                    "suite": label,
+                    "test": os.path.basename(os.path.dirname(test["input"])),
+                    "status": "build_failed",
+                    "seconds": None,
+                    "reference_seconds": test["reference_seconds"],
+                }
+                if executable:
+                    input_path = os.path.join(suite, test["input"])
+                    with open(input_path, encoding="utf-8") as f:
+                        input_text = f.read()
+                    with open(input_path[:-3] + ".out", encoding="utf-8") as f:
+                        expected = f.read()
+                    run = reference_oracle.run_sandboxed(
+                        executable,
+                        input_text,
+                        args,
+                        timeout=time_limit,
+                        max_output_bytes=stress_config["large_output_mb"] << 20,
+                    )
+                    entry["seconds"] = run["seconds"]
+                    entry["status"] = run["status"]
+                    if run["status"] == "ok":
+                        entry["status"] = (
+                            "passed"
+                            if reference_oracle.normalize_output(run["output"])
+                            == reference_oracle.normalize_output(expected)
+                            else "wrong_answer"
+                        )
+                tests.append(entry)
+
+    passed = sum(test["status"] == "passed" for test in tests)
+    lines = [
+        f"⏱️ Performance tests ({len(tests)} large inputs, {time_limit:g}s limit): "
+        f"{passed}/{len(tests)} passed within the limit"
+    ]
+    for test in tests:
+        seconds = f"{test['seconds']:.2f}s" if test["seconds"] is not None else "-"
+        lines.append(
+            f"   {test['suite']} {test['test']}: {test['status']} in {seconds} "
+            f"(reference {test['reference_seconds']:.2f}s)"
+        )
+    result = {
+        "tests": tests,
+        "passed": passed,
+        "total": len(tests),
+        "summary": "\n".join(lines),
+    }
+
+    log_path = stress_config["performance_log"]
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    with open(log_path, "a", encoding="utf-8") as f:
+        record = {
+            "student_id": student_id,
+            "assignment": assignment,
+            "timestamp": datetime.now().isoformat(),
+            "tests": tests,
+        }
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return result
@@ -0,0 +1,248 @@
+"""
+Near-duplicate submission result reuse.
+
+Team members' repositories, forks and lightly edited copies often contain
+nearly the same source tree. Each graded submission is stored with a
+content signature and its stage outputs (judge results, static analysis,
+LLM grading). A later submission with the same signature reuses every stage
+output; one whose winnowed fingerprints are similar enough
+reuses the judge and static-analysis results and only gets a diff-only LLM
+review against its already-graded twin.
+"""
+
+import os
+import json
+import zlib
+import sqlite3
+import difflib
+import hashlib
+import logging
+import threading
+from array import array
+from datetime import datetime
+from typing import List, Optional
+
+import config
+import fingerprints
+import plagiarism
+
+logger = logging.getLogger(__name__)
+
+
+BUILD_FILES = ("Makefile", "makefile", "CMakeLists.txt")
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id TEXT,
+    assignment TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    fingerprints BLOB NOT NULL,
+    source_code BLOB NOT NULL,
+    test_results TEXT,
+    analysis_report TEXT,
+    grading_result TEXT NOT NULL,
+    reused_from INTEGER,
+    reuse_kind TEXT,
+    prompt_version TEXT,
+    added TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_signature ON submissions (assignment, signature);
+"""
+
+
+def submission_signature(
+    project_path: str, excluded_files: Optional[List[str]] = None
+) -> dict:
+    """Compute the content signature of a submission.
+
+    The exact signature hashes the raw contents of every source and build
+    file, with only line endings normalised, together with its relative
+    path: comments and layout are graded, so a reformatted copy is not an
+    exact twin. The winnowed fingerprints from
+    plagiarism.fingerprint_submission, which ignore layout, are returned for
+    near-match scoring.
+
+    Returns:
+        {"exact": hex digest, "hashes": list of fingerprint hashes}
+    """
+    excluded = set(excluded_files or [])
+    parts = []
+    for root, dirs, files in os.walk(project_path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for file in sorted(files):
+            if file not in BUILD_FILES and not file.endswith(
+                fingerprints.SOURCE_EXTENSIONS
+            ):
+                continue
+            file_path = os.path.join(root, file)
+            rel_path = os.path.relpath(file_path, project_path)
+            if rel_path in excluded:
+                continue
+            try:
+                with open(file_path, "rb") as f:
+                    content = f.read()
+            except OSError as e:
+                logger.warning(f"Could not read {file_path}: {e}")
+                continue
+            content = content.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            digest = hashlib.sha256(content).hexdigest()
+            parts.append(f"{rel_path.replace(os.sep, '/')}:{digest}")
+
+    exact = hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+    hashes = plagiarism.fingerprint_submission(project_path, excluded_files)["hashes"]
+    return {"exact": exact, "hashes": sorted(hashes)}
+
+
+def source_diff(
+    old_source: str, new_source: str, max_chars: Optional[int] = None
+) -> Optional[str]:
+    """Unified diff between two read_project_files() dumps.
+
+    Returns None when the diff is longer than max_chars (default
+    REUSE_CONFIG["max_diff_chars"]), i.e. too large for a diff-only review.
+    """
+    if max_chars is None:
+        max_chars = config.REUSE_CONFIG["max_diff_chars"]
+    diff = "".join(
+        difflib.unified_diff(
+            old_source.splitlines(keepends=True),
+            new_source.splitlines(keepends=True),
+            fromfile="graded_twin",
+            tofile="submission",
+            n=3,
+        )
+    )
+    return diff if len(diff) <= max_chars else None
+
+
+class ReuseStore:
+    """Stage outputs of graded submissions, keyed by content signature, in SQLite."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or config.REUSE_CONFIG["path"]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {
+            row[1] for row in self._conn.execute("PRAGMA table_info(submissions)")
+        }
+        if "prompt_version" not in columns:
+            self._conn.execute("ALTER TABLE submissions ADD COLUMN prompt_version TEXT")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def _entry(self, row, kind: str, similarity: float) -> dict:
+        entry_id, student_id, source_blob, test_results, analysis, grading = row[:6]
+        return {
+            "kind": kind,
+            "similarity": round(similarity * 100, 1),
+            "entry_id": entry_id,
+            "student_id": student_id,
+            "source_code": zlib.decompress(source_blob).decode("utf-8"),
+            "test_results": json.loads(test_results) if test_results else None,
+            "analysis_report": analysis,
+            "grading_result": json.loads(grading),
+            "prompt_version": row[6],
+        }
+
+    def find(
+        self, signature: dict, assignment: str, threshold: Optional[float] = None
+    ) -> Optional[dict]:
+        """Return the best graded twin of a submission, or None.
+
+        An identical signature gives kind "exact"; otherwise the entry with the
+        highest fingerprint Jaccard similarity at or above threshold (default
+        REUSE_CONFIG["near_threshold"]) gives kind "near". Near matches scan the
+        assignment's entries, which stays cheap at cohort scale.
+        """
+        if threshold is None:
+            threshold = config.REUSE_CONFIG["near_threshold"]
+        columns = (
+            "id, student_id, source_code, test_results, analysis_report, "
+            "grading_result, prompt_version"
+        )
+
+        row = self._conn.execute(
+            f"SELECT {columns} FROM submissions WHERE assignment = ? AND signature = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (assignment, signature["exact"]),
+        ).fetchone()
+        if row is not None:
+            return self._entry(row, "exact", 1.0)
+
+        hashes = set(signature["hashes"])
+        if not hashes:
+            return None
+
+        best_id, best_similarity = None, 0.0
+        for entry_id, blob in self._conn.execute(
+            "SELECT id, fingerprints FROM submissions WHERE assignment = ?",
+            (assignment,),
+        ):
+            other = array("Q")
+            other.frombytes(blob)
+            other = set(other)
+            similarity = len(hashes & other) / len(hashes | other)
+            if similarity > best_similarity:
+                best_id, best_similarity = entry_id, similarity
+
+        if best_id is None or best_similarity < threshold:
+            return None
+        row = self._conn.execute(
+            f"SELECT {columns} FROM submissions WHERE id = ?", (best_id,)
+        ).fetchone()
+        return self._entry(row, "near", best_similarity)
+
+    def add(
+        self,
+        signature: dict,
+        assignment: str,
+        student_id: str,
+        source_code: str,
+        test_results,
+        analysis_report: str,
+        grading_result: dict,
+        reused_from: Optional[int] = None,
+        reuse_kind: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+    ) -> int:
+        """Store a graded submission's stage outputs and return its entry ID.
+
+        prompt_version is the grading prompt version the LLM result was
+        produced with (langchain_integration.grading_prompt_version).
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO submissions (student_id, assignment, signature, fingerprints, "
+                "source_code, test_results, analysis_report, grading_result, reused_from, "
+                "reuse_kind, prompt_version, added) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    student_id,
+                    assignment,
+                    signature["exact"],
+                    array("Q", signature["hashes"]).tobytes(),
+                    zlib.compress(source_code.encode("utf-8")),
+                    json.dumps(test_results, ensure_ascii=False, default=str),
+                    analysis_report,
+                    json.dumps(grading_result, ensure_ascii=False),
+                    reused_from,
+                    reuse_kind,
+                    prompt_version,
+                    datetime.now().isoformat(),
+                ),
+            )
+        return cursor.lastrowid
+
+    def stats(self) -> dict:
+        entries = self._conn.execute("SELECT COUNT(*) FROM submissions").fetchone()[0]
+        reused = self._conn.execute(
+            "SELECT reuse_kind, COUNT(*) FROM submissions WHERE reuse_kind IS NOT NULL "
+            "GROUP BY reuse_kind"
+        ).fetchall()
+        return {"entries": entries, "reused": dict(reused)}
@@ -0,0 +1,199 @@
+"""
+Per-call LLM telemetry.
+
+Every LLM request (grading attempts, field repairs, test generation) appends
+one JSON line with its token usage, wall time, attempt number, outcome and
+cache status to TELEMETRY_CONFIG["path"]. aggregate_report() rolls the file
+up by assignment to show where tokens, money and time go.
+"""
+
+import os
+import json
+import threading
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+_lock = threading.Lock()
+
+
+def usage_from_response(response) -> dict:
+    """Extract token counts from a response's usage_metadata (empty if absent)."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", None),
+        "cached_tokens": getattr(usage, "cached_content_token_count", None),
+        "output_tokens": getattr(usage, "candidates_token_count", None),
+        "total_tokens": getattr(usage, "total_token_count", None),
+    }
+
+
+def estimate_cost(
+    prompt_tokens: Optional[int],
+    output_tokens: Optional[int],
+    model: Optional[str] = None,
+) -> float:
+    """Estimated USD cost of a call from TELEMETRY_CONFIG per-million prices."""
+    telemetry_config = config.TELEMETRY_CONFIG
+    model = (model or config.MODEL_CONFIG["model"]).split("/")[-1]
+    input_price, output_price = telemetry_config["model_prices"].get(
+        model,
+        (
+            telemetry_config["input_cost_per_million"],
+            telemetry_config["output_cost_per_million"],
+        ),
+    )
+    return (
+        (prompt_tokens or 0) * input_price + (output_tokens or 0) * output_price
+    ) / 1_000_000
+
+
+def record_llm_call(
+    stage: str,
+    assignment: Optional[str],
+    student_id: Optional[str],
+    seconds: float,
+    outcome: str,
+    attempt: int = 1,
+    cache_hit: bool = False,
+    response=None,
+    prompt_chars: int = 0,
+    response_chars: int = 0,
+    label: Optional[str] = None,
+    model: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> dict:
+    """Append one telemetry record for an LLM call and return it.
+
+    Args:
+        stage: "grading", "repair", "generation", ...
+        assignment: Assignment key (A1..A6) the call belongs to
+        student_id: Student the call was made for, if any
+        seconds: Wall time of the call
+        outcome: "ok", "cache_hit", "parse_error", "validation_error" or "error"
+        attempt: 1-based attempt number within the request
+        cache_hit: Whether the result came from the grading cache
+        response: LLM response, used for its usage_metadata
+        prompt_chars: Prompt length in characters
+        response_chars: Response length in characters
+        label: Finer-grained request label (e.g. "A6_phase2")
+        model: Model that served the call (defaults to MODEL_CONFIG["model"])
+        backend: Backend that served the call (defaults to LLM_BACKEND_CONFIG["mode"]);
+            calls to a local server cost nothing
+    """
+    usage = usage_from_response(response)
+    record = {
+        "timestamp": datetime.now().isoformat(),
+        "stage": stage,
+        "assignment": assignment,
+        "label": label or assignment,
+        "student_id": student_id,
+        "model": (model or config.MODEL_CONFIG["model"]).split("/")[-1],
+        "backend": backend or config.LLM_BACKEND_CONFIG["mode"],
+        "attempt": attempt,
+        "outcome": outcome,
+        "cache_hit": cache_hit,
+        "seconds": round(seconds, 3),
+        "prompt_chars": prompt_chars,
+        "response_chars": response_chars,
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "cached_tokens": usage.get("cached_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+        "total_tokens": usage.get("total_tokens"),
+    }
+    record["cost_usd"] = (
+        0.0
+        if record["backend"] == "local"
+        else round(
+            estimate_cost(record["prompt_tokens"], record["output_tokens"], model), 6
+        )
+    )
+
+    if not config.TELEMETRY_CONFIG["enabled"]:
+        return record
+
+    path = config.TELEMETRY_CONFIG["path"]
+    try:
+        with _lock:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning(f"Failed to write telemetry record to {path}: {e}")
+    return record
+
+
+def load_records(path: Optional[str] = None) -> list:
+    """Read all telemetry records, skipping malformed lines."""
+    path = path or config.TELEMETRY_CONFIG["path"]
+    if not os.path.exists(path):
+        return []
+
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def aggregate_report(path: Optional[str] = None, by: str = "assignment") -> dict:
+    """Aggregate telemetry records by a record key (assignment, stage, label, ...).
+
+    Each group reports calls, cache hits, failed attempts, token totals,
+    the share of prompt tokens served from the context cache, estimated
+    cost, total and mean wall time, and the number of distinct students.
+    """
+    groups = defaultdict(
+        lambda: {
+            "calls": 0,
+            "cache_hits": 0,
+            "failed_attempts": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+            "output_tokens": 0,
+            "cost_usd": 0.0,
+            "seconds": 0.0,
+            "students": set(),
+        }
+    )
+
+    for record in load_records(path):
+        group = groups[record.get(by) or "unknown"]
+        group["calls"] += 1
+        group["cache_hits"] += 1 if record.get("cache_hit") else 0
+        group["failed_attempts"] += (
+            0 if record.get("outcome") in ("ok", "cache_hit") else 1
+        )
+        group["prompt_tokens"] += record.get("prompt_tokens") or 0
+        group["cached_tokens"] += record.get("cached_tokens") or 0
+        group["output_tokens"] += record.get("output_tokens") or 0
+        group["cost_usd"] += record.get("cost_usd") or 0.0
+        group["seconds"] += record.get("seconds") or 0.0
+        if record.get("student_id"):
+            group["students"].add(record["student_id"])
+
+    report = {}
+    for key, group in sorted(groups.items()):
+        api_calls = max(group["calls"] - group["cache_hits"], 1)
+        report[key] = {
+            **group,
+            "students": len(group["students"]),
+            "cost_usd": round(group["cost_usd"], 4),
+            "cached_token_share": round(
+                group["cached_tokens"] / max(group["prompt_tokens"], 1), 3
+            ),
+            "seconds": round(group["seconds"], 2),
+            "mean_seconds_per_call": round(group["seconds"] / api_calls, 3),
+        }
+    return report
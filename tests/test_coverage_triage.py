@@ -0,0 +1,43 @@
+import random
+
+import coverage_triage
+
+
+def _units(coverage, names):
+    return set().union(*(coverage[name] for name in names))
+
+
+def test_select_tests_keeps_every_unit():
+    rng = random.Random(11)
+    for _ in range(100):
+        units = [f"main.cpp:{line}" for line in range(30)]
+        coverage = {
+            f"{i:02d}": set(rng.sample(units, rng.randrange(1, 10)))
+            for i in range(rng.randrange(1, 15))
+        }
+        costs = {name: rng.uniform(0.01, 2) for name in coverage}
+        selected = coverage_triage.select_tests(coverage, costs)
+        assert _units(coverage, selected) == _units(coverage, coverage)
+        assert selected == [name for name in coverage if name in selected]
+
+
+def test_select_tests_prefers_cheap_tests_and_drops_redundant_ones():
+    coverage = {
+        "01": {"a", "b", "c", "d"},
+        "02": {"a", "b"},
+        "03": {"c", "d"},
+        "04": {"a"},
+        "05": {"e", "e:b0"},
+    }
+    costs = {"01": 10.0, "02": 1.0, "03": 1.0, "04": 0.1, "05": 1.0}
+    assert coverage_triage.select_tests(coverage, costs) == ["02", "03", "05"]
+
+
+def test_select_tests_drops_tests_covered_by_the_rest():
+    coverage = {"01": {"a", "b"}, "02": {"a"}, "03": {"b"}}
+    costs = {"01": 1.0, "02": 0.6, "03": 0.6}
+    assert coverage_triage.select_tests(coverage, costs) == ["01"]
+
+
+def test_select_tests_empty():
+    assert coverage_triage.select_tests({}, {}) == []
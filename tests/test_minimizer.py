@@ -0,0 +1,47 @@
+import minimizer
+
+
+def test_ddmin_reaches_the_two_failure_lines():
+    items = [f"line {i}" for i in range(40)]
+
+    def is_failing(candidate):
+        return "line 7" in candidate and "line 31" in candidate
+
+    result, runs = minimizer.ddmin(items, is_failing)
+    assert result == ["line 7", "line 31"]
+    assert 0 < runs < 200
+
+
+def test_ddmin_parallel_gives_the_same_result():
+    items = [str(i) for i in range(64)]
+
+    def is_failing(candidate):
+        return {"3", "40"} <= set(candidate)
+
+    assert minimizer.ddmin(items, is_failing, workers=4)[0] == ["3", "40"]
+
+
+def test_ddmin_single_line():
+    items = ["a", "b", "c", "d", "e"]
+    assert minimizer.ddmin(items, lambda candidate: "d" in candidate)[0] == ["d"]
+
+
+def test_ddmin_budget_keeps_a_failing_input():
+    items = [str(i) for i in range(100)]
+
+    def is_failing(candidate):
+        return {"10", "20", "90"} <= set(candidate)
+
+    result, runs = minimizer.ddmin(items, is_failing, budget=5)
+    assert runs <= 5
+    assert is_failing(result)
+
+
+def test_divergence():
+    assert minimizer.divergence("a  b\n\nc\n", "a b\nc") is None
+    assert minimizer.divergence("a\nb\n", "a\nx\n") == {
+        "line": 2,
+        "expected": "b",
+        "actual": "x",
+    }
+    assert minimizer.divergence("a\nb\n", "a\n")["actual"] == "<end of output>"
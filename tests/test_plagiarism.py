@@ -0,0 +1,69 @@
+import random
+
+import plagiarism
+
+
+def _naive_hash(token_ids):
+    h = 0
+    for token_id in token_ids:
+        h = (h * plagiarism._HASH_BASE + token_id) % plagiarism._HASH_MOD
+    return h
+
+
+def _naive_winnow(hashes, window):
+    """Rightmost minimum of every window, each position recorded once."""
+    window = max(1, min(window, len(hashes)))
+    selected = []
+    for start in range(len(hashes) - window + 1):
+        block = hashes[start : start + window]
+        position = start + max(i for i, h in enumerate(block) if h == min(block))
+        if not selected or selected[-1][1] != position:
+            selected.append((hashes[position], position))
+    return selected
+
+
+def test_kgram_hashes_match_polynomial_hash():
+    token_ids = [random.Random(1).randrange(1, 1 << 32) for _ in range(50)]
+    hashes = plagiarism.kgram_hashes(token_ids, 5)
+    assert len(hashes) == 46
+    assert hashes == [_naive_hash(token_ids[i : i + 5]) for i in range(46)]
+
+
+def test_kgram_hashes_short_input():
+    assert plagiarism.kgram_hashes([1, 2], 3) == []
+    assert plagiarism.kgram_hashes([1, 2, 3], 3) == [_naive_hash([1, 2, 3])]
+
+
+def test_winnow_matches_brute_force():
+    rng = random.Random(7)
+    for _ in range(200):
+        hashes = [rng.randrange(10) for _ in range(rng.randrange(1, 40))]
+        window = rng.randrange(1, 8)
+        assert plagiarism.winnow(hashes, window) == _naive_winnow(hashes, window)
+
+
+def test_winnow_covers_every_window():
+    hashes = [random.Random(3).randrange(1000) for _ in range(300)]
+    positions = [position for _, position in plagiarism.winnow(hashes, 4)]
+    for start in range(len(hashes) - 3):
+        assert any(start <= position < start + 4 for position in positions)
+
+
+def test_shared_fragment_shares_fingerprints():
+    rng = random.Random(5)
+    fragment = [rng.randrange(1, 1 << 32) for _ in range(40)]
+    a = [rng.randrange(1, 1 << 32) for _ in range(60)] + fragment
+    b = fragment + [rng.randrange(1, 1 << 32) for _ in range(60)]
+    fingerprints_a = {h for h, _ in plagiarism.winnow(plagiarism.kgram_hashes(a, 5), 4)}
+    fingerprints_b = {h for h, _ in plagiarism.winnow(plagiarism.kgram_hashes(b, 5), 4)}
+    # A match of window + k - 1 tokens is guaranteed to share a fingerprint
+    assert fingerprints_a & fingerprints_b
+    unrelated = [rng.randrange(1, 1 << 32) for _ in range(100)]
+    fingerprints_c = {
+        h for h, _ in plagiarism.winnow(plagiarism.kgram_hashes(unrelated, 5), 4)
+    }
+    assert not fingerprints_a & fingerprints_c
+
+
+def test_winnow_empty():
+    assert plagiarism.winnow([], 4) == []
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+from pydantic import BaseModel
+
+import prompts
+
+
+class Grade(BaseModel):
+    p1_naming: float
+    generated_comment: str
+
+
+REPLY = {"p1_naming": 2.5, "generated_comment": 'Use {braces} and "quotes" less'}
+
+
+def test_scan_ignores_braces_inside_strings():
+    text = 'Here: {"a": "}{", "b": {"c": "\\"}"}} and {"d": 1}'
+    spans, tail = prompts._scan_json_objects(text)
+    objects = [json.loads(text[start:end]) for start, end in spans]
+    assert objects == [{"a": "}{", "b": {"c": '"}'}}, {"d": 1}]
+    assert tail is None
+
+
+def test_scan_reports_truncated_tail():
+    spans, tail = prompts._scan_json_objects('{"a": [1, 2], "b": "op')
+    assert spans == []
+    assert tail["start"] == 0
+    assert tail["stack"] == ("{",)
+    assert tail["in_string"]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"a": 1, "b": "te', {"a": 1, "b": "te"}),
+        ('{"a": [1, {"b": 2}', {"a": [1, {"b": 2}]}),
+        ('{"a": 1, "b": "x\\', {"a": 1, "b": "x"}),
+        ('{"a": 1, "b":', {"a": 1}),
+        ('{"a": {"b": "}"}, "c"', {"a": {"b": "}"}}),
+    ],
+)
+def test_repair_truncated(text, expected):
+    _, tail = prompts._scan_json_objects(text)
+    assert prompts._repair_truncated(text, tail) == expected
+
+
+def test_fixup_picks_largest_object_and_drops_trailing_commas():
+    text = 'Example {"x": 1} then the answer: {"a": 1, "b": [2, 3,],}'
+    assert prompts._attempt_json_fixup(text) == {"a": 1, "b": [2, 3]}
+
+
+def test_parse_strict_json():
+    grade, strict = prompts.parse_response_model(json.dumps(REPLY), Grade)
+    assert grade == Grade(**REPLY)
+    assert strict
+
+
+def test_parse_fenced_json():
+    text = f"```json\n{json.dumps(REPLY, indent=2)}\n```"
+    grade, strict = prompts.parse_response_model(text, Grade)
+    assert grade == Grade(**REPLY)
+    assert not strict
+
+
+def test_parse_prose_wrapped_json():
+    text = f"Sure, here is the grade:\n{json.dumps(REPLY)}\nLet me know!"
+    grade, strict = prompts.parse_response_model(text, Grade)
+    assert grade == Grade(**REPLY)
+    assert not strict
+
+
+def test_parse_truncated_json():
+    text = json.dumps(REPLY)[:-10]
+    grade, strict = prompts.parse_response_model(text, Grade)
+    assert grade.p1_naming == 2.5
+    assert REPLY["generated_comment"].startswith(grade.generated_comment)
+    assert not strict
+
+
+def test_parse_unwraps_properties():
+    text = json.dumps({"properties": REPLY})
+    grade, _ = prompts.parse_response_model(text, Grade)
+    assert grade == Grade(**REPLY)
+
+
+def test_parse_errors():
+    with pytest.raises(ValueError, match="Failed to parse"):
+        prompts.parse_response_model("no object here", Grade)
+    with pytest.raises(prompts.ResponseValidationError) as error:
+        prompts.parse_response_model('{"p1_naming": "high"}', Grade)
+    assert error.value.parsed == {"p1_naming": "high"}
+
+
+def _stream(text, size):
+    parser = prompts.StreamingJSONFieldParser()
+    fields = []
+    for start in range(0, len(text), size):
+        fields.extend(parser.feed(text[start : start + size]))
+    return parser, fields
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_streaming_parser_yields_fields(size):
+    reply = {
+        "p1_naming": 2.5,
+        "nested": {"a": [1, "}"], "b": "x,y"},
+        "generated_comment": 'Say "hi", {ok}',
+    }
+    parser, fields = _stream("```json\n" + json.dumps(reply) + "\n```", size)
+    assert fields == list(reply.items())
+    assert parser.done
+    assert not parser.off_format
+
+
+def test_streaming_parser_reports_fields_as_they_complete():
+    parser = prompts.StreamingJSONFieldParser()
+    assert parser.feed('{"a": 1, "b": "te') == [("a", 1)]
+    assert parser.feed('xt", "c"') == [("b", "text")]
+    assert parser.feed(": [2]}") == [("c", [2])]
+
+
+def test_streaming_parser_prose_is_off_format_not_hopeless():
+    parser, fields = _stream("Here is the grade: " + json.dumps(REPLY), 5)
+    assert fields == []
+    assert parser.off_format
+    assert not parser.hopeless
+
+
+def test_streaming_parser_malformed_field_is_off_format():
+    parser, fields = _stream('{"a": 1, "b": nope, "c": 2}', 4)
+    assert fields == [("a", 1)]
+    assert parser.off_format
+
+
+def test_streaming_parser_hopeless_without_object():
+    parser = prompts.StreamingJSONFieldParser(max_prose=100)
+    parser.feed("I cannot grade this submission. " * 3)
+    assert parser.off_format and not parser.hopeless
+    parser.feed("Sorry. " * 3)
+    assert parser.hopeless
@@ -0,0 +1,91 @@
+import os
+import glob
+
+import pytest
+
+import config
+import description_store
+import sample_tests
+import spec_index
+
+pytest.importorskip("fitz")
+
+DESCRIPTION_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "description"
+)
+
+
+@pytest.fixture(scope="module")
+def pdfs(tmp_path_factory):
+    patch = pytest.MonkeyPatch()
+    patch.setattr(config, "PRACTICES_DIR", DESCRIPTION_DIR)
+    patch.setitem(
+        config.DESCRIPTION_STORE_CONFIG,
+        "cache_dir",
+        str(tmp_path_factory.mktemp("description_cache")),
+    )
+    patch.setattr(description_store, "_stores", {})
+    yield sorted(glob.glob(os.path.join(DESCRIPTION_DIR, "*", "*.pdf")))
+    patch.undo()
+
+
+def _outputs(pdf_path):
+    return [
+        line
+        for sample in sample_tests.extract_pdf_samples(pdf_path)
+        for line in sample["output"].splitlines()
+    ]
+
+
+def _pdf_lines(pdf_path):
+    """Every code line of the PDF and every run of lines within one block."""
+    document = description_store.get_store().document(pdf_path)
+    lines = set()
+    for _, block, kind in spec_index.classify_blocks(document):
+        if kind != "code":
+            continue
+        block_lines = [line.strip() for line in block[4].split("\n")]
+        block_lines = [line for line in block_lines if line]
+        for start in range(len(block_lines)):
+            for stop in range(start + 1, len(block_lines) + 1):
+                joined = " ".join(block_lines[start:stop])
+                lines.add(joined.translate(sample_tests._NORMALIZE))
+    return lines
+
+
+def test_outputs_are_lines_of_the_pdf(pdfs):
+    assert pdfs
+    for pdf_path in pdfs:
+        pdf_lines = _pdf_lines(pdf_path)
+        for line in _outputs(pdf_path):
+            assert line.strip() in pdf_lines, (os.path.basename(pdf_path), line)
+
+
+def test_separate_lines_are_not_merged(pdfs):
+    outputs = {
+        os.path.basename(os.path.dirname(pdf_path)): _outputs(pdf_path)
+        for pdf_path in pdfs
+    }
+    assert "analyze_db_performance (1): low_mist, the_person" in outputs["A1"]
+    assert "analyze_transactions (1): the_faint_faith" in outputs["A1"]
+    for subject in ("Chemistry", "Maths", "Physics"):
+        assert any(
+            line.startswith(f"{subject}:") and line.endswith("%.")
+            for line in outputs["A4"]
+        )
+    for line in outputs["A6"]:
+        assert "Weekly: periodic_event" not in line
+        assert "hours: join_event" not in line
+
+
+def test_wrapped_lines_are_rejoined(pdfs):
+    inputs = [
+        sample["input"]
+        for pdf_path in pdfs
+        for sample in sample_tests.extract_pdf_samples(pdf_path)
+    ]
+    assert any(
+        'POST event ? date 1404/12/02 start_time 9 duration 1 title "Quiz" '
+        'description "DB"' in text
+        for text in inputs
+    )
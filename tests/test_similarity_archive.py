@@ -0,0 +1,152 @@
+import os
+import json
+import random
+
+import pytest
+
+import config
+import fingerprints
+import similarity_archive
+import tools
+from similarity_archive import SimilarityArchive
+
+
+def _hashes(seed, count=400):
+    rng = random.Random(seed)
+    return {rng.randrange(1 << 61) for _ in range(count)}
+
+
+def _variant(hashes, keep, seed):
+    """A copy sharing `keep` of hashes, padded back to size with new ones."""
+    kept = set(sorted(hashes)[: int(len(hashes) * keep)])
+    return kept | set(list(_hashes(seed, len(hashes)))[: len(hashes) - len(kept)])
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = SimilarityArchive(str(tmp_path / "archive.db"))
+    yield archive
+    archive.close()
+
+
+def test_minhash_estimates_jaccard(archive):
+    a = _hashes(1)
+    b = _variant(a, 2 / 3, 2)  # Jaccard 0.5
+    signature_a, signature_b = archive.signature(a), archive.signature(b)
+    estimate = sum(x == y for x, y in zip(signature_a, signature_b)) / len(signature_a)
+    assert abs(estimate - len(a & b) / len(a | b)) < 0.15
+    assert archive.signature(a) == signature_a
+    assert archive.signature(set()) == archive.signature(set())
+
+
+def test_query_finds_near_copies_only(archive):
+    original = _hashes(1)
+    archive.insert(original, "s1", "A1", "F03")
+    archive.insert(_hashes(2), "s2", "A1", "F03")
+
+    matches = archive.query(_variant(original, 0.9, 3), assignment="A1")
+    assert [match["student_id"] for match in matches] == ["s1"]
+    assert matches[0]["similarity"] > 70
+    assert archive.query(_hashes(4), assignment="A1") == []
+
+
+def test_query_filters(archive):
+    hashes = _hashes(1)
+    archive.insert(hashes, "old", "A1", "F03", "https://x/old", "abc")
+    archive.insert(hashes, "current", "A1", "F04", "https://x/current", "def")
+    archive.insert(hashes, "unlabelled", "A1")
+    archive.insert(hashes, "other", "A2", "F03")
+
+    def students(**kwargs):
+        return sorted(match["student_id"] for match in archive.query(hashes, **kwargs))
+
+    assert students(assignment="A1") == ["current", "old", "unlabelled"]
+    assert students(assignment="A1", exclude_semester="F04") == ["old", "unlabelled"]
+    assert students(assignment="A1", exclude_semester=None) == ["current", "old"]
+    assert students(assignment="A1", exclude_repo="https://x/old") == [
+        "current",
+        "unlabelled",
+    ]
+
+
+def test_reinsert_supersedes_and_compact_drops(archive):
+    archive.insert(_hashes(1), "s1", "A1", "F04", "https://x/s1", "abc")
+    archive.insert(_hashes(1), "s1", "A1", "F04", "https://x/s1", "abc")
+    archive.insert(_hashes(2), "s2", "A1", "F04")
+    archive.insert(_hashes(3), "s2", "A1", "F04")
+    assert archive.contains("https://x/s1", "abc")
+    assert archive.stats()["entries"] == 2
+    assert archive.query(_hashes(2), assignment="A1") == []
+
+    stats = archive.compact()
+    assert stats["removed"] == 2
+    assert stats["entries"] == 2
+    assert [m["student_id"] for m in archive.query(_hashes(3))] == ["s2"]
+
+
+SOURCE = """
+#include <iostream>
+#include <vector>
+using namespace std;
+
+class Calendar {
+public:
+    void add_event(int day, int start, int duration) {
+        for (int hour = start; hour < start + duration; hour++)
+            slots[day].push_back(hour);
+    }
+    int busy_hours(int day) const { return slots[day].size(); }
+private:
+    vector<int> slots[366];
+};
+
+int main() {
+    Calendar calendar;
+    int day, start, duration;
+    while (cin >> day >> start >> duration) {
+        if (day < 0 || day >= 366) { cout << "Bad Request" << endl; continue; }
+        calendar.add_event(day, start, duration);
+        cout << "OK " << calendar.busy_hours(day) << endl;
+    }
+    return 0;
+}
+"""
+
+
+def _project(path):
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "main.cpp"), "w", encoding="utf-8") as f:
+        f.write(SOURCE)
+    return str(path)
+
+
+def test_unlabelled_ingest_matches_with_default_config(archive, tmp_path, monkeypatch):
+    monkeypatch.setitem(config.SIMILARITY_ARCHIVE_CONFIG, "semester", None)
+    monkeypatch.setattr(
+        fingerprints, "load_starter_index", lambda a: {"assignment": a, "files": []}
+    )
+    monkeypatch.setattr(
+        tools,
+        "clone_student_repo",
+        lambda url, sha=None, student=None: _project(tmp_path / "clones" / sha),
+    )
+    repos_json = tmp_path / "repos.json"
+    repos_json.write_text(
+        json.dumps(
+            [{"repo_url": "https://x/old", "commit_sha": "abc", "students": ["s9"]}]
+        )
+    )
+    assert similarity_archive.ingest_repos_file(archive, str(repos_json), "A6") == 1
+
+    matches = similarity_archive.check_and_archive(
+        archive, _project(tmp_path / "new"), "s1", "A6", repo_url="https://x/new"
+    )
+    assert [(m["student_id"], m["semester"]) for m in matches] == [("s9", None)]
+
+
+def test_local_regrade_supersedes_earlier_versions(archive, tmp_path):
+    for version, commit_sha in enumerate(["c1", "c2", "c3"]):
+        archive.insert(_hashes(10 + version), "s1", "A6", commit_sha=commit_sha)
+    assert archive.stats()["entries"] == 1
+    assert archive.query(_hashes(10), assignment="A6") == []
+    assert [m["commit_sha"] for m in archive.query(_hashes(12))] == ["c3"]
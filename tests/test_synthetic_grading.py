@@ -0,0 +1,62 @@
+from collections import Counter
+
+import pytest
+
+import config
+import langchain_integration
+import llm_clients
+
+
+@pytest.fixture
+def synthetic(tmp_path, monkeypatch):
+    monkeypatch.setitem(config.LLM_BACKEND_CONFIG, "mode", "synthetic")
+    monkeypatch.setitem(config.LLM_BACKEND_CONFIG, "stage_backends", {})
+    monkeypatch.setitem(config.GRADING_CONFIG, "cache_enabled", False)
+    monkeypatch.setitem(config.ROUTING_CONFIG, "enabled", False)
+    monkeypatch.setitem(config.ARTIFACT_ARCHIVE_CONFIG, "path", str(tmp_path / "a"))
+    monkeypatch.setitem(config.TELEMETRY_CONFIG, "path", str(tmp_path / "t.jsonl"))
+
+
+@pytest.mark.parametrize("structured", [True, False])
+@pytest.mark.parametrize("assignment", ["A1", "A6"])
+def test_synthetic_grading(synthetic, monkeypatch, structured, assignment):
+    monkeypatch.setitem(config.GRADING_CONFIG, "structured_output", structured)
+    output = langchain_integration.grade_student_project(
+        "Passed 3/4 tests",
+        "No issues",
+        "int main() { return 0; }",
+        "Calendar assignment",
+        assignment_type=assignment,
+        student_id="s1",
+        save_outputs=False,
+    )
+    grading_model = langchain_integration.get_grading_model(assignment)
+    assert grading_model.model_validate(output.model_dump()) == output
+
+
+def test_synthetic_text_request_has_no_constraint(synthetic, monkeypatch):
+    monkeypatch.setitem(config.GRADING_CONFIG, "structured_output", False)
+    grading_model = langchain_integration.get_grading_model("A1")
+    synthetic_model = llm_clients.get_model(backend="synthetic")
+    generation_config = langchain_integration._response_generation_config(
+        grading_model, model=synthetic_model
+    )
+    assert set(generation_config) == {"synthetic_schema"}
+    assert langchain_integration._response_generation_config(grading_model) is None
+
+
+def test_batched_outputs_are_summarized_apart(synthetic, tmp_path, monkeypatch):
+    monkeypatch.setitem(config.ARTIFACT_ARCHIVE_CONFIG, "enabled", False)
+    monkeypatch.chdir(tmp_path)
+    grading_model = langchain_integration.get_grading_model("A1")
+    output = grading_model.model_construct()
+    stats = Counter(attempts=2, requests=1, parse_failures=1)
+    langchain_integration.save_grading_output(output, "A1", "s1", {}, stats)
+    langchain_integration.save_grading_output(output, "A1", "s2", {}, batch={"size": 4})
+
+    summary = langchain_integration.summarize_response_stats()
+    mode = "structured" if config.GRADING_CONFIG["structured_output"] else "text"
+    assert summary[mode]["gradings"] == 1
+    assert summary[mode]["parse_failure_rate"] == 0.5
+    assert "batch_size" not in summary[mode]
+    assert summary["batched"] == {"gradings": 1}
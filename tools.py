@@ -6,8 +6,10 @@ import json
 from datetime import datetime
 from git import Repo, GitCommandError
 import config
-from config import MODEL_CONFIG
-import fitz
+from description_store import get_store
+import sample_tests
+import reference_oracle
+import coverage_triage
 import time
 
 
@@ -72,8 +74,13 @@ def clone_student_repo(
         raise Exception(f"Failed to clone repository {repo_url}: {str(e)}")
 
 
-def read_project_files(project_path: str) -> str:
-    """Reads all .cpp and .h files in a directory and concatenates them with analysis."""
+def read_project_files(project_path: str, excluded_files: list = None) -> str:
+    """Reads all .cpp and .h files in a directory and concatenates them with analysis.
+
+    Files listed in excluded_files (paths relative to project_path, e.g. starter
+    code from fingerprints.find_starter_files) are left out of the code and metrics.
+    """
+    excluded = set(excluded_files or [])
     full_code = ""
     code_metrics = {
         "total_files": 0,
@@ -88,6 +95,8 @@ def read_project_files(project_path: str) -> str:
         for file in files:
             if file.endswith((".cpp", ".h", ".hpp")):
                 file_path = os.path.join(root, file)
+                if os.path.relpath(file_path, project_path) in excluded:
+                    continue
                 code_metrics["total_files"] += 1
 
                 if file.endswith(".cpp"):
@@ -120,6 +129,7 @@ def read_project_files(project_path: str) -> str:
 - Total Lines: {code_metrics['total_lines']}
 - Largest File: {code_metrics['largest_file']} ({code_metrics['max_lines']} lines)
 - Average Lines per File: {code_metrics['total_lines'] / max(code_metrics['total_files'], 1):.1f}
+- Excluded Starter/Vendor Files: {len(excluded)}
 
 """
 
@@ -236,29 +246,13 @@ def analyze_code_quality(source_code: str) -> dict:
 
 
 def read_practice_description(pdf_path: str) -> str:
-    """Reads and extracts text content from a PDF practice description with enhanced formatting."""
-    try:
-        doc = fitz.open(pdf_path)
-        text_content = []
-
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-
-            page_text = page.get_text()
-
-            page_text = page_text.replace("\n\n", "\n")
-            page_text = page_text.replace("  ", " ")
-
-            if page_num > 0:
-                text_content.append(f"\n--- Page {page_num + 1} ---\n")
+    """Reads and extracts text content from a PDF practice description with enhanced formatting.
 
-            text_content.append(page_text)
-
-        doc.close()
-
-        full_text = "".join(text_content)
-
-        full_text = full_text.strip()
+    Extraction goes through the description store, so a PDF is only parsed
+    the first time its content is seen.
+    """
+    try:
+        full_text = get_store().document(pdf_path)["text"]
 
         if not full_text:
             return "Error: PDF appears to be empty or contains no extractable text."
@@ -342,14 +336,14 @@ def get_practice_descriptions(practices_dir: str) -> dict:
     if not os.path.exists(practices_dir):
         return practice_descriptions
 
-    for root, _, files in os.walk(practices_dir):
-        for file in files:
-            if file.lower().endswith(".pdf"):
-                pdf_path = os.path.join(root, file)
-                practice_name = os.path.splitext(file)[0]
-                full_text = read_practice_description(pdf_path)
-                summarized_text = summarize_text(full_text)
-                practice_descriptions[practice_name] = summarized_text
+    store = get_store(practices_dir)
+    for path in store.index():
+        practice_name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            full_text = store.document(os.path.join(practices_dir, path))["text"]
+        except Exception as e:
+            full_text = f"Error reading PDF: {str(e)}"
+        practice_descriptions[practice_name] = summarize_text(full_text)
 
     return practice_descriptions
 
@@ -367,13 +361,24 @@ def _make_testcase_pair(test_dir: str, index: int, input_text: str, output_text:
 
 
 def generate_testcases_from_description(
-    assignment: str, num_cases: int = 3, use_llm: bool = False
+    assignment: str,
+    num_cases: int = 3,
+    use_llm: bool = False,
+    reference=None,
+    reference_args=(),
 ) -> str:
     """Generates testcase skeletons for an assignment based on its description.
 
     - assignment: assignment name or key, e.g., 'A1' or 'APS04-A1-Description'
     - num_cases: number of test pairs to generate
-    - use_llm: whether to use LLM for better test case generation
+    - use_llm: whether to use LLM for better test case generation; without it
+      the worked examples of the PDF are used (see sample_tests), and
+      placeholder cases only when the PDF has none
+    - reference: reference solution path, or True for
+      REFERENCE_SOLUTIONS_DIR/<assignment>; when given, only the generated
+      inputs are kept and expected outputs come from running the reference
+      (see reference_oracle)
+    - reference_args: command-line arguments for the reference (CSV paths)
 
     Returns the path to the created test directory.
     This function creates files under `config.TEST_CASES_DIR/<assignment>/tests/`.
@@ -400,15 +405,7 @@ def generate_testcases_from_description(
     with open(session_log_file, "w", encoding="utf-8") as f:
         json.dump(session_log, f, indent=2, ensure_ascii=False)
 
-    descriptions = get_practice_descriptions(config.PRACTICES_DIR)
-
-    text = descriptions.get(assignment)
-    if not text:
-
-        for k, v in descriptions.items():
-            if assignment.lower() in k.lower():
-                text = v
-                break
+    text = get_store().text(assignment)
 
     if not text:
         error_msg = f"No practice description found for assignment '{assignment}'"
@@ -440,12 +437,42 @@ def generate_testcases_from_description(
     with open(reqs_file, "w", encoding="utf-8") as f:
         json.dump(reqs_log, f, indent=2, ensure_ascii=False)
 
+    samples = []
     if use_llm:
 
-        test_cases = generate_testcases_with_llm(text, reqs, num_cases)
+        test_cases = generate_testcases_with_llm(text, reqs, num_cases, assignment)
+        generation_method = "llm"
     else:
 
-        test_cases = generate_testcases_heuristic(reqs, num_cases)
+        # Worked examples from the PDF first; placeholders only without any
+        samples = sample_tests.extract_samples(assignment)[:num_cases]
+        if samples:
+            test_cases = [(sample["input"], sample["output"]) for sample in samples]
+            generation_method = "samples"
+        else:
+            test_cases = generate_testcases_heuristic(reqs, num_cases)
+            generation_method = "heuristic"
+
+    oracle = None
+    if reference:
+        existing = [
+            pair
+            for judge_dir in reference_oracle.judge_tests_dirs(assignment)
+            for pair in reference_oracle.read_tests(judge_dir)
+        ]
+        oracle = reference_oracle.verify_inputs(
+            assignment,
+            [input_text for input_text, _ in test_cases],
+            reference=None if reference is True else reference,
+            args=reference_args,
+            existing=existing,
+        )
+        test_cases = [(case["input"], case["output"]) for case in oracle["accepted"]]
+        generation_method += "+reference"
+        print(
+            f"Reference oracle kept {len(test_cases)}/{oracle['candidates']} "
+            f"inputs (rejected: {oracle['rejected'] or 'none'})"
+        )
 
     saved_files = []
     for i, (input_text, output_text) in enumerate(test_cases, 1):
@@ -464,7 +491,13 @@ def generate_testcases_from_description(
         "saved_files": saved_files,
         "test_directory": tests_dir,
         "logs_directory": logs_dir,
-        "generation_method": "llm" if use_llm else "heuristic",
+        "generation_method": generation_method,
+        "sample_sources": [sample["source"] for sample in samples],
+        "reference_oracle": (
+            {key: oracle[key] for key in ("executable", "candidates", "rejected")}
+            if oracle
+            else None
+        ),
         "requirements_file": reqs_file,
     }
 
@@ -481,14 +514,84 @@ def generate_testcases_from_description(
         json.dump(session_log, f, indent=2, ensure_ascii=False)
 
     logger.info(
-        f"Successfully generated {num_cases} testcases for {assignment} in {tests_dir}"
+        f"Successfully generated {len(test_cases)} testcases for {assignment} in {tests_dir}"
     )
     logger.info(f"Comprehensive logs saved to: {logs_dir}")
-    print(f"Generated {num_cases} testcases for {assignment} in {tests_dir}")
+    print(f"Generated {len(test_cases)} testcases for {assignment} in {tests_dir}")
     print(f"Logs and metadata saved to: {logs_dir}")
     return tests_dir
 
 
+def verify_testcases(
+    assignment: str,
+    inputs_dir: str,
+    reference: str = None,
+    reference_args=(),
+    dest: str = None,
+) -> dict:
+    """Computes expected outputs for a directory of candidate inputs.
+
+    - inputs_dir: directory searched recursively for *.in files; any .out
+      files next to them are ignored
+    - reference: reference solution path (default REFERENCE_SOLUTIONS_DIR/<assignment>)
+    - reference_args: command-line arguments for the reference (CSV paths)
+    - dest: output directory (default test_cases/practice<N>/verified)
+
+    Candidates that crash or time out on the reference, or behave like an
+    existing judge test or an earlier candidate, are dropped; the rest are
+    written in the judge layout with verified.json recording the run.
+    """
+    candidates = []
+    for root, dirs, names in os.walk(inputs_dir):
+        dirs.sort()
+        for name in sorted(names):
+            if name.endswith(".in"):
+                path = os.path.join(root, name)
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    candidates.append((os.path.relpath(path, inputs_dir), f.read()))
+
+    existing = [
+        pair
+        for judge_dir in reference_oracle.judge_tests_dirs(assignment)
+        for pair in reference_oracle.read_tests(judge_dir)
+    ]
+    oracle = reference_oracle.verify_inputs(
+        assignment,
+        [input_text for _, input_text in candidates],
+        reference=reference,
+        args=reference_args,
+        existing=existing,
+    )
+
+    origins = {}
+    for relative_path, input_text in candidates:
+        origins.setdefault(reference_oracle.normalize_input(input_text), relative_path)
+    phase = assignment.partition(".")[2]
+    tests = [
+        {
+            "input": case["input"],
+            "output": case["output"],
+            "source": {
+                "phase": int(phase) if phase.isdigit() else None,
+                "candidate": origins.get(case["input"]),
+                "seconds": case["seconds"],
+            },
+        }
+        for case in oracle["accepted"]
+    ]
+    dest = dest or os.path.join(
+        os.path.dirname(sample_tests.default_samples_dir(assignment)), "verified"
+    )
+    manifest = sample_tests.write_samples(
+        assignment, tests, dest, manifest_name="verified.json"
+    )
+    for key in ("executable", "candidates", "rejected", "seconds"):
+        manifest[key] = oracle[key]
+    with open(os.path.join(dest, "verified.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
 def generate_testcases_heuristic(reqs: dict, num_cases: int) -> list:
     """Generate test cases using heuristic approach based on requirements."""
     test_cases = []
@@ -521,33 +624,50 @@ def generate_testcases_heuristic(reqs: dict, num_cases: int) -> list:
     return test_cases
 
 
-def generate_testcases_with_llm(description: str, reqs: dict, num_cases: int) -> list:
+def generate_testcases_with_llm(
+    description: str, reqs: dict, num_cases: int, assignment: str = None
+) -> list:
     """Generate test cases using LLM for better quality and relevance."""
     try:
 
-        import google.generativeai as genai
-        from dotenv import load_dotenv
+        import llm_clients
+        import telemetry
         from prompts import get_test_generation_prompt
 
-        load_dotenv()
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-
         prompt = get_test_generation_prompt(description, reqs, num_cases)
 
         logger.info(
             f"Generating {num_cases} test cases using LLM for assignment with requirements: {list(reqs.keys())}"
         )
 
-        model = genai.GenerativeModel(
-            MODEL_CONFIG["model"],
-            generation_config=genai.types.GenerationConfig(
-                temperature=MODEL_CONFIG["generation"]["temperature"],
-                top_p=MODEL_CONFIG["generation"]["top_p"],
-                top_k=MODEL_CONFIG["generation"]["top_k"],
-                max_output_tokens=MODEL_CONFIG["generation"]["max_output_tokens"],
-            ),
+        model = llm_clients.get_stage_model("generation")
+        call_start = time.perf_counter()
+        try:
+            response = model.generate_content(prompt)
+        except Exception:
+            telemetry.record_llm_call(
+                "generation",
+                assignment,
+                None,
+                time.perf_counter() - call_start,
+                "error",
+                prompt_chars=len(prompt),
+                model=model.model_name,
+                backend=getattr(model, "backend", "live"),
+            )
+            raise
+        telemetry.record_llm_call(
+            "generation",
+            assignment,
+            None,
+            time.perf_counter() - call_start,
+            "ok",
+            response=response,
+            prompt_chars=len(prompt),
+            response_chars=len(response.text),
+            model=model.model_name,
+            backend=getattr(model, "backend", "live"),
         )
-        response = model.generate_content(prompt)
 
         from prompts import parse_and_validate_response
 
@@ -660,8 +780,11 @@ def generate_testcases_with_llm(description: str, reqs: dict, num_cases: int) ->
         return generate_testcases_heuristic(reqs, num_cases)
 
 
-def run_static_analysis(project_path: str) -> str:
-    """Runs cppcheck and returns a detailed summary of the results with severity categorization."""
+def run_static_analysis(project_path: str, excluded_files: list = None) -> str:
+    """Runs cppcheck and returns a detailed summary of the results with severity categorization.
+
+    Files in excluded_files (relative to project_path) are skipped with cppcheck's -i flag.
+    """
     xml_output_file = os.path.join(project_path, "cppcheck_results.xml")
 
     command = [
@@ -673,8 +796,10 @@ def run_static_analysis(project_path: str) -> str:
         "--std=c++11",
         "--suppress=missingIncludeSystem",
         "--inline-suppr",
-        project_path,
     ]
+    for rel_path in excluded_files or []:
+        command.append(f"-i{os.path.join(project_path, rel_path)}")
+    command.append(project_path)
 
     try:
 
@@ -812,6 +937,7 @@ def run_judge_tests(project_path: str, practice_name: str) -> dict:
         logger.error(f"judge.sh not found in {judge_dir}")
         return results
 
+    triage_root = None
     try:
         logger.info(f"Found judge.sh at {judge_script}, determining if multi-phase")
 
@@ -819,23 +945,56 @@ def run_judge_tests(project_path: str, practice_name: str) -> dict:
             os.path.join(judge_dir, "P1")
         )
 
+        triage = None
+        if config.TRIAGE_CONFIG["enabled"]:
+            import tempfile
+
+            triage_root = tempfile.mkdtemp(prefix="judge-triage-")
+            triage_dir = os.path.join(triage_root, "judge")
+            triage = coverage_triage.triage_judge_dir(judge_dir, triage_dir)
+            if triage:
+                judge_dir = triage_dir
+                judge_script = os.path.join(judge_dir, "judge.sh")
+                logger.info(
+                    f"Triage mode: running {triage['kept']}/{triage['total']} "
+                    f"judge tests for {practice_name}"
+                )
+            else:
+                logger.warning(
+                    f"No triage selection for {practice_name}, running all tests"
+                )
+
         if is_multi_phase:
             logger.info(f"Running multi-phase judge tests for {practice_name}")
 
-            return run_judge_tests_multi_phase(
+            results = run_judge_tests_multi_phase(
                 project_path, practice_name, judge_dir, judge_script
             )
         else:
             logger.info(f"Running single-phase judge tests for {practice_name}")
 
-            return run_judge_tests_single_phase(
+            results = run_judge_tests_single_phase(
                 project_path, practice_name, judge_dir, judge_script
             )
 
+        if triage:
+            results["triage"] = triage
+            results["execution_summary"] = (
+                f"⚡ Triage mode: {triage['kept']}/{triage['total']} judge tests "
+                f"selected by reference coverage; final grading runs all of them\n"
+                + results["execution_summary"]
+            )
+        return results
+
     except Exception as e:
         results["execution_summary"] = f"❌ Error running judge.sh: {str(e)}"
         logger.error(f"Error running judge.sh for {practice_name}: {str(e)}")
         return results
+    finally:
+        if triage_root:
+            import shutil
+
+            shutil.rmtree(triage_root, ignore_errors=True)
 
 
 def run_judge_tests_single_phase(